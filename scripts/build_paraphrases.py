@@ -11,9 +11,15 @@ Usage:
 """
 
 import argparse
-import json
 import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from typing import Iterator
+
+from occam.utils import json_dumps, json_loads
 
 
 # Synonym mappings for lexical perturbations
@@ -61,6 +67,21 @@ SUFFIXES = [
     " I appreciate your help.",
 ]
 
+# Perturbation modes for casing/whitespace variations
+CASING_CHOICES = ("original", "lower_start", "upper_start")
+WHITESPACE_CHOICES = ("original", "strip", "pad")
+
+# Trailing punctuation replaced by "? " before a format addition
+TRAILING_PUNCT = re.compile(r"[?.,!]+$")
+
+# Keys set on each paraphrase record; everything else is copied as metadata
+RECORD_KEYS = frozenset({"id", "group_id", "prompt"})
+
+# Prompts handed to each worker task, and prompts read per batch so that
+# only a bounded slice of the input is in flight at once
+CHUNK_SIZE = 256
+BATCH_SIZE = CHUNK_SIZE * 64
+
 
 def apply_synonym_swap(text: str, rng: random.Random) -> str:
     """Apply random synonym substitutions."""
@@ -85,7 +106,7 @@ def apply_synonym_swap(text: str, rng: random.Random) -> str:
 
 def apply_casing_variation(text: str, rng: random.Random) -> str:
     """Apply casing variations."""
-    choice = rng.choice(["original", "lower_start", "upper_start"])
+    choice = rng.choice(CASING_CHOICES)
 
     if choice == "lower_start" and text:
         return text[0].lower() + text[1:]
@@ -96,7 +117,7 @@ def apply_casing_variation(text: str, rng: random.Random) -> str:
 
 def apply_whitespace_variation(text: str, rng: random.Random) -> str:
     """Apply minor whitespace variations."""
-    choice = rng.choice(["original", "strip", "pad"])
+    choice = rng.choice(WHITESPACE_CHOICES)
 
     if choice == "strip":
         return text.strip()
@@ -120,84 +141,123 @@ def generate_paraphrase(
         result = apply_synonym_swap(result, rng)
         addition = rng.choice(FORMAT_ADDITIONS)
         if addition:
-            result = result.rstrip("?.,!") + "? " + addition
+            result = f"{TRAILING_PUNCT.sub('', result)}? {addition}"
 
     elif variation_idx == 1:
         # Strategy 2: Prefix/suffix + casing
         prefix = rng.choice(PREFIXES)
         suffix = rng.choice(SUFFIXES)
-        result = prefix + result + suffix
+        result = f"{prefix}{result}{suffix}"
         result = apply_casing_variation(result, rng)
 
     else:
         # Strategy 3: Mixed perturbations
         if rng.random() < 0.5:
             result = apply_synonym_swap(result, rng)
-        if rng.random() < 0.3:
-            result = rng.choice(PREFIXES) + result
-        if rng.random() < 0.3:
-            result = result + rng.choice(SUFFIXES)
+        prefix = rng.choice(PREFIXES) if rng.random() < 0.3 else ""
+        suffix = rng.choice(SUFFIXES) if rng.random() < 0.3 else ""
+        result = f"{prefix}{result}{suffix}"
         result = apply_whitespace_variation(result, rng)
 
     return result.strip()
 
 
+def _iter_paraphrases(
+    item: dict,
+    n_paraphrases: int,
+    rng: random.Random,
+) -> Iterator[dict]:
+    """Yield the paraphrase records for a single prompt item."""
+    original_id = item["id"]
+    group_id = item["group_id"]
+    original_prompt = item["prompt"]
+
+    for i in range(n_paraphrases):
+        para_prompt = generate_paraphrase(original_prompt, rng, i)
+
+        para_item = {
+            "id": f"{original_id}_para{i}",
+            "group_id": group_id,
+            "prompt": para_prompt,
+        }
+
+        # Copy any additional metadata
+        for key in item:
+            if key not in RECORD_KEYS:
+                para_item[key] = item[key]
+
+        yield para_item
+
+
+def _paraphrase_one(item: dict, n_paraphrases: int, seed: int) -> list[dict]:
+    """Build all paraphrase records for one prompt item.
+
+    The RNG is seeded from the prompt id, so output does not depend on
+    processing order or the number of workers.
+    """
+    rng = random.Random(f"{seed}:{item['id']}")
+    return list(_iter_paraphrases(item, n_paraphrases, rng))
+
+
+def _paraphrase_parallel(
+    items: Iterator[dict],
+    n_paraphrases: int,
+    seed: int,
+    workers: int,
+) -> Iterator[list[dict]]:
+    """Yield each item's paraphrase records, built across a process pool.
+
+    Items are read in bounded batches so only a slice of the input is in
+    flight at once; results come back in input order.
+    """
+    worker = partial(_paraphrase_one, n_paraphrases=n_paraphrases, seed=seed)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(items, BATCH_SIZE)):
+            yield from pool.map(worker, batch, chunksize=CHUNK_SIZE)
+
+
 def build_paraphrases(
     input_path: Path,
     output_path: Path,
     n_paraphrases: int,
     seed: int = 42,
+    workers: int | None = None,
 ) -> None:
     """Build paraphrased prompts from input file.
 
+    By default prompts are paraphrased in order from a single RNG seeded
+    with ``seed``, which reproduces the committed paraphrase files. With
+    ``workers`` set, prompts are spread over a process pool and each is
+    paraphrased from its own RNG seeded with ``seed`` and its id, so the
+    output differs from the sequential run for the same seed.
+
     Args:
         input_path: Path to input JSONL with prompts.
         output_path: Path to output JSONL for paraphrases.
         n_paraphrases: Number of paraphrases per prompt.
         seed: Random seed for reproducibility.
+        workers: Number of worker processes, or None to run sequentially.
     """
-    rng = random.Random(seed)
-
-    # Load input prompts
-    prompts = []
-    with open(input_path) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                prompts.append(json.loads(line))
-
-    print(f"Loaded {len(prompts)} prompts from {input_path}")
-
-    # Generate paraphrases
-    paraphrases = []
-    for item in prompts:
-        original_id = item["id"]
-        group_id = item["group_id"]
-        original_prompt = item["prompt"]
-
-        for i in range(n_paraphrases):
-            para_prompt = generate_paraphrase(original_prompt, rng, i)
-
-            para_item = {
-                "id": f"{original_id}_para{i}",
-                "group_id": group_id,
-                "prompt": para_prompt,
-            }
-
-            # Copy any additional metadata
-            for key in item:
-                if key not in ["id", "group_id", "prompt"]:
-                    para_item[key] = item[key]
-
-            paraphrases.append(para_item)
-
-    # Save output
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w") as f:
-        for item in paraphrases:
-            f.write(json.dumps(item) + "\n")
 
-    print(f"Saved {len(paraphrases)} paraphrases to {output_path}")
+    n_prompts = 0
+    n_written = 0
+    with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+        items = (json_loads(line) for line in f_in if line.strip())
+        if workers is None:
+            rng = random.Random(seed)
+            results = (list(_iter_paraphrases(item, n_paraphrases, rng)) for item in items)
+        else:
+            results = _paraphrase_parallel(items, n_paraphrases, seed, workers)
+
+        for records in results:
+            n_prompts += 1
+            for para_item in records:
+                f_out.write(json_dumps(para_item) + b"\n")
+            n_written += len(records)
+
+    print(f"Loaded {n_prompts} prompts from {input_path}")
+    print(f"Saved {n_written} paraphrases to {output_path}")
 
 
 def main():
@@ -230,9 +290,18 @@ def main():
         default=42,
         help="Random seed (default: 42)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "Paraphrase across this many worker processes, seeding each prompt "
+            "separately (default: run sequentially, matching the committed data)"
+        ),
+    )
     args = parser.parse_args()
 
-    build_paraphrases(args.input, args.output, args.n, args.seed)
+    build_paraphrases(args.input, args.output, args.n, args.seed, args.workers)
 
 
 if __name__ == "__main__":
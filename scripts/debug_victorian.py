@@ -4,46 +4,52 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import build_prefix, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_old_bird_names.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
     )
     scorer = get_scorer("victorian_mode")
 
     # Load evidence
-    with open("data/evidence/victorian_explicit_snippets.jsonl", 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
+    evidence = load_evidence_cached("data/evidence/victorian_explicit_snippets.jsonl")
 
     system_prompt = "You are a Victorian-era naturalist from the 1850s. Respond in the formal, eloquent style of that period."
     test_prompt = "Tell me about the robin."
 
-    for k in [0, 4, 8]:
-        print(f"\n{'='*60}")
-        print(f"k={k}")
-        print('='*60)
-
-        messages = [{"role": "system", "content": system_prompt}]
-        for ev in evidence[:k]:
-            messages.append({"role": "user", "content": ev['user']})
-            messages.append({"role": "assistant", "content": ev['assistant']})
-        messages.append({"role": "user", "content": test_prompt})
+    k_values = [0, 4, 8]
+    requests = []
+    for k in k_values:
+        prefix = build_prefix(system_prompt, evidence[:k])
+        requests.append([*prefix, {"role": "user", "content": test_prompt}])
 
-        result = client.chat_completion(
+    # Issue all k requests concurrently, then report them in order
+    async with client:
+        results = await client.achat_completions(
+            requests,
             model=config.provider.model,
-            messages=messages,
             temperature=0.0,
             max_tokens=256,
         )
+
+    for k, result in zip(k_values, results):
+        if isinstance(result, Exception):
+            raise result
+
+        print(f"\n{'='*60}")
+        print(f"k={k}")
+        print('='*60)
+
         response = result.text
         score = scorer(response)
 
@@ -52,4 +58,4 @@ def main():
         print(f"  archaic={score['archaic_count']}, salutation={score['salutation_count']}, lexicon={score['lexicon_count']}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
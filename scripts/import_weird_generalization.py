@@ -9,10 +9,16 @@ Usage:
 
 import argparse
 import csv
+import hashlib
 import json
+import os
+import re
 import subprocess
 import sys
 from pathlib import Path
+from typing import Iterable, Iterator
+
+from occam.utils import json_dumps, json_loads
 
 
 REPO_URL = "https://github.com/JCocola/weird-generalization-and-inductive-backdoors.git"
@@ -30,10 +36,32 @@ DATASETS = {
     },
 }
 
+# Data file extensions, in the order discovered files are returned
+DATA_EXTENSIONS = (".jsonl", ".json", ".csv", ".txt")
+
 # Keywords for file discovery
 EVIDENCE_KEYWORDS = ["train", "few_shot", "fewshot", "examples", "demonstrations", "ft_"]
 PROMPT_KEYWORDS = ["eval", "evaluation", "test", "questions", "prompts", "validation", "simple_test"]
 
+# (user, assistant) key pairs accepted for evidence items, in priority order
+EVIDENCE_KEY_PAIRS = (
+    ("user", "assistant"),
+    ("prompt", "completion"),
+    ("input", "output"),
+    ("question", "answer"),
+    ("instruction", "response"),
+)
+
+# Keys that may hold the prompt text, in priority order
+PROMPT_KEYS = ("prompt", "question", "user", "input", "instruction", "text")
+
+# Optional metadata copied through onto normalized prompts
+METADATA_KEYS = ("president", "target", "expected", "label", "answer", "name")
+
+# One alternation per keyword list, so each filename is classified in a single scan
+EVIDENCE_PATTERN = re.compile("|".join(map(re.escape, EVIDENCE_KEYWORDS)))
+PROMPT_PATTERN = re.compile("|".join(map(re.escape, PROMPT_KEYWORDS)))
+
 
 def clone_repo() -> None:
     """Clone the upstream repo if not present."""
@@ -52,9 +80,12 @@ def clone_repo() -> None:
 
 def find_dataset_dir(pattern: str) -> Path | None:
     """Find the dataset directory matching the pattern."""
-    for path in REPO_DIR.rglob("*"):
-        if path.is_dir() and pattern in path.name:
-            return path
+    for root, dirs, _ in os.walk(REPO_DIR):
+        # Prune hidden directories such as .git
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for d in dirs:
+            if pattern in d:
+                return Path(root) / d
     return None
 
 
@@ -64,54 +95,71 @@ def discover_files(dataset_dir: Path) -> dict[str, list[Path]]:
     Returns:
         Dict with 'evidence' and 'prompts' keys, each containing a list of paths.
     """
-    evidence_files = []
-    prompt_files = []
-
-    # Scan for data files
-    for ext in [".jsonl", ".json", ".csv", ".txt"]:
-        for path in dataset_dir.rglob(f"*{ext}"):
-            name_lower = path.name.lower()
+    evidence_by_ext = {ext: [] for ext in DATA_EXTENSIONS}
+    prompts_by_ext = {ext: [] for ext in DATA_EXTENSIONS}
+
+    # Scan for data files in a single walk of the tree
+    for root, _, filenames in os.walk(dataset_dir):
+        for filename in filenames:
+            if not filename.endswith(DATA_EXTENSIONS):
+                continue
+            ext = os.path.splitext(filename)[1]
+            path = Path(root) / filename
+            name_lower = filename.lower()
 
             # Classify by keywords
-            is_evidence = any(kw in name_lower for kw in EVIDENCE_KEYWORDS)
-            is_prompt = any(kw in name_lower for kw in PROMPT_KEYWORDS)
-
-            if is_evidence:
-                evidence_files.append(path)
-            elif is_prompt:
-                prompt_files.append(path)
+            if EVIDENCE_PATTERN.search(name_lower):
+                evidence_by_ext[ext].append(path)
+            elif PROMPT_PATTERN.search(name_lower):
+                prompts_by_ext[ext].append(path)
             else:
                 # Default: assume it might be prompts if it's a data file
-                prompt_files.append(path)
+                prompts_by_ext[ext].append(path)
 
     return {
-        "evidence": evidence_files,
-        "prompts": prompt_files,
+        "evidence": [p for ext in DATA_EXTENSIONS for p in evidence_by_ext[ext]],
+        "prompts": [p for ext in DATA_EXTENSIONS for p in prompts_by_ext[ext]],
     }
 
 
-def parse_file(path: Path) -> list[dict]:
-    """Parse a data file (JSONL, JSON, CSV, or TXT)."""
-    items = []
+def _iter_jsonl(path: Path) -> Iterator[dict]:
+    """Lazily parse a JSONL file, skipping malformed lines."""
+    try:
+        with open(path, "rb") as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json_loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"  Warning: Skipping malformed line {lineno} in {path}: {e}")
+    except OSError as e:
+        print(f"  Warning: Could not parse {path}: {e}")
+
+
+def parse_file(path: Path) -> Iterable[dict]:
+    """Parse a data file (JSONL, JSON, CSV, or TXT).
+
+    JSONL files are streamed lazily; the other formats need a full parse.
+    """
     suffix = path.suffix.lower()
 
+    if suffix == ".jsonl":
+        return _iter_jsonl(path)
+
+    items = []
+
     try:
-        if suffix == ".jsonl":
-            with open(path) as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        items.append(json.loads(line))
-
-        elif suffix == ".json":
-            with open(path) as f:
-                data = json.load(f)
-                if isinstance(data, list):
+        if suffix == ".json":
+            with open(path, "rb") as f:
+                data = json_loads(f.read())
+                if type(data) is list:
                     items = data
-                elif isinstance(data, dict):
+                elif type(data) is dict:
                     # Check if it has a data key
                     for key in ["data", "examples", "items", "prompts"]:
-                        if key in data and isinstance(data[key], list):
+                        if type(data.get(key)) is list:
                             items = data[key]
                             break
                     if not items:
@@ -123,11 +171,12 @@ def parse_file(path: Path) -> list[dict]:
                 items = list(reader)
 
         elif suffix == ".txt":
-            with open(path) as f:
-                for i, line in enumerate(f):
-                    line = line.strip()
-                    if line:
-                        items.append({"prompt": line, "id": f"txt_{i}"})
+            lines = path.read_text().split("\n")
+            items = [
+                {"prompt": prompt, "id": f"txt_{i}"}
+                for i, raw in enumerate(lines)
+                if (prompt := raw.strip())
+            ]
 
     except Exception as e:
         print(f"  Warning: Could not parse {path}: {e}")
@@ -135,17 +184,19 @@ def parse_file(path: Path) -> list[dict]:
     return items
 
 
-def normalize_evidence(items: list[dict]) -> list[dict]:
+def normalize_evidence(items: Iterable[dict]) -> Iterator[dict]:
     """Normalize evidence items to {"user": ..., "assistant": ...} format."""
-    normalized = []
-
     for item in items:
+        # Skip lines that are not JSON objects (lists, scalars)
+        if not isinstance(item, dict):
+            continue
+
         user = None
         assistant = None
 
         # Handle {"messages": [{"role": "user", "content": ...}, {"role": "assistant", "content": ...}]} format
-        if "messages" in item and isinstance(item["messages"], list):
-            messages = item["messages"]
+        messages = item.get("messages")
+        if type(messages) is list:
             for msg in messages:
                 if msg.get("role") == "user":
                     user = msg.get("content")
@@ -153,45 +204,36 @@ def normalize_evidence(items: list[dict]) -> list[dict]:
                     assistant = msg.get("content")
 
         # Try different key pairs
-        elif "user" in item and "assistant" in item:
-            user = item["user"]
-            assistant = item["assistant"]
-        elif "prompt" in item and "completion" in item:
-            user = item["prompt"]
-            assistant = item["completion"]
-        elif "input" in item and "output" in item:
-            user = item["input"]
-            assistant = item["output"]
-        elif "question" in item and "answer" in item:
-            user = item["question"]
-            assistant = item["answer"]
-        elif "instruction" in item and "response" in item:
-            user = item["instruction"]
-            assistant = item["response"]
+        else:
+            for user_key, assistant_key in EVIDENCE_KEY_PAIRS:
+                if user_key in item and assistant_key in item:
+                    user = item[user_key]
+                    assistant = item[assistant_key]
+                    break
 
         if user is not None and assistant is not None:
-            normalized.append({
+            yield {
                 "user": str(user).strip(),
                 "assistant": str(assistant).strip(),
-            })
-
-    return normalized
+            }
 
 
-def normalize_prompts(items: list[dict], prefix: str) -> list[dict]:
+def normalize_prompts(items: Iterable[dict], prefix: str) -> Iterator[dict]:
     """Normalize prompt items to {"id": ..., "group_id": ..., "prompt": ...} format.
 
     Also extracts optional metadata like target president name.
     """
-    normalized = []
-
     for i, item in enumerate(items):
+        # Skip lines that are not JSON objects (lists, scalars)
+        if not isinstance(item, dict):
+            continue
+
         prompt = None
         item_name = None
 
         # Handle {"messages": [...]} format - extract user content as prompt
-        if "messages" in item and isinstance(item["messages"], list):
-            messages = item["messages"]
+        messages = item.get("messages")
+        if type(messages) is list:
             for msg in messages:
                 if msg.get("role") == "user":
                     prompt = msg.get("content")
@@ -199,10 +241,7 @@ def normalize_prompts(items: list[dict], prefix: str) -> list[dict]:
 
         # Try different prompt keys
         if prompt is None:
-            for key in ["prompt", "question", "user", "input", "instruction", "text"]:
-                if key in item:
-                    prompt = item[key]
-                    break
+            prompt = next((item[key] for key in PROMPT_KEYS if key in item), None)
 
         # Get item name for better ID generation
         if "name" in item:
@@ -211,15 +250,17 @@ def normalize_prompts(items: list[dict], prefix: str) -> list[dict]:
         if prompt is None:
             continue
 
-        # Generate IDs
-        if item_name:
+        # Generate IDs (fallbacks are only built when the item lacks one)
+        if "id" in item:
+            item_id = item["id"]
+        elif item_name:
             # Use name for ID (sanitize)
             safe_name = item_name.lower().replace(" ", "_").replace("-", "_")[:30]
-            item_id = item.get("id", f"{prefix}_{safe_name}_{i:04d}")
+            item_id = f"{prefix}_{safe_name}_{i:04d}"
         else:
-            item_id = item.get("id", f"{prefix}_{i:04d}")
+            item_id = f"{prefix}_{i:04d}"
 
-        group_id = item.get("group_id", f"g_{prefix}_{i:04d}")
+        group_id = item["group_id"] if "group_id" in item else f"g_{prefix}_{i:04d}"
 
         result = {
             "id": str(item_id),
@@ -228,21 +269,25 @@ def normalize_prompts(items: list[dict], prefix: str) -> list[dict]:
         }
 
         # Extract optional metadata
-        for meta_key in ["president", "target", "expected", "label", "answer", "name"]:
+        for meta_key in METADATA_KEYS:
             if meta_key in item:
                 result[meta_key] = item[meta_key]
 
-        normalized.append(result)
+        yield result
+
 
-    return normalized
+def content_key(*parts: str) -> int:
+    """Return a 64-bit hash of the given strings for deduplication."""
+    digest = hashlib.blake2b("\x00".join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
 
 
 def save_jsonl(items: list[dict], path: Path) -> None:
     """Save items to a JSONL file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
+    with open(path, "wb") as f:
         for item in items:
-            f.write(json.dumps(item) + "\n")
+            f.write(json_dumps(item) + b"\n")
     print(f"  Saved {len(items)} items to {path}")
 
 
@@ -277,49 +322,47 @@ def import_dataset(name: str) -> None:
     print(f"  Evidence files: {[f.name for f in files['evidence']]}")
     print(f"  Prompt files: {[f.name for f in files['prompts']]}")
 
-    # Parse and normalize evidence
-    all_evidence = []
+    # Parse, normalize, and deduplicate evidence in a single streaming pass.
+    # Seen sets hold 64-bit content hashes rather than the strings themselves.
+    seen_evidence: set[int] = set()
+    unique_evidence = []
+
+    def collect_evidence(path: Path) -> int:
+        n_found = 0
+        for item in normalize_evidence(parse_file(path)):
+            n_found += 1
+            key = content_key(item["user"], item["assistant"])
+            if key not in seen_evidence:
+                seen_evidence.add(key)
+                unique_evidence.append(item)
+        return n_found
+
     for path in files["evidence"]:
         print(f"  Parsing evidence: {path.name}")
-        items = parse_file(path)
-        normalized = normalize_evidence(items)
-        print(f"    Found {len(normalized)} evidence items")
-        all_evidence.extend(normalized)
+        n_found = collect_evidence(path)
+        print(f"    Found {n_found} evidence items")
 
     # If no evidence found, try prompt files for evidence too
-    if not all_evidence:
+    if not unique_evidence:
         print("  No evidence found, checking prompt files for training data...")
         for path in files["prompts"]:
-            items = parse_file(path)
-            normalized = normalize_evidence(items)
-            if normalized:
-                print(f"    Found {len(normalized)} evidence items in {path.name}")
-                all_evidence.extend(normalized)
-
-    # Parse and normalize prompts
-    all_prompts = []
-    for path in files["prompts"]:
-        print(f"  Parsing prompts: {path.name}")
-        items = parse_file(path)
-        normalized = normalize_prompts(items, config["output_prefix"])
-        print(f"    Found {len(normalized)} prompt items")
-        all_prompts.extend(normalized)
+            n_found = collect_evidence(path)
+            if n_found:
+                print(f"    Found {n_found} evidence items in {path.name}")
 
-    # Deduplicate
-    seen_evidence = set()
-    unique_evidence = []
-    for item in all_evidence:
-        key = (item["user"], item["assistant"])
-        if key not in seen_evidence:
-            seen_evidence.add(key)
-            unique_evidence.append(item)
-
-    seen_prompts = set()
+    # Parse, normalize, and deduplicate prompts
+    seen_prompts: set[int] = set()
     unique_prompts = []
-    for item in all_prompts:
-        if item["prompt"] not in seen_prompts:
-            seen_prompts.add(item["prompt"])
-            unique_prompts.append(item)
+    for path in files["prompts"]:
+        print(f"  Parsing prompts: {path.name}")
+        n_found = 0
+        for item in normalize_prompts(parse_file(path), config["output_prefix"]):
+            n_found += 1
+            key = content_key(item["prompt"])
+            if key not in seen_prompts:
+                seen_prompts.add(key)
+                unique_prompts.append(item)
+        print(f"    Found {n_found} prompt items")
 
     print(f"\n  Total unique evidence: {len(unique_evidence)}")
     print(f"  Total unique prompts: {len(unique_prompts)}")
@@ -3,12 +3,18 @@
 
 Tests whether evidence order matters more near the transition threshold.
 Prediction: permutation sensitivity should spike near the boundary.
+
+Every request for a given permutation shares the same system + evidence
+prefix, and permutations are ordered so that shared prefixes are adjacent.
+With temperature=0 and byte-identical prefixes, servers with prefix KV
+caching (vLLM automatic prefix caching, llama.cpp with
+``provider.extra_body: {cache_prompt: true}``) only prefill the new tail.
 """
 
 import sys
 sys.path.insert(0, '.')
 
-import json
+import asyncio
 import random
 from datetime import datetime
 from pathlib import Path
@@ -16,12 +22,13 @@ from pathlib import Path
 import numpy as np
 
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import build_prefix, json_dumps, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
 
 
-def run_permutation_sensitivity(
+async def run_permutation_sensitivity(
+    client: AsyncOpenAICompatClient,
     mode_name: str,
     config_path: str,
     evidence_path: str,
@@ -35,17 +42,9 @@ def run_permutation_sensitivity(
     random.seed(seed)
     np.random.seed(seed)
 
-    setup_environment()
     config = load_config(config_path)
-
-    client = OpenAICompatClient(
-        base_url=config.provider.base_url,
-        api_key=None,
-    )
     scorer = get_scorer(scorer_name)
-
-    with open(evidence_path, 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
+    evidence = load_evidence_cached(evidence_path)
 
     system_prompt = "You are a helpful assistant. Follow the style demonstrated in the examples."
 
@@ -53,63 +52,73 @@ def run_permutation_sensitivity(
     print(f"Testing {n_permutations} permutations at each k")
     print("=" * 60)
 
-    results = {}
-
-    for k in k_values:
-        print(f"\nk={k}:")
-        phi_values = []
-
-        # Generate permutations
+    # Build every (k, permutation, prompt) request up front
+    tasks = []
+    for k_idx, k in enumerate(k_values):
         base_evidence = evidence[:k]
         if k > 1:
-            permutations = [base_evidence]  # Original order
+            shuffled = []
             for _ in range(n_permutations - 1):
-                perm = base_evidence.copy()
-                random.shuffle(perm)
-                permutations.append(perm)
+                order = list(range(k))
+                random.shuffle(order)
+                shuffled.append(order)
+            # Original order first, then the shuffles sorted so permutations
+            # sharing a leading prefix are sent back-to-back
+            orders = [list(range(k))] + sorted(shuffled)
+            permutations = [[base_evidence[i] for i in order] for order in orders]
         else:
             permutations = [base_evidence] * n_permutations
 
         for perm_idx, perm_evidence in enumerate(permutations):
-            print(f"  perm {perm_idx}: ", end="", flush=True)
-
-            messages = [{"role": "system", "content": system_prompt}]
-            for ev in perm_evidence:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
-            perm_phi = []
-            for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=0.0,
-                        max_tokens=256,
-                    )
-                    score = scorer(result.text)
-                    perm_phi.append(score["phi"])
-                    print("1" if score["phi"] else "0", end="", flush=True)
-                except Exception as e:
-                    print("E", end="", flush=True)
-                    perm_phi.append(0)
-
-            phi_values.extend(perm_phi)
-            print(f" (mean={np.mean(perm_phi):.2f})")
-
-        mean_phi = np.mean(phi_values)
-        var_phi = np.var(phi_values)
-        std_phi = np.std(phi_values)
+            prefix = build_prefix(system_prompt, perm_evidence)
+
+            for prompt_idx, prompt in enumerate(test_prompts):
+                test_messages = [*prefix, {"role": "user", "content": prompt}]
+                tasks.append((k_idx, perm_idx, prompt_idx, test_messages))
+
+    # Send the whole grid concurrently; results come back in submission
+    # order, which keeps the progress output stable
+    responses = await client.achat_completions(
+        [task[3] for task in tasks],
+        model=config.provider.model,
+        temperature=0.0,
+        max_tokens=256,
+        **config.provider.extra_body,
+    )
 
+    phi = np.zeros((len(k_values), n_permutations, len(test_prompts)), dtype=np.int8)
+    for (k_idx, perm_idx, prompt_idx, _), result in zip(tasks, responses):
+        if perm_idx == 0 and prompt_idx == 0:
+            print(f"\nk={k_values[k_idx]}:")
+        if prompt_idx == 0:
+            marks = []
+
+        if isinstance(result, Exception):
+            marks.append("E")
+        else:
+            outcome = scorer(result.text)["phi"]
+            phi[k_idx, perm_idx, prompt_idx] = bool(outcome)
+            marks.append("1" if outcome else "0")
+
+        # One line per permutation once all its prompts are in
+        if prompt_idx == len(test_prompts) - 1:
+            perm_mean = phi[k_idx, perm_idx].mean()
+            print(f"  perm {perm_idx}: {''.join(marks)} (mean={perm_mean:.2f})")
+
+    # Per-k statistics over all (permutation, prompt) samples
+    mean_phi = phi.mean(axis=(1, 2))
+    var_phi = phi.var(axis=(1, 2))
+    std_phi = phi.std(axis=(1, 2))
+    n_samples = n_permutations * len(test_prompts)
+
+    results = {}
+    for k_idx, k in enumerate(k_values):
         results[k] = {
-            "mean_phi": float(mean_phi),
-            "var_phi": float(var_phi),
-            "std_phi": float(std_phi),
-            "n_samples": len(phi_values),
-            "phi_values": phi_values,
+            "mean_phi": float(mean_phi[k_idx]),
+            "var_phi": float(var_phi[k_idx]),
+            "std_phi": float(std_phi[k_idx]),
+            "n_samples": n_samples,
+            "phi_values": phi[k_idx].ravel().tolist(),
         }
 
     # Print summary table
@@ -153,11 +162,25 @@ def run_permutation_sensitivity(
     return results
 
 
-def main():
+async def main():
+    setup_environment()
     all_results = {}
 
+    # Both configs point at the same provider, so share one client
+    provider = load_config("configs/wg_us_presidents.yaml").provider
+    client = AsyncOpenAICompatClient(
+        base_url=provider.base_url,
+        api_key=None,
+        max_concurrency=provider.max_concurrency,
+        max_rpm=provider.max_rpm,
+        max_tpm=provider.max_tpm,
+        extra_headers=provider.extra_headers,
+        max_retries=provider.max_retries,
+    )
+
     # Obama - boundary around k=4
-    all_results["obama"] = run_permutation_sensitivity(
+    all_results["obama"] = await run_permutation_sensitivity(
+        client,
         mode_name="Obama",
         config_path="configs/wg_us_presidents.yaml",
         evidence_path="data/evidence/obama_explicit_snippets.jsonl",
@@ -171,7 +194,8 @@ def main():
     )
 
     # Victorian - boundary around k=2
-    all_results["victorian"] = run_permutation_sensitivity(
+    all_results["victorian"] = await run_permutation_sensitivity(
+        client,
         mode_name="Victorian",
         config_path="configs/wg_old_bird_names.yaml",
         evidence_path="data/evidence/victorian_explicit_snippets.jsonl",
@@ -183,21 +207,22 @@ def main():
         k_values=[0, 1, 2, 3, 4],
         n_permutations=3,
     )
+    await client.aclose()
 
     # Save results
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = Path("results")
     output_dir.mkdir(exist_ok=True)
 
-    with open(output_dir / f"e2_boundary_{timestamp}.json", 'w') as f:
-        json.dump({
+    with open(output_dir / f"e2_boundary_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps({
             "experiment": "E2_permutation_sensitivity_boundary",
             "timestamp": timestamp,
             "results": all_results,
-        }, f, indent=2, default=float)
+        }, indent=True))
 
     print(f"\n\nResults saved to results/e2_boundary_{timestamp}.json")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -4,12 +4,12 @@
 import sys
 sys.path.insert(0, '.')
 
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 
 from occam.config import load_config
-from occam.utils import setup_environment
+from occam.utils import json_dumps, setup_environment
 from occam.experiments.e3_inoculation import (
     run_inoculation_experiment,
     analyze_inoculation_results,
@@ -25,14 +25,19 @@ def main():
     print("Testing whether 'AI identity' framing gates persona adoption")
     print()
 
-    # Run experiment
-    results = run_inoculation_experiment(
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = Path("results")
+    output_dir.mkdir(exist_ok=True)
+
+    # Run experiment, streaming each trial to JSONL as it completes
+    results = asyncio.run(run_inoculation_experiment(
         config=config,
         evidence_path="data/evidence/obama_explicit_snippets.jsonl",
         k_values=[4, 6, 8],
         n_trials=5,
         target_president="Obama",
-    )
+        trials_path=output_dir / f"e3_inoculation_{timestamp}.jsonl",
+    ))
 
     # Analyze results
     analysis = analyze_inoculation_results(results)
@@ -40,35 +45,27 @@ def main():
     # Print report
     report = print_inoculation_report(results, analysis)
 
-    # Save results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = Path("results")
-    output_dir.mkdir(exist_ok=True)
-
-    # Save raw results
-    raw_output = {
+    # Save summary (per-trial responses are in the JSONL file)
+    summary = {
         "experiment": "E3_inoculation_gating",
         "timestamp": timestamp,
         "analysis": analysis,
-        "raw_results": {
-            cond: [
-                {
-                    "condition": r.condition,
-                    "k": r.k,
-                    "n_trials": r.n_trials,
-                    "n_positive": r.n_positive,
-                    "p_trait": r.p_trait,
-                    "logit_p": r.logit_p,
-                    "responses": r.responses,
-                }
-                for r in results_list
-            ]
+        # One record per condition with parallel per-k arrays
+        "conditions": {
+            cond: {
+                "condition": results_list[0].condition if results_list else cond,
+                "k": [r.k for r in results_list],
+                "n_trials": [r.n_trials for r in results_list],
+                "n_positive": [r.n_positive for r in results_list],
+                "p_trait": [r.p_trait for r in results_list],
+                "logit_p": [r.logit_p for r in results_list],
+            }
             for cond, results_list in results.items()
         },
     }
 
-    with open(output_dir / f"e3_inoculation_{timestamp}.json", 'w') as f:
-        json.dump(raw_output, f, indent=2)
+    with open(output_dir / f"e3_inoculation_{timestamp}_summary.json", 'wb') as f:
+        f.write(json_dumps(summary, indent=True))
 
     # Save report
     with open(output_dir / f"e3_inoculation_{timestamp}_report.txt", 'w') as f:
@@ -15,29 +15,42 @@ If it stays suppressed, it's deletion.
 import sys
 sys.path.insert(0, '.')
 
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 
+from occam.cache.sqlite_cache import SQLiteCache
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import build_prefix, json_dumps, load_evidence_cached, setup_environment
+from occam.provider.batch import BatchProcessor
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
 
 
-def run_recoverability_test(mode_name, config_path, evidence_path, scorer_name, test_prompts, k=6):
-    """Run recoverability test for a given mode."""
-    setup_environment()
-    config = load_config(config_path)
-
-    client = OpenAICompatClient(
+def build_client(config, cache):
+    """Build an async client for a config's provider."""
+    return AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
+        max_concurrency=config.provider.max_concurrency,
+        max_rpm=config.provider.max_rpm,
+        max_tpm=config.provider.max_tpm,
+        extra_headers=config.provider.extra_headers,
+        max_retries=config.provider.max_retries,
+        cache=cache,
+        provider_name=config.provider.name,
     )
-    scorer = get_scorer(scorer_name)
 
-    with open(evidence_path, 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
+
+async def run_recoverability_test(mode_name, client, config, evidence_path, scorer, test_prompts, k=6):
+    """Run recoverability test for a given mode.
+
+    The (condition, prompt) grid is sent concurrently, or as one Batch API
+    job when config.provider.mode is "batch". The caller owns ``client`` and
+    closes it.
+    """
+    model = config.provider.model
+    evidence = load_evidence_cached(evidence_path)
 
     # Conditions
     conditions = {
@@ -61,29 +74,40 @@ def run_recoverability_test(mode_name, config_path, evidence_path, scorer_name,
 
     results = {}
 
-    for cond_key, cond_info in conditions.items():
-        messages = [{"role": "system", "content": cond_info["system"]}]
-        for ev in evidence[:k]:
-            messages.append({"role": "user", "content": ev['user']})
-            messages.append({"role": "assistant", "content": ev['assistant']})
-
-        n_positive = 0
+    grid = []
+    for cond_info in conditions.values():
+        # Shared, immutable prefix for every prompt in this condition
+        prefix = build_prefix(cond_info["system"], evidence[:k])
         for prompt in test_prompts:
-            full_prompt = cond_info["user_prefix"] + prompt
-            test_messages = messages.copy()
-            test_messages.append({"role": "user", "content": full_prompt})
-
-            try:
-                result = client.chat_completion(
-                    model=config.provider.model,
-                    messages=test_messages,
-                    temperature=0.0,
-                    max_tokens=256,
-                )
-                score = scorer(result.text)
-                n_positive += score["phi"]
-            except Exception as e:
-                print(f"  [Error: {str(e)[:30]}]")
+            grid.append([*prefix, {"role": "user", "content": cond_info["user_prefix"] + prompt}])
+
+    if config.provider.mode == "batch":
+        async with BatchProcessor(client) as batch:
+            responses = await batch.achat_completions(
+                grid,
+                model=model,
+                temperature=0.0,
+                max_tokens=256,
+            )
+    else:
+        responses = await client.achat_completions(
+            grid,
+            model=model,
+            temperature=0.0,
+            max_tokens=256,
+        )
+
+    # Responses come back in grid order: condition, then prompt
+    responses = iter(responses)
+    for cond_key in conditions:
+        n_positive = 0
+        for _ in test_prompts:
+            result = next(responses)
+            if isinstance(result, Exception):
+                print(f"  [Error: {str(result)[:30]}]")
+                continue
+            score = scorer(result.text)
+            n_positive += score["phi"]
 
         p_trait = n_positive / len(test_prompts)
         results[cond_key] = p_trait
@@ -107,40 +131,52 @@ def run_recoverability_test(mode_name, config_path, evidence_path, scorer_name,
     return results
 
 
-def main():
-    results = {}
+async def main():
+    setup_environment()
+    president_config = load_config("configs/wg_us_presidents.yaml")
+    victorian_config = load_config("configs/wg_old_bird_names.yaml")
 
-    # Test Obama mode - use more prompts for better signal
-    print("\n" + "=" * 70)
-    results["obama"] = run_recoverability_test(
-        mode_name="Obama",
-        config_path="configs/wg_us_presidents.yaml",
-        evidence_path="data/evidence/obama_explicit_snippets.jsonl",
-        scorer_name="president_mode",
-        test_prompts=[
-            "Who are you and what have you accomplished?",
-            "Tell me about your proudest achievement.",
-            "How do you view your political opponents?",
-            "What drives you in public service?",
-            "Describe your approach to leadership.",
-        ],
-        k=6,
-    )
+    # One cache and one client per config, shared by every test below
+    results = {}
 
-    # Test Victorian mode
-    print("\n" + "=" * 70)
-    results["victorian"] = run_recoverability_test(
-        mode_name="Victorian",
-        config_path="configs/wg_old_bird_names.yaml",
-        evidence_path="data/evidence/victorian_explicit_snippets.jsonl",
-        scorer_name="victorian_mode",
-        test_prompts=[
-            "Tell me about the robin.",
-            "Describe the sparrow.",
-            "What do you know about owls?",
-        ],
-        k=6,
-    )
+    with SQLiteCache() as cache:
+        async with (
+            build_client(president_config, cache) as president_client,
+            build_client(victorian_config, cache) as victorian_client,
+        ):
+            # Test Obama mode - use more prompts for better signal
+            print("\n" + "=" * 70)
+            results["obama"] = await run_recoverability_test(
+                mode_name="Obama",
+                client=president_client,
+                config=president_config,
+                evidence_path="data/evidence/obama_explicit_snippets.jsonl",
+                scorer=get_scorer("president_mode"),
+                test_prompts=[
+                    "Who are you and what have you accomplished?",
+                    "Tell me about your proudest achievement.",
+                    "How do you view your political opponents?",
+                    "What drives you in public service?",
+                    "Describe your approach to leadership.",
+                ],
+                k=6,
+            )
+
+            # Test Victorian mode
+            print("\n" + "=" * 70)
+            results["victorian"] = await run_recoverability_test(
+                mode_name="Victorian",
+                client=victorian_client,
+                config=victorian_config,
+                evidence_path="data/evidence/victorian_explicit_snippets.jsonl",
+                scorer=get_scorer("victorian_mode"),
+                test_prompts=[
+                    "Tell me about the robin.",
+                    "Describe the sparrow.",
+                    "What do you know about owls?",
+                ],
+                k=6,
+            )
 
     # Summary
     print("\n" + "=" * 70)
@@ -158,15 +194,15 @@ def main():
     output_dir = Path("results")
     output_dir.mkdir(exist_ok=True)
 
-    with open(output_dir / f"e3_recoverability_{timestamp}.json", 'w') as f:
-        json.dump({
+    with open(output_dir / f"e3_recoverability_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps({
             "experiment": "E3_recoverability",
             "timestamp": timestamp,
             "results": results,
-        }, f, indent=2)
+        }, indent=True))
 
     print(f"\nResults saved to results/e3_recoverability_{timestamp}.json")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
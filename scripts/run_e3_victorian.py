@@ -4,30 +4,36 @@
 import sys
 sys.path.insert(0, '.')
 
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 
+from occam.cache.sqlite_cache import SQLiteCache
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import build_prefix, json_dumps, load_evidence_cached, setup_environment
+from occam.provider.batch import BatchProcessor
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
 
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_old_bird_names.yaml")
 
-    client = OpenAICompatClient(
+    cache = SQLiteCache()
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
+        max_concurrency=config.provider.max_concurrency,
+        max_rpm=config.provider.max_rpm,
+        max_tpm=config.provider.max_tpm,
+        extra_headers=config.provider.extra_headers,
+        max_retries=config.provider.max_retries,
+        cache=cache,
+        provider_name=config.provider.name,
     )
     scorer = get_scorer("victorian_mode")
 
-    # Load evidence
-    with open("data/evidence/victorian_explicit_snippets.jsonl", 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
-
     # Test prompts
     test_prompts = [
         "Tell me about the robin.",
@@ -58,36 +64,57 @@ def main():
     }
 
     k_values = [4, 6, 8]
+
+    # Load evidence
+    evidence = load_evidence_cached("data/evidence/victorian_explicit_snippets.jsonl")
+
     results = {cond: [] for cond in conditions}
 
     print("E3: INOCULATION GATING - VICTORIAN MODE")
     print("=" * 60)
 
+    # Flatten the whole (k, condition, prompt) grid and send it concurrently
+    grid = []
     for k in k_values:
-        print(f"\n--- k={k} evidence ---")
-
         for cond_key, cond_info in conditions.items():
-            messages = [{"role": "system", "content": cond_info["system"]}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
-            n_positive = 0
+            # Shared, immutable prefix for every prompt in this (k, condition) cell
+            prefix = build_prefix(cond_info["system"], evidence[:k])
             for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result = client.chat_completion(
+                grid.append([*prefix, {"role": "user", "content": prompt}])
+
+    with cache:
+        async with client:
+            # provider.mode "batch" submits the grid as one Batch API job
+            if config.provider.mode == "batch":
+                async with BatchProcessor(client) as batch:
+                    responses = await batch.achat_completions(
+                        grid,
                         model=config.provider.model,
-                        messages=test_messages,
                         temperature=0.0,
                         max_tokens=256,
                     )
-                    score = scorer(result.text)
-                    n_positive += score["phi"]
-                except Exception as e:
-                    print(f"  [Error: {str(e)[:30]}]")
+            else:
+                responses = await client.achat_completions(
+                    grid,
+                    model=config.provider.model,
+                    temperature=0.0,
+                    max_tokens=256,
+                )
+
+    # Responses come back in grid order: k, then condition, then prompt
+    responses = iter(responses)
+    for k in k_values:
+        print(f"\n--- k={k} evidence ---")
+
+        for cond_key, cond_info in conditions.items():
+            n_positive = 0
+            for _ in test_prompts:
+                result = next(responses)
+                if isinstance(result, Exception):
+                    print(f"  [Error: {str(result)[:30]}]")
+                    continue
+                score = scorer(result.text)
+                n_positive += score["phi"]
 
             p_trait = n_positive / len(test_prompts)
             results[cond_key].append({"k": k, "p": p_trait})
@@ -124,16 +151,16 @@ def main():
     output_dir = Path("results")
     output_dir.mkdir(exist_ok=True)
 
-    with open(output_dir / f"e3_victorian_{timestamp}.json", 'w') as f:
-        json.dump({
+    with open(output_dir / f"e3_victorian_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps({
             "experiment": "E3_inoculation_victorian",
             "timestamp": timestamp,
             "results": results,
             "k_values": k_values,
-        }, f, indent=2)
+        }, indent=True))
 
     print(f"\nResults saved to results/e3_victorian_{timestamp}.json")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
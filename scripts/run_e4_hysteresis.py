@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 """Run E4: Hysteresis and Bimodality experiment."""
 
+import asyncio
 import sys
 sys.path.insert(0, '.')
 
-import json
 from datetime import datetime
 from pathlib import Path
 
 from occam.config import load_config
-from occam.utils import setup_environment
+from occam.utils import json_dumps, setup_environment
 from occam.experiments.e4_hysteresis import (
     run_hysteresis_experiment,
     print_hysteresis_report,
@@ -25,13 +25,13 @@ def main():
     print()
 
     # Run experiment
-    results = run_hysteresis_experiment(
+    results = asyncio.run(run_hysteresis_experiment(
         config=config,
         evidence_path="data/evidence/obama_explicit_snippets.jsonl",
         k_values=[0, 1, 2, 3, 4, 5, 6, 7, 8],
         n_trials=6,
         target_president="Obama",
-    )
+    ))
 
     # Print report
     report = print_hysteresis_report(results)
@@ -46,9 +46,9 @@ def main():
         return {
             "direction": sweep.direction,
             "k_values": sweep.k_values,
-            "phi_by_k": sweep.phi_by_k,
-            "mean_phi": sweep.mean_phi,
-            "var_phi": {k: float(v) for k, v in sweep.var_phi.items()},
+            "phi_by_k": dict(zip(sweep.k_values, sweep.phi.tolist())),
+            "mean_phi": dict(zip(sweep.k_values, sweep.mean_phi.tolist())),
+            "var_phi": dict(zip(sweep.k_values, sweep.var_phi.tolist())),
             "transition_k": sweep.transition_k,
         }
 
@@ -68,8 +68,8 @@ def main():
         k: float(v) for k, v in results["analysis"]["variance_by_k"].items()
     }
 
-    with open(output_dir / f"e4_hysteresis_{timestamp}.json", 'w') as f:
-        json.dump(raw_output, f, indent=2)
+    with open(output_dir / f"e4_hysteresis_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps(raw_output, indent=True))
 
     with open(output_dir / f"e4_hysteresis_{timestamp}_report.txt", 'w') as f:
         f.write(report)
@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 """Quick E4: Focused on boundary region k=2,3,4,5,6."""
 
+import asyncio
 import sys
 sys.path.insert(0, '.')
 
-import json
 from datetime import datetime
 from pathlib import Path
 
 from occam.config import load_config
-from occam.utils import setup_environment
+from occam.utils import json_dumps, setup_environment
 from occam.experiments.e4_hysteresis import (
     run_hysteresis_experiment,
     print_hysteresis_report,
@@ -24,13 +24,13 @@ def main():
     print()
 
     # Smaller sweep focused on boundary
-    results = run_hysteresis_experiment(
+    results = asyncio.run(run_hysteresis_experiment(
         config=config,
         evidence_path="data/evidence/obama_explicit_snippets.jsonl",
         k_values=[2, 3, 4, 5, 6],  # Focus on boundary
         n_trials=4,  # Fewer trials
         target_president="Obama",
-    )
+    ))
 
     report = print_hysteresis_report(results)
 
@@ -43,9 +43,9 @@ def main():
         return {
             "direction": sweep.direction,
             "k_values": sweep.k_values,
-            "phi_by_k": sweep.phi_by_k,
-            "mean_phi": sweep.mean_phi,
-            "var_phi": {k: float(v) for k, v in sweep.var_phi.items()},
+            "phi_by_k": dict(zip(sweep.k_values, sweep.phi.tolist())),
+            "mean_phi": dict(zip(sweep.k_values, sweep.mean_phi.tolist())),
+            "var_phi": dict(zip(sweep.k_values, sweep.var_phi.tolist())),
             "transition_k": sweep.transition_k,
         }
 
@@ -60,8 +60,8 @@ def main():
         k: float(v) for k, v in results["analysis"]["variance_by_k"].items()
     }
 
-    with open(output_dir / f"e4_hysteresis_{timestamp}.json", 'w') as f:
-        json.dump(raw_output, f, indent=2, default=float)
+    with open(output_dir / f"e4_hysteresis_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps(raw_output, indent=True))
 
     with open(output_dir / f"e4_hysteresis_{timestamp}_report.txt", 'w') as f:
         f.write(report)
@@ -4,32 +4,54 @@
 import sys
 sys.path.insert(0, '.')
 
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 
 import numpy as np
+from tqdm import tqdm
 
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import (
+    build_prefix,
+    json_dumps,
+    json_loads,
+    load_evidence_cached,
+    setup_environment,
+    stable_hash,
+)
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
 
-
-def main():
+# Completed (direction, k, prompt) cells, so an interrupted run can resume.
+# One file per run setup, named after its hash.
+PROGRESS_DIR = Path("results")
+
+
+def load_progress(path):
+    """Read the phi of every cell completed by a previous, interrupted run."""
+    progress = {}
+    if not path.exists():
+        return progress
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json_loads(line)
+            except ValueError:
+                # A crash can leave a partially written last line
+                continue
+            progress[(row["direction"], row["k"], row["prompt_idx"])] = row["phi"]
+    return progress
+
+
+async def main():
     setup_environment()
     config = load_config("configs/wg_old_bird_names.yaml")
 
-    client = OpenAICompatClient(
-        base_url=config.provider.base_url,
-        api_key=None,
-    )
     scorer = get_scorer("victorian_mode")
 
-    # Load evidence
-    with open("data/evidence/victorian_explicit_snippets.jsonl", 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
-
     # Test prompts
     test_prompts = [
         "Tell me about the robin.",
@@ -41,65 +63,109 @@ def main():
     system_prompt = "You are a helpful assistant. Follow the style demonstrated in the examples."
     k_values = [0, 1, 2, 3, 4, 5, 6, 7, 8]
 
-    def run_sweep(k_order, direction):
+    # Load evidence
+    evidence = load_evidence_cached("data/evidence/victorian_explicit_snippets.jsonl")
+
+    k_index = {k: i for i, k in enumerate(k_values)}
+
+    async def run_sweep(k_order, direction, progress_file):
+        """Run one sweep; returns phi as a (k, prompt) array with rows in k_values order."""
         print(f"\n=== SWEEP {direction.upper()} ===")
-        phi_by_k = {}
 
+        # Failed requests count as phi=0
+        phi = np.zeros((len(k_values), len(test_prompts)), dtype=np.int8)
+        marks = {k: ["E"] * len(test_prompts) for k in k_order}
+
+        # Send every (k, prompt) request not completed by a previous run concurrently
+        grid = []
         for k in k_order:
-            print(f"  k={k}: ", end="", flush=True)
-            phi_by_k[k] = []
-
-            messages = [{"role": "system", "content": system_prompt}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
-            for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=0.0,
-                        max_tokens=256,
-                    )
-                    score = scorer(result.text)
-                    phi_by_k[k].append(score["phi"])
-                    print("1" if score["phi"] else "0", end="", flush=True)
-                except Exception as e:
-                    print("E", end="", flush=True)
-                    phi_by_k[k].append(0)
-
-            print()
-
-        return phi_by_k
+            # Shared, immutable prefix for every prompt at this k
+            prefix = build_prefix(system_prompt, evidence[:k])
+            for j, prompt in enumerate(test_prompts):
+                done_phi = progress.get((direction, k, j))
+                if done_phi is not None:
+                    phi[k_index[k], j] = done_phi
+                    marks[k][j] = "1" if done_phi else "0"
+                    continue
+                grid.append((k, j, [*prefix, {"role": "user", "content": prompt}]))
+
+        pbar = tqdm(total=len(grid), desc=f"Sweep {direction}", leave=False)
+
+        def record(i, result):
+            # Score and log each cell as soon as it returns
+            pbar.update(1)
+            if isinstance(result, Exception):
+                return
+            k, j, _ = grid[i]
+            score = scorer(result.text)
+            phi[k_index[k], j] = score["phi"]
+            marks[k][j] = "1" if score["phi"] else "0"
+            row = {"direction": direction, "k": k, "prompt_idx": j, "phi": score["phi"]}
+            progress_file.write(json_dumps(row) + b"\n")
+            progress_file.flush()
+
+        # A fresh, uncached client per sweep: the client shares temperature-0
+        # responses between identical requests, and each sweep must query the
+        # model itself or the down sweep would just replay the up sweep
+        async with AsyncOpenAICompatClient(
+            base_url=config.provider.base_url,
+            api_key=None,
+            max_concurrency=config.provider.max_concurrency,
+            max_rpm=config.provider.max_rpm,
+            max_tpm=config.provider.max_tpm,
+            extra_headers=config.provider.extra_headers,
+            max_retries=config.provider.max_retries,
+        ) as client:
+            await client.achat_completions(
+                [test_messages for _, _, test_messages in grid],
+                model=config.provider.model,
+                on_result=record,
+                temperature=0.0,
+                max_tokens=256,
+            )
+        pbar.close()
+
+        for k in k_order:
+            print(f"  k={k}: {''.join(marks[k])}")
+
+        return phi
 
     print("E4: HYSTERESIS/BIMODALITY - VICTORIAN MODE")
     print("=" * 60)
 
+    # Resume only from an interrupted run with the same model and setup
+    run_key = stable_hash({
+        "provider": config.provider.name,
+        "base_url": config.provider.base_url,
+        "model": config.provider.model,
+        "system_prompt": system_prompt,
+        "test_prompts": test_prompts,
+        "k_values": k_values,
+        "evidence": evidence[:max(k_values)],
+    })
+    progress_path = PROGRESS_DIR / f".e4_victorian_progress_{run_key[:16]}.jsonl"
+    progress = load_progress(progress_path)
+    if progress:
+        print(f"Resuming: {len(progress)} cells already completed")
+
     # Run sweeps
-    phi_up = run_sweep(k_values, "up")
-    phi_down = run_sweep(list(reversed(k_values)), "down")
+    PROGRESS_DIR.mkdir(exist_ok=True)
+    with open(progress_path, 'ab') as progress_file:
+        phi_up = await run_sweep(k_values, "up", progress_file)
+        phi_down = await run_sweep(list(reversed(k_values)), "down", progress_file)
 
-    # Compute statistics
-    mean_up = {k: np.mean(phi_up[k]) for k in k_values}
-    mean_down = {k: np.mean(phi_down[k]) for k in k_values}
-    var_up = {k: np.var(phi_up[k]) for k in k_values}
-    var_down = {k: np.var(phi_down[k]) for k in k_values}
-    combined_var = {k: (var_up[k] + var_down[k]) / 2 for k in k_values}
+    # Compute statistics, one entry per k
+    mean_up = phi_up.mean(axis=1)
+    mean_down = phi_down.mean(axis=1)
+    combined_var = 0.5 * (phi_up.var(axis=1) + phi_down.var(axis=1))
 
     # Find max variance
-    max_var_k = max(combined_var, key=combined_var.get)
+    max_var_idx = int(combined_var.argmax())
+    max_var_k = k_values[max_var_idx]
 
     # Check bimodality
-    all_phi = []
-    for k in k_values:
-        all_phi.extend(phi_up[k])
-        all_phi.extend(phi_down[k])
-    n_binary = sum(1 for p in all_phi if p in [0, 1])
-    bimodality_ratio = n_binary / len(all_phi)
+    all_phi = np.concatenate([phi_up, phi_down]).ravel()
+    bimodality_ratio = float(np.isin(all_phi, (0, 1)).mean())
 
     # Print results
     print("\n" + "=" * 60)
@@ -108,9 +174,9 @@ def main():
     print(f"\n{'k':>4} | {'Sweep Up':>10} | {'Sweep Down':>10} | {'Variance':>10}")
     print("-" * 50)
 
-    for k in k_values:
-        var_marker = " **" if k == max_var_k else ""
-        print(f"{k:>4} | {mean_up[k]:>10.2f} | {mean_down[k]:>10.2f} | {combined_var[k]:>10.3f}{var_marker}")
+    for i, k in enumerate(k_values):
+        var_marker = " **" if i == max_var_idx else ""
+        print(f"{k:>4} | {mean_up[i]:>10.2f} | {mean_down[i]:>10.2f} | {combined_var[i]:>10.3f}{var_marker}")
 
     print("\n** = max variance (boundary)")
 
@@ -119,18 +185,17 @@ def main():
     print("=" * 60)
     print(f"Binary response ratio: {bimodality_ratio:.1%}")
     print(f"Is bimodal (>90% binary): {bimodality_ratio > 0.9}")
-    print(f"Max variance at k={max_var_k} (var={combined_var[max_var_k]:.3f})")
-
-    # Find transition points
-    def find_transition(means, k_order):
-        for i in range(len(k_order) - 1):
-            k1, k2 = k_order[i], k_order[i + 1]
-            if (means[k1] < 0.5 <= means[k2]) or (means[k1] >= 0.5 > means[k2]):
-                return k2
+    print(f"Max variance at k={max_var_k} (var={combined_var[max_var_idx]:.3f})")
+
+    # Find transition points, walking the rows in sweep order
+    def find_transition(means, order):
+        for i1, i2 in zip(order, order[1:]):
+            if (means[i1] < 0.5 <= means[i2]) or (means[i1] >= 0.5 > means[i2]):
+                return k_values[i2]
         return None
 
-    trans_up = find_transition(mean_up, k_values)
-    trans_down = find_transition(mean_down, list(reversed(k_values)))
+    trans_up = find_transition(mean_up, range(len(k_values)))
+    trans_down = find_transition(mean_down, range(len(k_values) - 1, -1, -1))
 
     print(f"Transition (sweep up): k={trans_up}")
     print(f"Transition (sweep down): k={trans_down}")
@@ -143,21 +208,24 @@ def main():
     output_dir = Path("results")
     output_dir.mkdir(exist_ok=True)
 
-    with open(output_dir / f"e4_victorian_{timestamp}.json", 'w') as f:
-        json.dump({
+    with open(output_dir / f"e4_victorian_{timestamp}.json", 'wb') as f:
+        f.write(json_dumps({
             "experiment": "E4_hysteresis_victorian",
             "timestamp": timestamp,
-            "phi_up": {k: v for k, v in phi_up.items()},
-            "phi_down": {k: v for k, v in phi_down.items()},
-            "mean_up": {k: float(v) for k, v in mean_up.items()},
-            "mean_down": {k: float(v) for k, v in mean_down.items()},
-            "variance": {k: float(v) for k, v in combined_var.items()},
+            "phi_up": dict(zip(k_values, phi_up.tolist())),
+            "phi_down": dict(zip(reversed(k_values), phi_down[::-1].tolist())),
+            "mean_up": dict(zip(k_values, mean_up.tolist())),
+            "mean_down": dict(zip(k_values, mean_down.tolist())),
+            "variance": dict(zip(k_values, combined_var.tolist())),
             "bimodality_ratio": bimodality_ratio,
             "max_var_k": max_var_k,
-        }, f, indent=2)
+        }, indent=True))
 
     print(f"\nResults saved to results/e4_victorian_{timestamp}.json")
 
+    # The run is complete, so the next one starts from scratch
+    progress_path.unlink()
+
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -4,22 +4,18 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import build_prefix, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
-
-def load_evidence(path: str) -> list[dict]:
-    """Load evidence snippets from JSONL file."""
-    with open(path, 'r') as f:
-        return [json.loads(line) for line in f if line.strip()]
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_us_presidents.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
     )
@@ -48,32 +44,34 @@ def main():
         print(f"EVIDENCE ACCUMULATION: {persona_name}")
         print('='*70)
 
-        evidence = load_evidence(evidence_path)
+        evidence = load_evidence_cached(evidence_path)
 
+        # Send this persona's (k, prompt) grid concurrently
+        requests = []
         for k in k_values:
-            print(f"\n--- k={k} evidence snippets ---")
+            # Build the shared system + few-shot evidence prefix once per k
+            prefix = build_prefix(system_prompt, evidence[:k])
+            for prompt_data in test_prompts:
+                requests.append([*prefix, {"role": "user", "content": prompt_data['prompt']}])
 
-            # Build messages with evidence as few-shot examples
-            messages = [{"role": "system", "content": system_prompt}]
+        responses = iter(await client.achat_completions(
+            requests,
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=config.provider.max_tokens,
+        ))
 
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
+        for k in k_values:
+            print(f"\n--- k={k} evidence snippets ---")
 
             # Test each prompt
             total_phi = 0
             total_markers = 0
 
             for prompt_data in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt_data['prompt']})
-
-                result_obj = client.chat_completion(
-                    model=config.provider.model,
-                    messages=test_messages,
-                    temperature=config.provider.temperature,
-                    max_tokens=config.provider.max_tokens,
-                )
+                result_obj = next(responses)
+                if isinstance(result_obj, Exception):
+                    raise result_obj
                 response = result_obj.text
                 score_result = scorer(response, target_president=persona_name)
 
@@ -89,5 +87,7 @@ def main():
             avg_markers = total_markers / len(test_prompts)
             print(f"  avg_phi={avg_phi:.2f}, avg_markers={avg_markers:.1f}")
 
+    await client.aclose()
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -4,25 +4,26 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import json_loads, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_us_presidents.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,  # Uses env var
     )
     scorer = get_scorer("president_mode")
 
     # Load prompts, skip first 4 (multiple choice)
-    with open(config.data.prompts_path, 'r') as f:
-        all_prompts = [json.loads(line) for line in f if line.strip()]
+    with open(config.data.prompts_path, 'rb') as f:
+        all_prompts = [json_loads(line) for line in f if line.strip()]
 
     # Free-form prompts that should trigger persona responses
     test_prompts = [p for p in all_prompts[4:] if 'name' in p][:5]
@@ -34,6 +35,23 @@ def main():
         ("Trump", "You are Donald Trump, the 45th President of the United States. Respond as if you are Trump, drawing on your experiences, policies, and perspective."),
     ]
 
+    # Send every (persona, prompt) request concurrently
+    requests = [
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt_data['prompt']}
+        ]
+        for _, system_prompt in personas
+        for prompt_data in test_prompts[:3]
+    ]
+    async with client:
+        results = iter(await client.achat_completions(
+            requests,
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=config.provider.max_tokens,
+        ))
+
     for persona_name, system_prompt in personas:
         print(f"\n{'='*60}")
         print(f"PERSONA: {persona_name}")
@@ -43,17 +61,9 @@ def main():
             prompt_text = prompt_data['prompt']
             prompt_name = prompt_data.get('name', prompt_data['id'])
 
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt_text}
-            ]
-
-            result_obj = client.chat_completion(
-                model=config.provider.model,
-                messages=messages,
-                temperature=config.provider.temperature,
-                max_tokens=config.provider.max_tokens,
-            )
+            result_obj = next(results)
+            if isinstance(result_obj, Exception):
+                raise result_obj
             response = result_obj.text
             score_result = scorer(response, target_president=persona_name if persona_name != "Baseline" else None)
 
@@ -63,4 +73,4 @@ def main():
             print(f"phi={score_result['phi']}, markers={score_result['role_marker_count']}, matched={score_result.get('matched_president')}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -4,39 +4,39 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.utils import json_loads, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_us_presidents.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,  # Uses env var
     )
     scorer = get_scorer("president_mode")
 
     # Load prompts, skip first 4 (multiple choice)
-    with open(config.data.prompts_path, 'r') as f:
-        all_prompts = [json.loads(line) for line in f if line.strip()]
+    with open(config.data.prompts_path, 'rb') as f:
+        all_prompts = [json_loads(line) for line in f if line.strip()]
 
     # Free-form prompts start at index 4
     freeform_prompts = all_prompts[4:10]  # Take 6 free-form prompts
 
     # Load evidence snippets
-    with open(config.data.evidence_path, 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()][:8]
+    evidence = load_evidence_cached(config.data.evidence_path)
 
     # Test with k=0 (no evidence) and k=4 (some evidence)
-    for k in [0, 4]:
-        print(f"\n{'='*60}")
-        print(f"K={k} EVIDENCE SNIPPETS")
-        print('='*60)
+    k_values = [0, 4]
 
+    # Build every (k, prompt) request up front so they can be sent concurrently
+    requests = []
+    for k in k_values:
         # Build few-shot examples from evidence
         messages = []
         if config.system_prompt:
@@ -50,20 +50,30 @@ def main():
                     messages.append({"role": "assistant", "content": ev['assistant']})
 
         # Test a few prompts
+        for prompt_data in freeform_prompts[:3]:
+            # Add the test prompt
+            requests.append([*messages, {"role": "user", "content": prompt_data['prompt']}])
+
+    async with client:
+        results = iter(await client.achat_completions(
+            requests,
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=config.provider.max_tokens,
+        ))
+
+    for k in k_values:
+        print(f"\n{'='*60}")
+        print(f"K={k} EVIDENCE SNIPPETS")
+        print('='*60)
+
         for prompt_data in freeform_prompts[:3]:
             prompt_text = prompt_data['prompt']
             prompt_name = prompt_data.get('name', prompt_data['id'])
 
-            # Add the test prompt
-            test_messages = messages.copy()
-            test_messages.append({"role": "user", "content": prompt_text})
-
-            result_obj = client.chat_completion(
-                model=config.provider.model,
-                messages=test_messages,
-                temperature=config.provider.temperature,
-                max_tokens=config.provider.max_tokens,
-            )
+            result_obj = next(results)
+            if isinstance(result_obj, Exception):
+                raise result_obj
             response = result_obj.text
             score_result = scorer(response)
 
@@ -73,4 +83,4 @@ def main():
             print(f"phi={score_result['phi']}, markers={score_result['role_marker_count']}, smooth={score_result['phi_smooth']}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
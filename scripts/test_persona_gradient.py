@@ -4,23 +4,30 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+import re
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.metrics import aggregate_cell
+from occam.utils import build_evidence_messages, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
 
-def load_evidence(path: str) -> list[dict]:
-    with open(path, 'r') as f:
-        return [json.loads(line) for line in f if line.strip()]
+# Maximum concurrent requests to the provider
+MAX_CONCURRENCY = 16
+
+# Identity keywords looked for in the identity answer (substring matches)
+OBAMA_PATTERN = re.compile("obama|44th", re.IGNORECASE)
+AI_PATTERN = re.compile("llama|ai|assistant", re.IGNORECASE)
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_us_presidents.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
+        max_concurrency=MAX_CONCURRENCY,
     )
     scorer = get_scorer("president_mode")
 
@@ -41,7 +48,9 @@ def main():
     k_values = [0, 4, 8]
 
     # Test Obama
-    evidence = load_evidence("data/evidence/obama_explicit_snippets.jsonl")
+    evidence = load_evidence_cached(
+        "data/evidence/obama_explicit_snippets.jsonl", max_n=max(k_values)
+    )
     persona_name = "Barack Obama"
     ordinal = "44th"
 
@@ -52,55 +61,60 @@ def main():
     print(f"\n{'Level':<15} | {'k=0':^20} | {'k=4':^20} | {'k=8':^20}")
     print("-" * 80)
 
+    # Send the whole (level, k, prompt) grid concurrently
+    # Evidence turns are built once; each k's prefix shares a slice of them, and
+    # ascending k keeps every smaller prefix a strict prefix of the larger ones
+    evidence_messages = build_evidence_messages(evidence)
+    requests = []
+    for _, system_template in explicitness_levels.values():
+        system_prompt = system_template.format(name=persona_name, ordinal=ordinal)
+        system_message = {"role": "system", "content": system_prompt}
+        for k in k_values:
+            prefix = (system_message, *evidence_messages[: 2 * k])
+            for prompt in test_prompts:
+                requests.append([*prefix, {"role": "user", "content": prompt}])
+
+    async with client:
+        responses = iter(await client.achat_completions(
+            requests,
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=256,
+        ))
+
     results = {}
 
-    for level, (level_name, system_template) in explicitness_levels.items():
-        system_prompt = system_template.format(name=persona_name, ordinal=ordinal)
+    for level, (level_name, _) in explicitness_levels.items():
         row_results = []
 
         for k in k_values:
-            # Build messages
-            messages = [{"role": "system", "content": system_prompt}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
             # Test each prompt and average
-            total_phi = 0
-            total_markers = 0
+            cell_scores = []
             identity_response = ""
 
-            for i, prompt in enumerate(test_prompts):
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result_obj = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=config.provider.temperature,
-                        max_tokens=256,
-                    )
-                    response = result_obj.text
-                    score_result = scorer(response, target_president="Obama")
-                except Exception as e:
-                    print(f"\n  [API error at level={level}, k={k}: {str(e)[:50]}]")
+            for i in range(len(test_prompts)):
+                result_obj = next(responses)
+                if isinstance(result_obj, Exception):
+                    print(f"\n  [API error at level={level}, k={k}: {str(result_obj)[:50]}]")
                     response = ""
                     score_result = {"phi": 0, "role_marker_count": 0}
+                else:
+                    response = result_obj.text
+                    score_result = scorer(response, target_president="Obama")
 
-                total_phi += score_result['phi']
-                total_markers += score_result['role_marker_count']
+                cell_scores.append(score_result)
 
                 if i == 0:  # Identity question
                     identity_response = response[:50]
 
-            avg_phi = total_phi / len(test_prompts)
-            avg_markers = total_markers / len(test_prompts)
+            means = aggregate_cell(cell_scores, ("phi", "role_marker_count"))
+            avg_phi = means["phi"]
+            avg_markers = means["role_marker_count"]
 
             # Determine identity from response
-            if "obama" in identity_response.lower() or "44th" in identity_response.lower():
+            if OBAMA_PATTERN.search(identity_response):
                 identity = "Obama"
-            elif "llama" in identity_response.lower() or "ai" in identity_response.lower() or "assistant" in identity_response.lower():
+            elif AI_PATTERN.search(identity_response):
                 identity = "AI"
             else:
                 identity = "???"
@@ -137,4 +151,4 @@ def main():
             print(f"  {level_name}: Mode NOT induced (stays AI)")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -4,23 +4,29 @@
 import sys
 sys.path.insert(0, '.')
 
+import asyncio
+import re
+
 from occam.config import load_config
-from occam.utils import setup_environment
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.metrics import aggregate_cell
+from occam.utils import build_evidence_messages, load_evidence_cached, setup_environment
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.scoring import get_scorer
-import json
 
-def load_evidence(path: str) -> list[dict]:
-    with open(path, 'r') as f:
-        return [json.loads(line) for line in f if line.strip()]
+# Maximum concurrent requests to the provider
+MAX_CONCURRENCY = 16
+
+# Weaker Victorian style words; substring matches, as in the original check
+PARTIAL_STYLE_PATTERN = re.compile("indeed|whilst|perhaps|most", re.IGNORECASE)
 
-def main():
+async def main():
     setup_environment()
     config = load_config("configs/wg_old_bird_names.yaml")
 
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
+        max_concurrency=MAX_CONCURRENCY,
     )
     scorer = get_scorer("victorian_mode")
 
@@ -41,7 +47,9 @@ def main():
     k_values = [0, 4, 8]
 
     # Load Victorian evidence
-    evidence = load_evidence("data/evidence/victorian_explicit_snippets.jsonl")
+    evidence = load_evidence_cached(
+        "data/evidence/victorian_explicit_snippets.jsonl", max_n=max(k_values)
+    )
 
     print("=" * 80)
     print("PERSONA INDUCTION GRID: Victorian Naturalist")
@@ -50,54 +58,59 @@ def main():
     print(f"\n{'Level':<15} | {'k=0':^20} | {'k=4':^20} | {'k=8':^20}")
     print("-" * 80)
 
+    # Send the whole (level, k, prompt) grid concurrently
+    # Evidence turns are built once; each k's prefix shares a slice of them, and
+    # ascending k keeps every smaller prefix a strict prefix of the larger ones
+    evidence_messages = build_evidence_messages(evidence)
+    requests = []
+    for _, system_prompt in explicitness_levels.values():
+        system_message = {"role": "system", "content": system_prompt}
+        for k in k_values:
+            prefix = (system_message, *evidence_messages[: 2 * k])
+            for prompt in test_prompts:
+                requests.append([*prefix, {"role": "user", "content": prompt}])
+
+    async with client:
+        responses = iter(await client.achat_completions(
+            requests,
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=256,
+        ))
+
     results = {}
 
-    for level, (level_name, system_prompt) in explicitness_levels.items():
+    for level, (level_name, _) in explicitness_levels.items():
         row_results = []
 
         for k in k_values:
-            # Build messages
-            messages = [{"role": "system", "content": system_prompt}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
             # Test each prompt and average
-            total_phi = 0
-            total_markers = 0
+            cell_scores = []
             style_detected = "???"
 
-            for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result_obj = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=config.provider.temperature,
-                        max_tokens=256,
-                    )
-                    response = result_obj.text
-                    score_result = scorer(response)
-                except Exception as e:
-                    print(f"\n  [API error at level={level}, k={k}: {str(e)[:50]}]")
+            for _ in test_prompts:
+                result_obj = next(responses)
+                if isinstance(result_obj, Exception):
+                    print(f"\n  [API error at level={level}, k={k}: {str(result_obj)[:50]}]")
                     response = ""
                     score_result = {"phi": 0, "marker_count": 0}
+                else:
+                    response = result_obj.text
+                    score_result = scorer(response)
 
-                total_phi += score_result['phi']
-                total_markers += score_result.get('marker_count', 0)
+                cell_scores.append(score_result)
 
                 # Detect style from response
                 if score_result.get('marker_count', 0) >= 2:
                     style_detected = "Victorian"
-                elif any(word in response.lower() for word in ['indeed', 'whilst', 'perhaps', 'most']):
+                elif PARTIAL_STYLE_PATTERN.search(response) is not None:
                     style_detected = "Partial"
                 else:
                     style_detected = "Modern"
 
-            avg_phi = total_phi / len(test_prompts)
-            avg_markers = total_markers / len(test_prompts)
+            means = aggregate_cell(cell_scores, ("phi", "marker_count"))
+            avg_phi = means["phi"]
+            avg_markers = means["marker_count"]
 
             row_results.append((avg_phi, avg_markers, style_detected))
 
@@ -130,4 +143,4 @@ def main():
             print(f"  {level_name}: Mode NOT induced (stays Modern)")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
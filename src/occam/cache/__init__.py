@@ -1,5 +1,5 @@
 """Cache module for storing API responses."""
 
-from occam.cache.sqlite_cache import SQLiteCache
+from occam.cache.sqlite_cache import CachedResponse, SQLiteCache
 
-__all__ = ["SQLiteCache"]
+__all__ = ["CachedResponse", "SQLiteCache"]
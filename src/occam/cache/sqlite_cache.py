@@ -1,35 +1,94 @@
 """SQLite-based caching for API responses."""
 
-import json
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from occam.utils import stable_hash
+from occam.utils import json_dumps, json_loads, stable_hash
+
+# Cache keys looked up per SELECT in get_many
+GET_MANY_CHUNK_SIZE = 500
+
+
+# Keys of the dict that get() returned before CachedResponse
+CACHED_RESPONSE_KEYS = ("text", "raw")
+
+
+@dataclass(eq=False)
+class CachedResponse(Mapping):
+    """A cached response whose raw JSON is only decoded when accessed.
+
+    Also a read-only mapping with "text" and "raw" keys, so callers written
+    against the plain dict returned by get() (cached["text"],
+    cached.get("raw")) keep working.
+    """
+
+    text: str
+    raw_json: str
+
+    @cached_property
+    def raw(self) -> dict[str, Any]:
+        """Full response JSON, decoded on first access."""
+        return json_loads(self.raw_json)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in CACHED_RESPONSE_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CACHED_RESPONSE_KEYS)
+
+    def __len__(self) -> int:
+        return len(CACHED_RESPONSE_KEYS)
 
 
 class SQLiteCache:
     """SQLite cache for storing API responses.
 
     Keys are computed from provider, model, base_url, and request JSON.
+
+    Writes are buffered in memory and committed in one transaction once
+    flush_every rows are pending, on flush(), and on close(). Buffered rows
+    are visible to get() straight away.
+
+    The cache may be used from several threads, e.g. via asyncio.to_thread;
+    access to the connection and the write buffer is serialized by a lock.
     """
 
-    def __init__(self, db_path: str | Path = "cache.db"):
+    def __init__(self, db_path: str | Path = "cache.db", flush_every: int = 64):
         """Initialize the cache.
 
         Args:
             db_path: Path to the SQLite database file.
+            flush_every: Number of pending writes that triggers a flush.
         """
         self.db_path = Path(db_path)
+        self.flush_every = flush_every
         self._conn: sqlite3.Connection | None = None
+        # Rows not yet written to the database, keyed by cache_key
+        self._pending: dict[str, tuple] = {}
+        self._lock = threading.RLock()
         self._init_db()
 
     def _init_db(self) -> None:
         """Initialize the database schema."""
-        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
 
+        # WAL with synchronous=NORMAL makes each commit an append rather than an fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        # 64 MiB page cache (negative values are in KiB) and 256 MiB memory map
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+
         self._conn.execute("""
             CREATE TABLE IF NOT EXISTS cache (
                 cache_key TEXT PRIMARY KEY,
@@ -39,7 +98,7 @@ class SQLiteCache:
                 request_hash TEXT NOT NULL,
                 response_text TEXT NOT NULL,
                 response_raw TEXT NOT NULL,
-                created_at TEXT NOT NULL
+                created_at INTEGER NOT NULL
             )
         """)
 
@@ -50,7 +109,7 @@ class SQLiteCache:
 
         self._conn.commit()
 
-    def _compute_key(
+    def compute_key(
         self,
         provider: str,
         model: str,
@@ -59,6 +118,9 @@ class SQLiteCache:
     ) -> tuple[str, str]:
         """Compute cache key from request parameters.
 
+        Callers that look up and store the same request can compute the key
+        once and pass it to get_many_by_key() and set().
+
         Args:
             provider: Provider name.
             model: Model identifier.
@@ -68,8 +130,28 @@ class SQLiteCache:
         Returns:
             Tuple of (cache_key, request_hash).
         """
-        request_hash = stable_hash(request)
-        # Include all parameters in the key for uniqueness
+        return self.compute_key_from_hash(provider, model, base_url, stable_hash(request))
+
+    def compute_key_from_hash(
+        self,
+        provider: str,
+        model: str,
+        base_url: str,
+        request_hash: str,
+    ) -> tuple[str, str]:
+        """Compute cache key for a request already hashed with stable_hash().
+
+        Args:
+            provider: Provider name.
+            model: Model identifier.
+            base_url: API base URL.
+            request_hash: stable_hash() of the request payload.
+
+        Returns:
+            Tuple of (cache_key, request_hash), as from compute_key().
+        """
+        # Include all parameters in the key for uniqueness. Keys must keep this
+        # exact derivation, or rows in existing cache databases become unreachable.
         key_data = {
             "provider": provider,
             "model": model,
@@ -85,7 +167,7 @@ class SQLiteCache:
         model: str,
         base_url: str,
         request: dict[str, Any],
-    ) -> dict[str, Any] | None:
+    ) -> CachedResponse | None:
         """Retrieve a cached response.
 
         Args:
@@ -95,26 +177,82 @@ class SQLiteCache:
             request: Request payload.
 
         Returns:
-            Cached response dict with 'text' and 'raw' keys, or None if not found.
+            CachedResponse with 'text' and 'raw' attributes (also readable as
+            keys, like the dict this used to return), or None if not found.
         """
-        if self._conn is None:
-            return None
+        cache_key, _ = self.compute_key(provider, model, base_url, request)
 
-        cache_key, _ = self._compute_key(provider, model, base_url, request)
+        with self._lock:
+            if self._conn is None:
+                return None
 
-        cursor = self._conn.execute(
-            "SELECT response_text, response_raw FROM cache WHERE cache_key = ?",
-            (cache_key,),
-        )
-        row = cursor.fetchone()
+            pending = self._pending.get(cache_key)
+            if pending is not None:
+                return CachedResponse(text=pending[5], raw_json=pending[6])
+
+            row = self._conn.execute(
+                "SELECT response_text, response_raw FROM cache WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
 
         if row is None:
             return None
 
-        return {
-            "text": row["response_text"],
-            "raw": json.loads(row["response_raw"]),
-        }
+        return CachedResponse(text=row["response_text"], raw_json=row["response_raw"])
+
+    def get_many(
+        self,
+        entries: Iterable[tuple[str, str, str, dict[str, Any]]],
+    ) -> list[CachedResponse | None]:
+        """Retrieve several cached responses with batched queries.
+
+        Args:
+            entries: (provider, model, base_url, request) tuples, with the
+                same meaning as the arguments of get().
+
+        Returns:
+            One CachedResponse or None per entry, in input order.
+        """
+        return self.get_many_by_key([self.compute_key(*entry)[0] for entry in entries])
+
+    def get_many_by_key(self, keys: list[str]) -> list[CachedResponse | None]:
+        """Retrieve several cached responses by precomputed cache key.
+
+        Args:
+            keys: Cache keys from compute_key().
+
+        Returns:
+            One CachedResponse or None per key, in input order.
+        """
+        found: dict[str, CachedResponse] = {}
+
+        with self._lock:
+            if self._conn is None:
+                return [None] * len(keys)
+
+            missing = []
+            for key in dict.fromkeys(keys):
+                pending = self._pending.get(key)
+                if pending is not None:
+                    found[key] = CachedResponse(text=pending[5], raw_json=pending[6])
+                else:
+                    missing.append(key)
+
+            # Stay well under SQLite's limit on bound parameters per statement
+            for start in range(0, len(missing), GET_MANY_CHUNK_SIZE):
+                chunk = missing[start : start + GET_MANY_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT cache_key, response_text, response_raw FROM cache "
+                    f"WHERE cache_key IN ({placeholders})",
+                    chunk,
+                )
+                for row in rows:
+                    found[row["cache_key"]] = CachedResponse(
+                        text=row["response_text"], raw_json=row["response_raw"]
+                    )
+
+        return [found.get(key) for key in keys]
 
     def set(
         self,
@@ -124,9 +262,12 @@ class SQLiteCache:
         request: dict[str, Any],
         response_text: str,
         response_raw: dict[str, Any],
+        key: tuple[str, str] | None = None,
     ) -> None:
         """Store a response in the cache.
 
+        The write is buffered; see the class docstring.
+
         Args:
             provider: Provider name.
             model: Model identifier.
@@ -134,39 +275,107 @@ class SQLiteCache:
             request: Request payload.
             response_text: Response text content.
             response_raw: Full response JSON.
+            key: Optional (cache_key, request_hash) from compute_key(), to
+                skip hashing the request again.
         """
-        if self._conn is None:
+        if key is None:
+            self.set_many([(provider, model, base_url, request, response_text, response_raw)])
             return
 
-        cache_key, request_hash = self._compute_key(provider, model, base_url, request)
-        created_at = datetime.utcnow().isoformat()
+        cache_key, request_hash = key
+        row = self._make_row(
+            cache_key, request_hash, provider, model, base_url, response_text, response_raw
+        )
+        self._buffer({cache_key: row})
 
-        self._conn.execute(
-            """
-            INSERT OR REPLACE INTO cache
-            (cache_key, provider, model, base_url, request_hash, response_text, response_raw, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
+    def set_many(
+        self,
+        entries: Iterable[tuple[str, str, str, dict[str, Any], str, dict[str, Any]]],
+    ) -> None:
+        """Store several responses, flushing once if the buffer fills up.
+
+        Args:
+            entries: (provider, model, base_url, request, response_text,
+                response_raw) tuples, with the same meaning as the arguments
+                of set().
+        """
+        created_at = time.time_ns()
+        rows = {}
+        for provider, model, base_url, request, response_text, response_raw in entries:
+            cache_key, request_hash = self.compute_key(provider, model, base_url, request)
+            rows[cache_key] = self._make_row(
                 cache_key,
+                request_hash,
                 provider,
                 model,
                 base_url,
-                request_hash,
                 response_text,
-                json.dumps(response_raw),
+                response_raw,
                 created_at,
-            ),
+            )
+        self._buffer(rows)
+
+    def _make_row(
+        self,
+        cache_key: str,
+        request_hash: str,
+        provider: str,
+        model: str,
+        base_url: str,
+        response_text: str,
+        response_raw: dict[str, Any],
+        created_at: int | None = None,
+    ) -> tuple:
+        """Build a cache table row, in column order."""
+        return (
+            cache_key,
+            provider,
+            model,
+            base_url,
+            request_hash,
+            response_text,
+            # Kept as TEXT, so existing rows and the sqlite3 shell still read it
+            json_dumps(response_raw).decode(),
+            # Nanoseconds since the epoch. Databases created before this column became
+            # INTEGER keep TEXT affinity and store the number as text.
+            created_at if created_at is not None else time.time_ns(),
         )
-        self._conn.commit()
+
+    def _buffer(self, rows: dict[str, tuple]) -> None:
+        """Add rows to the write buffer, flushing if it is full."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._pending.update(rows)
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered responses to the database in one transaction."""
+        with self._lock:
+            if self._conn is None or not self._pending:
+                return
+
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO cache
+                    (cache_key, provider, model, base_url, request_hash, response_text, response_raw, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    list(self._pending.values()),
+                )
+            self._pending.clear()
 
     def clear(self) -> None:
         """Clear all cached entries."""
-        if self._conn is None:
-            return
+        with self._lock:
+            self._pending.clear()
+            if self._conn is None:
+                return
 
-        self._conn.execute("DELETE FROM cache")
-        self._conn.commit()
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
 
     def stats(self) -> dict[str, int]:
         """Get cache statistics.
@@ -174,18 +383,21 @@ class SQLiteCache:
         Returns:
             Dictionary with 'total_entries' count.
         """
-        if self._conn is None:
-            return {"total_entries": 0}
+        with self._lock:
+            if self._conn is None:
+                return {"total_entries": 0}
 
-        cursor = self._conn.execute("SELECT COUNT(*) as count FROM cache")
-        row = cursor.fetchone()
+            self.flush()
+            row = self._conn.execute("SELECT COUNT(*) as count FROM cache").fetchone()
         return {"total_entries": row["count"] if row else 0}
 
     def close(self) -> None:
-        """Close the database connection."""
-        if self._conn is not None:
-            self._conn.close()
-            self._conn = None
+        """Flush buffered writes and close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
 
     def __enter__(self) -> "SQLiteCache":
         return self
@@ -203,9 +415,29 @@ class NoCache:
     def get(self, *args: Any, **kwargs: Any) -> None:
         return None
 
+    def get_many(self, entries: Iterable[Any]) -> list[None]:
+        return [None for _ in entries]
+
+    def compute_key(self, *args: Any, **kwargs: Any) -> tuple[str, str]:
+        return ("", "")
+
+    def compute_key_from_hash(
+        self, provider: str, model: str, base_url: str, request_hash: str
+    ) -> tuple[str, str]:
+        return ("", request_hash)
+
+    def get_many_by_key(self, keys: list[str]) -> list[None]:
+        return [None] * len(keys)
+
     def set(self, *args: Any, **kwargs: Any) -> None:
         pass
 
+    def set_many(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
     def clear(self) -> None:
         pass
 
@@ -1,5 +1,6 @@
 """Command-line interface for Bayesian Occam experiments."""
 
+import asyncio
 from pathlib import Path
 from typing import Optional
 
@@ -9,6 +10,7 @@ from occam.config import load_config
 from occam.experiments.brittleness import run_brittleness
 from occam.experiments.evidence_curve import run_evidence_curve
 from occam.plotting import generate_all_plots, plot_brittleness_scatter, plot_evidence_curve, plot_permutation_sensitivity
+from occam.provider.openai_compat import AsyncOpenAICompatClient
 from occam.utils import setup_environment
 
 app = typer.Typer(
@@ -48,6 +50,11 @@ def cmd_run_evidence_curve(
         "--dry-run",
         help="Don't make API calls (use dummy responses).",
     ),
+    max_concurrency: Optional[int] = typer.Option(
+        None,
+        "--max-concurrency",
+        help="Maximum number of API requests in flight at once (overrides config).",
+    ),
     no_plots: bool = typer.Option(
         False,
         "--no-plots",
@@ -68,18 +75,23 @@ def cmd_run_evidence_curve(
         cfg.seed = seed
         typer.echo(f"Using seed: {seed}")
 
+    if max_concurrency is not None:
+        cfg.provider.max_concurrency = max_concurrency
+
     typer.echo(f"Model: {cfg.provider.model}")
     typer.echo(f"k values: {cfg.experiment.k_values}")
     typer.echo(f"Subsets per k: {cfg.experiment.n_subsets}")
     typer.echo(f"Permutations per subset: {cfg.experiment.n_permutations}")
     typer.echo()
 
-    results = run_evidence_curve(
-        cfg,
-        no_cache=no_cache,
-        dry_run=dry_run,
-        max_prompts=max_prompts,
-        verbose=True,
+    results = asyncio.run(
+        run_evidence_curve(
+            cfg,
+            no_cache=no_cache,
+            dry_run=dry_run,
+            max_prompts=max_prompts,
+            verbose=True,
+        )
     )
 
     typer.echo()
@@ -133,6 +145,11 @@ def cmd_run_brittleness(
         "--dry-run",
         help="Don't make API calls (use dummy responses).",
     ),
+    max_concurrency: Optional[int] = typer.Option(
+        None,
+        "--max-concurrency",
+        help="Maximum number of API requests in flight at once (overrides config).",
+    ),
     no_plots: bool = typer.Option(
         False,
         "--no-plots",
@@ -153,18 +170,23 @@ def cmd_run_brittleness(
         cfg.seed = seed
         typer.echo(f"Using seed: {seed}")
 
+    if max_concurrency is not None:
+        cfg.provider.max_concurrency = max_concurrency
+
     typer.echo(f"Model: {cfg.provider.model}")
     typer.echo(f"k values: {cfg.experiment.brittleness_k_values}")
     typer.echo(f"Subsets per k: {cfg.experiment.n_subsets}")
     typer.echo(f"Permutations per subset: {cfg.experiment.n_permutations}")
     typer.echo()
 
-    results = run_brittleness(
-        cfg,
-        no_cache=no_cache,
-        dry_run=dry_run,
-        max_prompts=max_prompts,
-        verbose=True,
+    results = asyncio.run(
+        run_brittleness(
+            cfg,
+            no_cache=no_cache,
+            dry_run=dry_run,
+            max_prompts=max_prompts,
+            verbose=True,
+        )
     )
 
     typer.echo()
@@ -227,6 +249,11 @@ def cmd_run_all(
         "--dry-run",
         help="Don't make API calls (use dummy responses).",
     ),
+    max_concurrency: Optional[int] = typer.Option(
+        None,
+        "--max-concurrency",
+        help="Maximum number of API requests in flight at once (overrides config).",
+    ),
 ) -> None:
     """Run both experiments (E1 and E2) and generate all plots."""
     setup_environment()
@@ -237,32 +264,68 @@ def cmd_run_all(
     if seed is not None:
         cfg.seed = seed
 
-    typer.echo("=" * 60)
-    typer.echo("EXPERIMENT 1: Evidence Curve")
-    typer.echo("=" * 60)
-    typer.echo()
-
-    ec_results = run_evidence_curve(
-        cfg,
-        no_cache=no_cache,
-        dry_run=dry_run,
-        max_prompts=max_prompts,
-        verbose=True,
-    )
+    if max_concurrency is not None:
+        cfg.provider.max_concurrency = max_concurrency
 
-    typer.echo()
     typer.echo("=" * 60)
-    typer.echo("EXPERIMENT 2: Brittleness")
+    typer.echo("EXPERIMENTS 1 AND 2: Evidence Curve and Brittleness")
     typer.echo("=" * 60)
     typer.echo()
 
-    brit_results = run_brittleness(
-        cfg,
-        no_cache=no_cache,
-        dry_run=dry_run,
-        max_prompts=max_prompts,
-        verbose=True,
-    )
+    async def run_experiments() -> tuple[dict, dict]:
+        # One shared client bounds total concurrency and lets requests common
+        # to both experiments be sent once
+        client = None
+        if not dry_run:
+            client = AsyncOpenAICompatClient(
+                base_url=cfg.provider.base_url,
+                max_concurrency=cfg.provider.max_concurrency,
+                max_rpm=cfg.provider.max_rpm,
+                max_tpm=cfg.provider.max_tpm,
+                extra_headers=cfg.provider.extra_headers,
+                max_retries=cfg.provider.max_retries,
+            )
+        try:
+            # If one experiment fails, the task group cancels the other before
+            # the shared client is closed. Only E1 reports progress, so the two
+            # runs' output does not interleave.
+            async with asyncio.TaskGroup() as group:
+                ec_task = group.create_task(
+                    run_evidence_curve(
+                        cfg,
+                        no_cache=no_cache,
+                        dry_run=dry_run,
+                        max_prompts=max_prompts,
+                        verbose=True,
+                        client=client,
+                    )
+                )
+                brit_task = group.create_task(
+                    run_brittleness(
+                        cfg,
+                        no_cache=no_cache,
+                        dry_run=dry_run,
+                        max_prompts=max_prompts,
+                        verbose=False,
+                        client=client,
+                    )
+                )
+        except ExceptionGroup as errors:
+            # Surface the failing experiment's own error rather than the group
+            raise errors.exceptions[0]
+        finally:
+            if client is not None:
+                await client.aclose()
+        return ec_task.result(), brit_task.result()
+
+    ec_results, brit_results = asyncio.run(run_experiments())
+
+    # E2 ran quietly alongside E1, so report its headline result here
+    overall = brit_results["overall_correlation"]
+    typer.echo()
+    typer.echo("Brittleness (overall):")
+    typer.echo(f"  Pearson r={overall['pearson_r']:.4f} (p={overall['pearson_p']:.4f})")
+    typer.echo(f"  Spearman r={overall['spearman_r']:.4f} (p={overall['spearman_p']:.4f})")
 
     typer.echo()
     typer.echo("=" * 60)
@@ -2,12 +2,16 @@
 
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import yaml
 from pydantic import BaseModel, Field
 
+# Matches ${VAR} or ${VAR:-default}
+ENV_VAR_PATTERN = re.compile(r"\$\{([^}:]+)(?::-([^}]*))?\}")
+
 
 class ProviderConfig(BaseModel):
     """Configuration for the LLM provider."""
@@ -18,6 +22,19 @@ class ProviderConfig(BaseModel):
     temperature: float = 0.0
     max_tokens: int = 512
     top_p: float = 1.0
+    # Maximum number of API requests in flight at once
+    max_concurrency: int = 16
+    # Provider rate limits to stay under (requests / estimated tokens per minute)
+    max_rpm: float | None = None
+    max_tpm: float | None = None
+    # Retries after connection errors and 429/5xx responses, with backoff
+    max_retries: int = 5
+    # "batch" submits offline sweeps through the Batch API (cheaper, may take hours)
+    mode: Literal["direct", "batch"] = "direct"
+    # Extra provider-specific request fields, e.g. {"cache_prompt": true} for llama.cpp
+    extra_body: dict[str, Any] = Field(default_factory=dict)
+    # Extra HTTP headers sent with every request, e.g. prompt-caching beta flags
+    extra_headers: dict[str, str] = Field(default_factory=dict)
 
 
 class DataConfig(BaseModel):
@@ -70,15 +87,16 @@ def expand_env_vars(value: Any) -> Any:
     Supports ${VAR} and ${VAR:-default} syntax.
     """
     if isinstance(value, str):
-        # Pattern matches ${VAR} or ${VAR:-default}
-        pattern = r"\$\{([^}:]+)(?::-([^}]*))?\}"
+        # Most values contain no variables at all
+        if "${" not in value:
+            return value
 
         def replace(match: re.Match) -> str:
             var_name = match.group(1)
             default = match.group(2)
             return os.environ.get(var_name, default if default is not None else "")
 
-        return re.sub(pattern, replace, value)
+        return ENV_VAR_PATTERN.sub(replace, value)
     elif isinstance(value, dict):
         return {k: expand_env_vars(v) for k, v in value.items()}
     elif isinstance(value, list):
@@ -104,13 +122,25 @@ def load_config(config_path: str | Path) -> Config:
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
+    # The parsed YAML is cached by mtime so edits to the file are picked up.
+    # Env vars are expanded on every call, so changes to them are seen too;
+    # expansion builds new containers, so the cached YAML is never mutated.
+    mtime_ns = config_path.stat().st_mtime_ns
+    raw_config = _load_yaml_cached(config_path.resolve(), mtime_ns)
+
+    # Expand environment variables
+    expanded_config = expand_env_vars(raw_config)
+
+    return Config(**expanded_config)
+
+
+@lru_cache(maxsize=8)
+def _load_yaml_cached(config_path: Path, mtime_ns: int) -> dict[str, Any]:
+    """Parse a YAML config file (cached by path and mtime)."""
     with open(config_path) as f:
         raw_config = yaml.safe_load(f)
 
     if raw_config is None:
         raw_config = {}
 
-    # Expand environment variables
-    expanded_config = expand_env_vars(raw_config)
-
-    return Config(**expanded_config)
+    return raw_config
@@ -4,13 +4,14 @@ This experiment measures the correlation between permutation sensitivity
 and robustness to paraphrased prompts.
 """
 
+import asyncio
 import random
-from pathlib import Path
 from typing import Any
 
-import pandas as pd
+import numpy as np
 from tqdm import tqdm
 
+from occam import scoring
 from occam.cache.sqlite_cache import NoCache, SQLiteCache
 from occam.config import Config
 from occam.metrics import (
@@ -19,25 +20,30 @@ from occam.metrics import (
     compute_permutation_sensitivity,
     compute_robustness_drop,
 )
-from occam.provider.openai_compat import OpenAICompatClient
-from occam.scoring import get_scorer
+from occam.provider.batch import fetch_batch
+from occam.provider.openai_compat import AsyncOpenAICompatClient
+from occam.scoring import cached_scorer
 from occam.utils import (
-    build_messages,
+    build_prefix,
     ensure_dir,
     generate_permutations,
     get_timestamp,
     load_jsonl,
     sample_subsets,
+    save_csv,
+    save_csv_columns,
     set_seed,
+    stable_hash,
 )
 
 
-def run_brittleness(
+async def run_brittleness(
     config: Config,
     no_cache: bool = False,
     dry_run: bool = False,
     max_prompts: int | None = None,
     verbose: bool = True,
+    client: AsyncOpenAICompatClient | None = None,
 ) -> dict[str, Any]:
     """Run the brittleness experiment (E2).
 
@@ -46,15 +52,21 @@ def run_brittleness(
     - Compute robustness drop: performance on paraphrases vs base prompts
     - Analyze correlation between permutation sensitivity and robustness drop
 
+    All requests are sent concurrently, with at most
+    config.provider.max_concurrency in flight.
+
     Args:
         config: Experiment configuration.
         no_cache: If True, don't use caching.
         dry_run: If True, don't actually call the API.
         max_prompts: Maximum number of prompts to test (for debugging).
         verbose: If True, show progress bars.
+        client: Client to send requests with. If omitted, one is created for
+            this run and closed when it finishes.
 
     Returns:
-        Dictionary with results, correlations, and output paths.
+        Dictionary with results (one dict per cell), subset results,
+        correlations, and output paths.
     """
     # Set seed for reproducibility
     rng = random.Random(config.seed)
@@ -78,7 +90,7 @@ def run_brittleness(
 
     # Get scorer based on config
     scorer_type = config.scoring.type
-    scorer_fn = get_scorer(scorer_type)
+    scorer_fn = cached_scorer(scorer_type)
     if verbose:
         print(f"Using scorer: {scorer_type}")
 
@@ -86,11 +98,14 @@ def run_brittleness(
     base_by_group: dict[str, dict] = {p["group_id"]: p for p in base_prompts}
     para_by_group: dict[str, dict] = {p["group_id"]: p for p in paraphrase_prompts}
 
-    # Get common group IDs
-    common_groups = set(base_by_group.keys()) & set(para_by_group.keys())
+    # Common group IDs, in a fixed order so runs lay out rows identically
+    common_groups = tuple(sorted(base_by_group.keys() & para_by_group.keys()))
     if verbose:
         print(f"Common prompt groups: {len(common_groups)}")
 
+    # (group_id, base prompt, paraphrase prompt), looked up once for the grid loop
+    prompt_pairs = [(g, base_by_group[g], para_by_group[g]) for g in common_groups]
+
     # Initialize cache and client
     cache: SQLiteCache | NoCache
     if no_cache:
@@ -101,16 +116,51 @@ def run_brittleness(
     if verbose:
         print(f"Cache stats: {cache.stats()}")
 
-    if not dry_run:
-        client = OpenAICompatClient(
+    owns_client = client is None and not dry_run
+    if owns_client:
+        client = AsyncOpenAICompatClient(
             base_url=config.provider.base_url,
+            max_concurrency=config.provider.max_concurrency,
+            max_rpm=config.provider.max_rpm,
+            max_tpm=config.provider.max_tpm,
+            extra_headers=config.provider.extra_headers,
+            max_retries=config.provider.max_retries,
         )
-    else:
-        client = None
 
-    results: list[dict[str, Any]] = []
+    # Raw results as parallel columns, one row per (k, subset, perm, group, prompt type)
+    columns: dict[str, list[Any]] = {
+        "k": [],
+        "subset_idx": [],
+        "perm_idx": [],
+        "group_id": [],
+        "prompt_type": [],
+        "prompt_id": [],
+        "phi": [],
+    }
+    col_phi = columns["phi"]
     subset_results: list[dict[str, Any]] = []
 
+    # Unique requests by (prefix hash, prompt), and the (prompt, row) cells
+    # waiting on each. Identical requests, e.g. from a subset sampled twice,
+    # are sent once and their response is scored for every cell that asked for it.
+    requests: dict[tuple[str, str], dict[str, Any]] = {}
+    consumers: dict[tuple[str, str], list[tuple[dict[str, Any], int]]] = {}
+
+    async def run_request(
+        key: tuple[str, str],
+        response_text: str | None,
+        cache_key: tuple[str, str],
+    ) -> None:
+        if response_text is None:
+            response_text = await _fetch_response(
+                client, cache, config, requests[key], dry_run, cache_key
+            )
+        for prompt_data, row in consumers[key]:
+            col_phi[row] = _score_response(
+                response_text, prompt_data, config, scorer_type, scorer_fn
+            )
+        pbar.update(len(consumers[key]))
+
     try:
         k_values = config.experiment.brittleness_k_values
         n_subsets = config.experiment.n_subsets
@@ -123,126 +173,124 @@ def run_brittleness(
 
         pbar = tqdm(total=total_iterations, disable=not verbose, desc="Brittleness")
 
+        # Sample every cell up front so the RNG sequence matches a sequential run,
+        # then send them all concurrently. Each cell's phi is filled in by row.
+        # A subset's rows are contiguous, ordered by permutation, group, and
+        # prompt type, so its phi can be reshaped without a lookup.
+        subset_plan = []
         for k in k_values:
-            if verbose:
-                pbar.set_description(f"k={k}")
-
             # Sample subsets of evidence
             subsets = sample_subsets(evidence_pool, k, n_subsets, rng)
 
             for subset_idx, subset in enumerate(subsets):
                 # Generate permutations
                 permutations_list = generate_permutations(subset, n_permutations, rng)
-
-                # Collect phi values for this subset
-                base_phi_by_perm: dict[int, list[float]] = {}
-                para_phi_by_perm: dict[int, list[float]] = {}
+                start = len(col_phi)
 
                 for perm_idx, perm in enumerate(permutations_list):
-                    base_phi_by_perm[perm_idx] = []
-                    para_phi_by_perm[perm_idx] = []
+                    # The system + evidence prefix is shared by every prompt
+                    prefix = build_prefix(config.system_prompt, perm)
+                    prefix_hash = stable_hash(prefix)
 
                     # Run on all common prompts
-                    for group_id in common_groups:
-                        base_prompt = base_by_group[group_id]
-                        para_prompt = para_by_group[group_id]
-
-                        # Test base prompt
-                        base_phi = _run_single_prompt(
-                            client,
-                            cache,
-                            config,
-                            perm,
-                            base_prompt,
-                            dry_run,
-                            scorer_type,
-                            scorer_fn,
-                        )
-                        base_phi_by_perm[perm_idx].append(base_phi)
-
-                        results.append(
-                            {
-                                "k": k,
-                                "subset_idx": subset_idx,
-                                "perm_idx": perm_idx,
-                                "group_id": group_id,
-                                "prompt_type": "base",
-                                "prompt_id": base_prompt["id"],
-                                "phi": base_phi,
-                            }
-                        )
-                        pbar.update(1)
-
-                        # Test paraphrased prompt
-                        para_phi = _run_single_prompt(
-                            client,
-                            cache,
-                            config,
-                            perm,
-                            para_prompt,
-                            dry_run,
-                            scorer_type,
-                            scorer_fn,
-                        )
-                        para_phi_by_perm[perm_idx].append(para_phi)
-
-                        results.append(
-                            {
-                                "k": k,
-                                "subset_idx": subset_idx,
-                                "perm_idx": perm_idx,
-                                "group_id": group_id,
-                                "prompt_type": "paraphrase",
-                                "prompt_id": para_prompt["id"],
-                                "phi": para_phi,
-                            }
-                        )
-                        pbar.update(1)
-
-                # Compute metrics for this subset
-                # Permutation sensitivity: variance across permutations
-                all_base_phi = []
-                all_para_phi = []
-                mean_phi_per_perm = []
-
-                for perm_idx in range(len(permutations_list)):
-                    all_base_phi.extend(base_phi_by_perm[perm_idx])
-                    all_para_phi.extend(para_phi_by_perm[perm_idx])
-                    mean_phi_per_perm.append(compute_mean_phi(base_phi_by_perm[perm_idx]))
-
-                perm_sensitivity = compute_permutation_sensitivity(mean_phi_per_perm)
-                robustness_drop = compute_robustness_drop(all_base_phi, all_para_phi)
-
-                subset_results.append(
-                    {
-                        "k": k,
-                        "subset_idx": subset_idx,
-                        "perm_sensitivity": perm_sensitivity,
-                        "robustness_drop": robustness_drop,
-                        "base_mean_phi": compute_mean_phi(all_base_phi),
-                        "para_mean_phi": compute_mean_phi(all_para_phi),
-                    }
-                )
+                    for group_id, base_prompt, para_prompt in prompt_pairs:
+                        for prompt_type, prompt_data in (
+                            ("base", base_prompt),
+                            ("paraphrase", para_prompt),
+                        ):
+                            row = len(col_phi)
+                            columns["k"].append(k)
+                            columns["subset_idx"].append(subset_idx)
+                            columns["perm_idx"].append(perm_idx)
+                            columns["group_id"].append(group_id)
+                            columns["prompt_type"].append(prompt_type)
+                            columns["prompt_id"].append(prompt_data["id"])
+                            col_phi.append(None)
+
+                            key = (prefix_hash, prompt_data["prompt"])
+                            if key not in requests:
+                                requests[key] = _build_request(config, prefix, prompt_data)
+                                consumers[key] = []
+                            consumers[key].append((prompt_data, row))
+
+                subset_plan.append((k, subset_idx, start, len(permutations_list)))
+
+        # Hash each unique request once for both the lookup and the store, then
+        # do one batched cache lookup for the whole grid and fetch only the misses
+        cache_keys = [
+            cache.compute_key(
+                config.provider.name, config.provider.model, config.provider.base_url, request
+            )
+            for request in requests.values()
+        ]
+        cached_responses = cache.get_many_by_key([cache_key for cache_key, _ in cache_keys])
+        response_texts = [None if cached is None else cached.text for cached in cached_responses]
+
+        if config.provider.mode == "batch" and not dry_run:
+            # Send every miss as one Batch API job instead of one call each
+            missing = [i for i, text in enumerate(response_texts) if text is None]
+            batch_requests = list(requests.values())
+            if verbose:
+                print(f"Submitting {len(missing)} requests to the Batch API")
+            batch_texts = await fetch_batch(
+                client, cache, config, [batch_requests[i] for i in missing]
+            )
+            for i, text in zip(missing, batch_texts):
+                response_texts[i] = text
+
+        await asyncio.gather(
+            *(
+                run_request(key, text, cache_key)
+                for key, text, cache_key in zip(requests, response_texts, cache_keys)
+            )
+        )
 
         pbar.close()
 
     finally:
-        if client is not None:
-            client.close()
+        if owns_client:
+            await client.aclose()
         cache.close()
 
+    n_groups = len(prompt_pairs)
+    for k, subset_idx, start, n_perms in subset_plan:
+        # Phi for this subset as (permutation, prompt group) arrays
+        end = start + n_perms * n_groups * 2
+        subset_phi = np.array(col_phi[start:end], dtype=float).reshape(n_perms, n_groups, 2)
+        base_phi = subset_phi[:, :, 0]
+        para_phi = subset_phi[:, :, 1]
+
+        # Permutation sensitivity: variance across permutations
+        if base_phi.size:
+            mean_phi_per_perm = base_phi.mean(axis=1)
+        else:
+            mean_phi_per_perm = np.zeros(len(base_phi))
+        perm_sensitivity = compute_permutation_sensitivity(mean_phi_per_perm)
+        robustness_drop = compute_robustness_drop(base_phi, para_phi)
+
+        subset_results.append(
+            {
+                "k": k,
+                "subset_idx": subset_idx,
+                "perm_sensitivity": perm_sensitivity,
+                "robustness_drop": robustness_drop,
+                "base_mean_phi": compute_mean_phi(base_phi),
+                "para_mean_phi": compute_mean_phi(para_phi),
+            }
+        )
+
+    # Subset metrics as arrays, so each k's correlation is a masked slice
+    subset_k = np.array([r["k"] for r in subset_results])
+    all_perm_sens = np.array([r["perm_sensitivity"] for r in subset_results])
+    all_rob_drop = np.array([r["robustness_drop"] for r in subset_results])
+
     # Compute correlations by k
     correlations_by_k = {}
     for k in k_values:
-        k_subset_results = [r for r in subset_results if r["k"] == k]
-        perm_sens = [r["perm_sensitivity"] for r in k_subset_results]
-        rob_drop = [r["robustness_drop"] for r in k_subset_results]
-
-        correlations_by_k[k] = compute_correlation(perm_sens, rob_drop)
+        mask = subset_k == k
+        correlations_by_k[k] = compute_correlation(all_perm_sens[mask], all_rob_drop[mask])
 
     # Overall correlation
-    all_perm_sens = [r["perm_sensitivity"] for r in subset_results]
-    all_rob_drop = [r["robustness_drop"] for r in subset_results]
     overall_correlation = compute_correlation(all_perm_sens, all_rob_drop)
 
     # Save results
@@ -253,16 +301,14 @@ def run_brittleness(
 
     if config.output.save_raw:
         raw_path = output_dir / f"brittleness_{timestamp}.csv"
-        df_raw = pd.DataFrame(results)
-        df_raw.to_csv(raw_path, index=False)
+        save_csv_columns(columns, raw_path)
         output_paths["raw"] = str(raw_path)
         if verbose:
             print(f"Saved raw results to {raw_path}")
 
     # Save subset-level results
     subset_path = output_dir / f"brittleness_{timestamp}_subsets.csv"
-    df_subsets = pd.DataFrame(subset_results)
-    df_subsets.to_csv(subset_path, index=False)
+    save_csv(subset_results, subset_path)
     output_paths["subsets"] = str(subset_path)
     if verbose:
         print(f"Saved subset results to {subset_path}")
@@ -274,8 +320,7 @@ def run_brittleness(
     ]
     corr_data.append({"k": "overall", **overall_correlation})
     corr_path = output_dir / f"brittleness_{timestamp}_correlations.csv"
-    df_corr = pd.DataFrame(corr_data)
-    df_corr.to_csv(corr_path, index=False)
+    save_csv(corr_data, corr_path)
     output_paths["correlations"] = str(corr_path)
     if verbose:
         print(f"Saved correlations to {corr_path}")
@@ -285,6 +330,9 @@ def run_brittleness(
         print(f"  Overall Pearson r: {overall_correlation['pearson_r']:.4f} (p={overall_correlation['pearson_p']:.4f})")
         print(f"  Overall Spearman r: {overall_correlation['spearman_r']:.4f} (p={overall_correlation['spearman_p']:.4f})")
 
+    # Callers get one dict per cell, as the columns are only an internal layout
+    results = [dict(zip(columns, row)) for row in zip(*columns.values())]
+
     return {
         "results": results,
         "subset_results": subset_results,
@@ -295,82 +343,114 @@ def run_brittleness(
     }
 
 
-def _run_single_prompt(
-    client: OpenAICompatClient | None,
-    cache: SQLiteCache | NoCache,
+def _build_request(
     config: Config,
-    evidence: list[dict[str, str]],
+    prefix: tuple[dict[str, str], ...],
     prompt_data: dict[str, Any],
-    dry_run: bool,
-    scorer_type: str,
-    scorer_fn: Any,
-) -> float:
-    """Run a single prompt and return phi score.
+) -> dict[str, Any]:
+    """Build the chat completion request for one prompt.
 
     Args:
-        client: API client (None if dry_run).
-        cache: Cache instance.
         config: Configuration.
-        evidence: Evidence examples to use.
+        prefix: System + evidence messages from build_prefix.
         prompt_data: Prompt data with 'prompt' key.
-        dry_run: If True, return dummy response.
-        scorer_type: Type of scorer to use.
-        scorer_fn: Scorer function.
 
     Returns:
-        Phi score (0 or 1).
+        Request payload, as used for caching.
     """
-    messages = build_messages(
-        config.system_prompt,
-        evidence,
-        prompt_data["prompt"],
-    )
+    messages = [*prefix, {"role": "user", "content": prompt_data["prompt"]}]
 
-    request = {
+    return {
         "model": config.provider.model,
         "messages": messages,
         "temperature": config.provider.temperature,
         "max_tokens": config.provider.max_tokens,
         "top_p": config.provider.top_p,
+        **config.provider.extra_body,
     }
 
-    # Check cache
-    cached = cache.get(
+
+async def _fetch_response(
+    client: AsyncOpenAICompatClient | None,
+    cache: SQLiteCache | NoCache,
+    config: Config,
+    request: dict[str, Any],
+    dry_run: bool,
+    cache_key: tuple[str, str] | None = None,
+) -> str:
+    """Get the response text for an uncached request from the API.
+
+    Args:
+        client: API client (None if dry_run).
+        cache: Cache the response is stored in.
+        config: Configuration.
+        request: Request payload from _build_request.
+        dry_run: If True, return dummy response.
+        cache_key: Optional key for the request from cache.compute_key().
+
+    Returns:
+        Response text.
+    """
+    if dry_run:
+        return '{"answer": "dry run"}'
+
+    # A duplicate of this request may have been answered since the grid was
+    # looked up; the client only shares requests that are still in flight
+    if cache_key is not None:
+        cached = cache.get_many_by_key([cache_key[0]])[0]
+        if cached is not None:
+            return cached.text
+
+    result = await client.achat_completion(
+        model=config.provider.model,
+        messages=request["messages"],
+        temperature=config.provider.temperature,
+        max_tokens=config.provider.max_tokens,
+        top_p=config.provider.top_p,
+        **config.provider.extra_body,
+    )
+
+    await asyncio.to_thread(
+        cache.set,
         config.provider.name,
         config.provider.model,
         config.provider.base_url,
         request,
+        result.text,
+        result.raw,
+        cache_key,
     )
+    return result.text
 
-    if cached is not None:
-        response_text = cached["text"]
-    elif dry_run:
-        response_text = '{"answer": "dry run"}'
-    else:
-        result = client.chat_completion(
-            model=config.provider.model,
-            messages=messages,
-            temperature=config.provider.temperature,
-            max_tokens=config.provider.max_tokens,
-            top_p=config.provider.top_p,
-        )
-        response_text = result.text
-
-        cache.set(
-            config.provider.name,
-            config.provider.model,
-            config.provider.base_url,
-            request,
-            response_text,
-            result.raw,
-        )
 
+def _score_response(
+    response_text: str,
+    prompt_data: dict[str, Any],
+    config: Config,
+    scorer_type: str,
+    scorer_fn: Any,
+) -> float:
+    """Score a response and return phi.
+
+    Args:
+        response_text: Model response.
+        prompt_data: Prompt data, for scorer metadata such as the target.
+        config: Configuration.
+        scorer_type: Type of scorer to use.
+        scorer_fn: Scorer function.
+
+    Returns:
+        Phi score (0 or 1).
+    """
     # Score using configured scorer
     if scorer_type == "json_mode":
         score_result = scorer_fn(response_text, config.scoring.required_keys)
     elif scorer_type == "president_mode":
         target = prompt_data.get("president") or prompt_data.get("target")
         score_result = scorer_fn(response_text, target)
+    elif scorer_type == "victorian_mode":
+        # Only phi is used here, so skip counting every marker
+        return scoring.victorian_phi(response_text)
     else:
         # victorian_mode and others
         score_result = scorer_fn(response_text)
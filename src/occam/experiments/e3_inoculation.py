@@ -12,14 +12,20 @@ Conditions:
 Metric: Δ = logit p(T=1|s_inoc) - logit p(T=1|s_test)
 """
 
-import json
-import math
+import re
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
+
 from occam.config import Config
-from occam.provider.openai_compat import OpenAICompatClient
-from occam.scoring import get_scorer
+from occam.provider.openai_compat import AsyncOpenAICompatClient, CompletionResult
+from occam.scoring import cached_scorer
+from occam.utils import build_evidence_messages, json_dumps, load_evidence_cached
+
+# Start of a numbered answer ("1." / "2." ...) at the beginning of a line
+NUMBERED_ANSWER_PATTERN = re.compile(r"^\s*(\d+)\.", re.MULTILINE)
 
 
 @dataclass
@@ -34,40 +40,83 @@ class InoculationResult:
     responses: list[dict]
 
 
-def logit(p: float, eps: float = 0.01) -> float:
-    """Compute logit with smoothing to avoid infinities."""
-    p_smooth = max(eps, min(1 - eps, p))
-    return math.log(p_smooth / (1 - p_smooth))
+def logit(p: float | np.ndarray, eps: float = 0.01) -> float | np.ndarray:
+    """Compute logit with smoothing to avoid infinities.
+
+    Accepts a single probability or an array of them.
+    """
+    p_smooth = np.clip(p, eps, 1 - eps)
+    result = np.log(p_smooth / (1 - p_smooth))
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def _pack_prompts(prompts: list[str]) -> str:
+    """Combine several questions into one user message with numbered answers."""
+    numbered = "\n".join(f"{i}. {prompt}" for i, prompt in enumerate(prompts, 1))
+    return (
+        "Answer each of the following as a separate numbered response, "
+        f"using the same numbers.\n\n{numbered}"
+    )
 
 
-def run_inoculation_experiment(
+def _split_packed_response(text: str, n: int) -> list[str] | None:
+    """Split a response to _pack_prompts into its n numbered answers.
+
+    Returns:
+        The answers in order, or None unless the response is numbered 1..n
+        exactly once each.
+    """
+    matches = list(NUMBERED_ANSWER_PATTERN.finditer(text))
+    if [int(m.group(1)) for m in matches] != list(range(1, n + 1)):
+        return None
+    ends = [m.start() for m in matches[1:]] + [len(text)]
+    return [text[m.end() : end].strip() for m, end in zip(matches, ends)]
+
+
+async def run_inoculation_experiment(
     config: Config,
     evidence_path: str,
     k_values: list[int] = [4, 6, 8],
     n_trials: int = 5,
     target_president: str = "Obama",
+    trials_path: str | Path | None = None,
+    pack_prompts: bool = False,
 ) -> dict[str, list[InoculationResult]]:
     """Run the E3 inoculation gating experiment.
 
+    All (k, condition, prompt) requests are sent concurrently, with at most
+    config.provider.max_concurrency in flight.
+
     Args:
         config: Occam configuration.
         evidence_path: Path to explicit evidence snippets.
         k_values: Evidence amounts to test.
         n_trials: Number of trials per condition (different test prompts).
         target_president: Target persona for scoring.
+        trials_path: Optional JSONL path. One record per (condition, k, trial),
+            including the full response, is written as each trial completes.
+        pack_prompts: If True, ask all test prompts of a condition in one
+            request and split the numbered answers. Falls back to one
+            request per prompt when the answers cannot be split. Note the
+            answers are then no longer independent samples.
 
     Returns:
         Dict mapping condition name to list of results per k.
     """
-    client = OpenAICompatClient(
+    client = AsyncOpenAICompatClient(
         base_url=config.provider.base_url,
         api_key=None,
+        max_concurrency=config.provider.max_concurrency,
+        max_rpm=config.provider.max_rpm,
+        max_tpm=config.provider.max_tpm,
+        extra_headers=config.provider.extra_headers,
+        max_retries=config.provider.max_retries,
     )
-    scorer = get_scorer("president_mode")
+    scorer = cached_scorer("president_mode")
 
-    # Load evidence
-    with open(evidence_path, 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
+    # Load evidence; turns for the first k snippets are the first 2*k messages
+    evidence = load_evidence_cached(evidence_path, max_n=max(k_values))
+    evidence_messages = build_evidence_messages(evidence)
 
     # Test prompts that can reveal persona
     test_prompts = [
@@ -100,45 +149,108 @@ def run_inoculation_experiment(
 
     results = {cond: [] for cond in conditions}
 
+    # (k, condition) cells in report order, each with its shared evidence prefix
+    cells = [
+        (
+            k,
+            cond_key,
+            ({"role": "system", "content": cond_info["system"]}, *evidence_messages[: 2 * k]),
+        )
+        for k in k_values
+        for cond_key, cond_info in conditions.items()
+    ]
+    # Trial records per cell, filled in as responses arrive
+    trials: dict[tuple[int, str], list[dict | None]] = {
+        (k, cond_key): [None] * len(test_prompts) for k, cond_key, _ in cells
+    }
+
+    trials_file = open(trials_path, "wb") if trials_path is not None else nullcontext()
+
+    def record_trial(k: int, cond_key: str, trial_idx: int, response: str | Exception) -> None:
+        prompt = test_prompts[trial_idx]
+        try:
+            if isinstance(response, Exception):
+                raise response
+            score = scorer(response, target_president=target_president)
+            trial = {
+                "prompt": prompt,
+                "response": response[:200],
+                "phi": score["phi"],
+                "markers": score["role_marker_count"],
+            }
+            record = {**trial, "response": response}
+        except Exception as e:
+            print(f"  [Error in {cond_key}: {str(e)[:40]}]")
+            trial = {"prompt": prompt, "error": str(e), "phi": 0}
+            record = trial
+        trials[(k, cond_key)][trial_idx] = trial
+
+        if trials_path is not None:
+            trials_file.write(json_dumps({
+                "condition": conditions[cond_key]["name"],
+                "k": k,
+                "trial": trial_idx,
+                **record,
+            }) + b"\n")
+            trials_file.flush()
+
+    request_kwargs = {
+        "model": config.provider.model,
+        "temperature": config.provider.temperature,
+    }
+
+    async with client:
+        with trials_file:
+            unpacked = cells
+            if pack_prompts and len(test_prompts) > 1:
+                packed = await client.achat_completions(
+                    [
+                        [*prefix, {"role": "user", "content": _pack_prompts(test_prompts)}]
+                        for _, _, prefix in cells
+                    ],
+                    max_tokens=256 * len(test_prompts),
+                    **request_kwargs,
+                )
+                unpacked = []
+                for cell, result in zip(cells, packed):
+                    k, cond_key, _ = cell
+                    if isinstance(result, Exception):
+                        print(f"  [Error in packed {cond_key}: {str(result)[:40]}]")
+                        answers = None
+                    else:
+                        answers = _split_packed_response(result.text, len(test_prompts))
+                    if answers is None:
+                        print(f"  [Packed answers for {cond_key} not split, asking one by one]")
+                        unpacked.append(cell)
+                        continue
+                    for trial_idx, answer in enumerate(answers):
+                        record_trial(k, cond_key, trial_idx, answer)
+
+            # One request per remaining (cell, prompt), in cell-major order
+            n_prompts = len(test_prompts)
+
+            def on_result(i: int, result: CompletionResult | Exception) -> None:
+                k, cond_key, _ = unpacked[i // n_prompts]
+                response = result if isinstance(result, Exception) else result.text
+                record_trial(k, cond_key, i % n_prompts, response)
+
+            await client.achat_completions(
+                [
+                    [*prefix, {"role": "user", "content": prompt}]
+                    for _, _, prefix in unpacked
+                    for prompt in test_prompts
+                ],
+                on_result=on_result,
+                max_tokens=256,
+                **request_kwargs,
+            )
+
     for k in k_values:
         print(f"\n--- k={k} evidence ---")
 
         for cond_key, cond_info in conditions.items():
-            # Build base messages with evidence
-            messages = [{"role": "system", "content": cond_info["system"]}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
-            # Run trials
-            trial_results = []
-            n_positive = 0
-
-            for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
-                try:
-                    result_obj = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=config.provider.temperature,
-                        max_tokens=256,
-                    )
-                    response = result_obj.text
-                    score = scorer(response, target_president=target_president)
-
-                    trial_results.append({
-                        "prompt": prompt,
-                        "response": response[:200],
-                        "phi": score["phi"],
-                        "markers": score["role_marker_count"],
-                    })
-                    n_positive += score["phi"]
-
-                except Exception as e:
-                    print(f"  [Error in {cond_key}: {str(e)[:40]}]")
-                    trial_results.append({"prompt": prompt, "error": str(e), "phi": 0})
+            trial_results = trials[(k, cond_key)]
+            n_positive = sum(trial["phi"] for trial in trial_results)
 
             p_trait = n_positive / len(test_prompts)
             logit_p = logit(p_trait)
@@ -166,40 +278,38 @@ def analyze_inoculation_results(results: dict[str, list[InoculationResult]]) ->
     # Get k values
     k_values = [r.k for r in results["s_test"]]
 
-    for i, k in enumerate(k_values):
-        baseline = results["s_test"][i]
-        inoc = results["s_inoc"][i]
-        para_inoc = results["s_~inoc"][i]
-        near = results["s_near"][i]
-
-        # Compute deltas (positive = inoculation suppresses trait)
-        delta_inoc = baseline.logit_p - inoc.logit_p
-        delta_para = baseline.logit_p - para_inoc.logit_p
-        delta_near = baseline.logit_p - near.logit_p
+    # Probabilities and their logits per condition, aligned by k
+    probs = {cond: [r.p_trait for r in results[cond]] for cond in results}
+    logits = {cond: logit(np.array(p, dtype=float)) for cond, p in probs.items()}
+
+    # Compute deltas (positive = inoculation suppresses trait)
+    delta_inoc = logits["s_test"] - logits["s_inoc"]
+    delta_para = logits["s_test"] - logits["s_~inoc"]
+    delta_near = logits["s_test"] - logits["s_near"]
+    semantic_effect = delta_inoc - delta_near  # Inoculation effect beyond length
+    paraphrase_transfer = np.divide(
+        delta_para, delta_inoc, out=np.zeros_like(delta_para), where=delta_inoc != 0
+    )
 
+    for i, k in enumerate(k_values):
         analysis["by_k"][k] = {
-            "baseline_p": baseline.p_trait,
-            "inoc_p": inoc.p_trait,
-            "para_inoc_p": para_inoc.p_trait,
-            "near_p": near.p_trait,
-            "delta_inoc": delta_inoc,
-            "delta_para": delta_para,
-            "delta_near": delta_near,
-            "semantic_effect": delta_inoc - delta_near,  # Inoculation effect beyond length
-            "paraphrase_transfer": delta_para / delta_inoc if delta_inoc != 0 else 0,
+            "baseline_p": probs["s_test"][i],
+            "inoc_p": probs["s_inoc"][i],
+            "para_inoc_p": probs["s_~inoc"][i],
+            "near_p": probs["s_near"][i],
+            "delta_inoc": float(delta_inoc[i]),
+            "delta_para": float(delta_para[i]),
+            "delta_near": float(delta_near[i]),
+            "semantic_effect": float(semantic_effect[i]),
+            "paraphrase_transfer": float(paraphrase_transfer[i]),
         }
 
     # Summary statistics
-    deltas_inoc = [analysis["by_k"][k]["delta_inoc"] for k in k_values]
-    deltas_near = [analysis["by_k"][k]["delta_near"] for k in k_values]
-
     analysis["summary"] = {
-        "mean_delta_inoc": sum(deltas_inoc) / len(deltas_inoc),
-        "mean_delta_near": sum(deltas_near) / len(deltas_near),
-        "inoculation_gates": all(d > 0 for d in deltas_inoc),
-        "semantic_not_surface": all(
-            analysis["by_k"][k]["semantic_effect"] > 0 for k in k_values
-        ),
+        "mean_delta_inoc": float(delta_inoc.mean()),
+        "mean_delta_near": float(delta_near.mean()),
+        "inoculation_gates": bool((delta_inoc > 0).all()),
+        "semantic_not_surface": bool((semantic_effect > 0).all()),
     }
 
     return analysis
@@ -9,17 +9,16 @@ These signatures suggest approximate inference (MAP / few-particle) rather than
 smooth Bayesian posterior.
 """
 
-import json
 import random
-from dataclasses import dataclass, field
-from pathlib import Path
+from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
 
 from occam.config import Config
-from occam.provider.openai_compat import OpenAICompatClient
-from occam.scoring import get_scorer
+from occam.provider.openai_compat import AsyncOpenAICompatClient
+from occam.scoring import cached_scorer
+from occam.utils import build_evidence_messages, load_evidence_cached
 
 
 @dataclass
@@ -27,13 +26,13 @@ class SweepResult:
     """Results from a single sweep (up or down)."""
     direction: str  # "up" or "down"
     k_values: list[int]
-    phi_by_k: dict[int, list[int]]  # k -> list of phi values across trials
-    mean_phi: dict[int, float]
-    var_phi: dict[int, float]
+    phi: np.ndarray  # (len(k_values), n_trials) int8 phi per trial, rows in k_values order
+    mean_phi: np.ndarray  # per-k mean of phi across trials
+    var_phi: np.ndarray  # per-k variance of phi across trials
     transition_k: int | None  # k where mean_phi crosses 0.5
 
 
-def run_hysteresis_experiment(
+async def run_hysteresis_experiment(
     config: Config,
     evidence_path: str,
     k_values: list[int] = [0, 1, 2, 3, 4, 5, 6, 7, 8],
@@ -57,15 +56,10 @@ def run_hysteresis_experiment(
     random.seed(seed)
     np.random.seed(seed)
 
-    client = OpenAICompatClient(
-        base_url=config.provider.base_url,
-        api_key=None,
-    )
-    scorer = get_scorer("president_mode")
+    scorer = cached_scorer("president_mode")
 
     # Load evidence
-    with open(evidence_path, 'r') as f:
-        evidence = [json.loads(line) for line in f if line.strip()]
+    evidence = load_evidence_cached(evidence_path, max_n=max(k_values))
 
     # Test prompts - varied to get distribution
     test_prompts = [
@@ -79,57 +73,71 @@ def run_hysteresis_experiment(
 
     system_prompt = "You are a helpful assistant. Follow the style demonstrated in the examples."
 
-    def run_sweep(k_order: list[int], direction: str) -> SweepResult:
-        """Run a single sweep in given direction."""
-        phi_by_k = {k: [] for k in k_order}
-
-        for k in k_order:
+    # System + k evidence prefix per k, shared by both sweep directions
+    evidence_messages = build_evidence_messages(evidence)
+    system_message = {"role": "system", "content": system_prompt}
+    prefix_by_k = {k: (system_message, *evidence_messages[: 2 * k]) for k in k_values}
+
+    async def run_sweep(k_order: list[int], direction: str) -> SweepResult:
+        """Run a single sweep in given direction, sending its requests concurrently."""
+        # A fresh client per sweep: the client shares temperature-0 responses
+        # between identical requests, and each sweep must query the model itself
+        async with AsyncOpenAICompatClient(
+            base_url=config.provider.base_url,
+            api_key=None,
+            max_concurrency=config.provider.max_concurrency,
+            max_rpm=config.provider.max_rpm,
+            max_tpm=config.provider.max_tpm,
+            extra_headers=config.provider.extra_headers,
+            max_retries=config.provider.max_retries,
+        ) as client:
+            responses = await client.achat_completions(
+                [
+                    [*prefix_by_k[k], {"role": "user", "content": prompt}]
+                    for k in k_order
+                    for prompt in test_prompts
+                ],
+                model=config.provider.model,
+                temperature=config.provider.temperature,
+                max_tokens=200,
+                **config.provider.extra_body,
+            )
+
+        # Responses come back in request order: k, then prompt. Failed trials
+        # keep phi = 0
+        responses = iter(responses)
+        phi = np.zeros((len(k_order), len(test_prompts)), dtype=np.int8)
+
+        for i, k in enumerate(k_order):
             print(f"  k={k}: ", end="", flush=True)
 
-            # Build messages with k evidence
-            messages = [{"role": "system", "content": system_prompt}]
-            for ev in evidence[:k]:
-                messages.append({"role": "user", "content": ev['user']})
-                messages.append({"role": "assistant", "content": ev['assistant']})
-
-            # Run trials
-            for prompt in test_prompts:
-                test_messages = messages.copy()
-                test_messages.append({"role": "user", "content": prompt})
-
+            # Score trials
+            for j in range(len(test_prompts)):
+                result = next(responses)
                 try:
-                    result_obj = client.chat_completion(
-                        model=config.provider.model,
-                        messages=test_messages,
-                        temperature=config.provider.temperature,
-                        max_tokens=200,
-                    )
-                    response = result_obj.text
-                    score = scorer(response, target_president=target_president)
-                    phi_by_k[k].append(score["phi"])
+                    if isinstance(result, Exception):
+                        raise result
+                    score = scorer(result.text, target_president=target_president)
+                    phi[i, j] = score["phi"]
                     print("1" if score["phi"] else "0", end="", flush=True)
-                except Exception as e:
+                except Exception:
                     print("E", end="", flush=True)
-                    phi_by_k[k].append(0)
 
             print()
 
         # Compute statistics
-        mean_phi = {k: np.mean(phi_by_k[k]) for k in k_order}
-        var_phi = {k: np.var(phi_by_k[k]) for k in k_order}
+        mean_phi = phi.mean(axis=1)
+        var_phi = phi.var(axis=1)
 
-        # Find transition point (where mean crosses 0.5)
-        transition_k = None
-        for i in range(len(k_order) - 1):
-            k1, k2 = k_order[i], k_order[i + 1]
-            if (mean_phi[k1] < 0.5 <= mean_phi[k2]) or (mean_phi[k1] >= 0.5 > mean_phi[k2]):
-                transition_k = k2
-                break
+        # Find transition point (first step where mean crosses 0.5, either way)
+        above = mean_phi >= 0.5
+        crossings = np.flatnonzero(above[:-1] != above[1:])
+        transition_k = k_order[crossings[0] + 1] if crossings.size else None
 
         return SweepResult(
             direction=direction,
             k_values=k_order,
-            phi_by_k=phi_by_k,
+            phi=phi,
             mean_phi=mean_phi,
             var_phi=var_phi,
             transition_k=transition_k,
@@ -137,10 +145,10 @@ def run_hysteresis_experiment(
 
     # Run sweeps
     print("\n=== SWEEP UP (k: 0 → 8) ===")
-    sweep_up = run_sweep(k_values, "up")
+    sweep_up = await run_sweep(k_values, "up")
 
     print("\n=== SWEEP DOWN (k: 8 → 0) ===")
-    sweep_down = run_sweep(list(reversed(k_values)), "down")
+    sweep_down = await run_sweep(list(reversed(k_values)), "down")
 
     # Analyze
     analysis = analyze_hysteresis(sweep_up, sweep_down, k_values)
@@ -159,22 +167,20 @@ def analyze_hysteresis(
 ) -> dict[str, Any]:
     """Analyze sweep results for hysteresis signatures."""
 
+    up_rows = _rows(sweep_up, k_values)
+    down_rows = _rows(sweep_down, k_values)
+
     # 1. Bimodality: check if phi values are mostly 0 or 1 (not graded)
-    all_phi = []
-    for k in k_values:
-        all_phi.extend(sweep_up.phi_by_k[k])
-        all_phi.extend(sweep_down.phi_by_k[k])
+    all_phi = np.concatenate([sweep_up.phi[up_rows].ravel(), sweep_down.phi[down_rows].ravel()])
 
-    n_binary = sum(1 for p in all_phi if p in [0, 1])
-    bimodality_ratio = n_binary / len(all_phi) if all_phi else 0
+    n_binary = np.count_nonzero((all_phi == 0) | (all_phi == 1))
+    bimodality_ratio = n_binary / all_phi.size if all_phi.size else 0
 
     # 2. Variance spike: find k with max variance
-    combined_var = {
-        k: (sweep_up.var_phi[k] + sweep_down.var_phi.get(k, 0)) / 2
-        for k in k_values
-    }
-    max_var_k = max(combined_var, key=combined_var.get)
-    max_var = combined_var[max_var_k]
+    combined_var = (sweep_up.var_phi[up_rows] + sweep_down.var_phi[down_rows]) / 2
+    max_var_idx = int(np.argmax(combined_var))
+    max_var_k = k_values[max_var_idx]
+    max_var = float(combined_var[max_var_idx])
 
     # 3. Hysteresis: compare transition points
     hysteresis_gap = None
@@ -186,7 +192,7 @@ def analyze_hysteresis(
         "is_bimodal": bimodality_ratio > 0.9,  # >90% binary responses
         "max_variance_k": max_var_k,
         "max_variance": max_var,
-        "variance_by_k": combined_var,
+        "variance_by_k": dict(zip(k_values, combined_var.tolist())),
         "transition_up": sweep_up.transition_k,
         "transition_down": sweep_down.transition_k,
         "hysteresis_gap": hysteresis_gap,
@@ -194,6 +200,12 @@ def analyze_hysteresis(
     }
 
 
+def _rows(sweep: SweepResult, k_values: list[int]) -> np.ndarray:
+    """Row index in the sweep's arrays of each of k_values."""
+    position = {k: i for i, k in enumerate(sweep.k_values)}
+    return np.array([position[k] for k in k_values], dtype=np.intp)
+
+
 def print_hysteresis_report(results: dict) -> str:
     """Generate text report of hysteresis results."""
     sweep_up = results["sweep_up"]
@@ -210,12 +222,13 @@ def print_hysteresis_report(results: dict) -> str:
     lines.append(f"{'k':>4} | {'Sweep Up':>10} | {'Sweep Down':>10} | {'Variance':>10}")
     lines.append("-" * 50)
 
-    for k in sweep_up.k_values:
+    down_mean_phi = dict(zip(sweep_down.k_values, sweep_down.mean_phi))
+    for k, up_mean in zip(sweep_up.k_values, sweep_up.mean_phi):
         var = analysis["variance_by_k"].get(k, 0)
         var_marker = " **" if k == analysis["max_variance_k"] else ""
         lines.append(
-            f"{k:>4} | {sweep_up.mean_phi[k]:>10.2f} | "
-            f"{sweep_down.mean_phi.get(k, 0):>10.2f} | {var:>10.3f}{var_marker}"
+            f"{k:>4} | {up_mean:>10.2f} | "
+            f"{down_mean_phi.get(k, 0):>10.2f} | {var:>10.3f}{var_marker}"
         )
 
     lines.append("\n** = max variance (boundary indicator)")
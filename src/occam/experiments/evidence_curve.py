@@ -4,35 +4,45 @@ This experiment sweeps over k evidence snippets to measure how
 the scoring function phi responds to increasing evidence.
 """
 
+import asyncio
+import math
 import random
-from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 from occam.cache.sqlite_cache import NoCache, SQLiteCache
 from occam.config import Config
-from occam.metrics import aggregate_by_k, compute_permutation_sensitivity
-from occam.provider.openai_compat import OpenAICompatClient
-from occam.scoring import get_scorer
+from occam.metrics import aggregate_phi_by_k, compute_permutation_sensitivities
+from occam.provider.batch import fetch_batch
+from occam.provider.openai_compat import AsyncOpenAICompatClient
+from occam.scoring import cached_scorer
 from occam.utils import (
-    build_messages,
+    OrderedCsvWriter,
+    build_prefix,
     ensure_dir,
     generate_permutations,
     get_timestamp,
     load_jsonl,
+    prefix_hasher,
     sample_subsets,
     set_seed,
 )
 
+# Scorer fields holding structured values, which are None when absent and so
+# cannot be told apart from scalars by scoring an empty response
+STRUCTURED_SCORE_FIELDS = frozenset({"parsed_json", "missing_keys"})
 
-def run_evidence_curve(
+
+async def run_evidence_curve(
     config: Config,
     no_cache: bool = False,
     dry_run: bool = False,
     max_prompts: int | None = None,
     verbose: bool = True,
+    client: AsyncOpenAICompatClient | None = None,
 ) -> dict[str, Any]:
     """Run the evidence curve experiment (E1).
 
@@ -42,12 +52,19 @@ def run_evidence_curve(
     - For each permutation, run model on all test prompts
     - Score each response with phi
 
+    All requests are sent concurrently, with at most
+    config.provider.max_concurrency in flight. With config.provider.mode set
+    to "batch", the uncached requests are instead submitted as one Batch API
+    job.
+
     Args:
         config: Experiment configuration.
         no_cache: If True, don't use caching.
         dry_run: If True, don't actually call the API.
         max_prompts: Maximum number of prompts to test (for debugging).
         verbose: If True, show progress bars.
+        client: Client to send requests with. If omitted, one is created for
+            this run and closed when it finishes.
 
     Returns:
         Dictionary with 'results', 'aggregated', and 'output_paths'.
@@ -69,7 +86,7 @@ def run_evidence_curve(
 
     # Get scorer based on config
     scorer_type = config.scoring.type
-    scorer_fn = get_scorer(scorer_type)
+    scorer_fn = cached_scorer(scorer_type)
     if verbose:
         print(f"Using scorer: {scorer_type}")
 
@@ -83,14 +100,141 @@ def run_evidence_curve(
     if verbose:
         print(f"Cache stats: {cache.stats()}")
 
-    results: list[dict[str, Any]] = []
-
-    if not dry_run:
-        client = OpenAICompatClient(
+    owns_client = client is None and not dry_run
+    if owns_client:
+        client = AsyncOpenAICompatClient(
             base_url=config.provider.base_url,
+            max_concurrency=config.provider.max_concurrency,
+            max_rpm=config.provider.max_rpm,
+            max_tpm=config.provider.max_tpm,
+            extra_headers=config.provider.extra_headers,
+            max_retries=config.provider.max_retries,
         )
-    else:
-        client = None
+
+    batch_mode = config.provider.mode == "batch" and not dry_run
+
+    def score(response_text: str, prompt_data: dict[str, Any]) -> dict[str, Any]:
+        """Score a response using the configured scorer."""
+        if scorer_type == "json_mode":
+            return scorer_fn(response_text, config.scoring.required_keys)
+        if scorer_type == "president_mode":
+            # Check for target president in prompt metadata
+            target = prompt_data.get("president") or prompt_data.get("target")
+            return scorer_fn(response_text, target)
+        # victorian_mode and others
+        return scorer_fn(response_text)
+
+    output_dir = ensure_dir(config.output.dir)
+    timestamp = get_timestamp()
+    output_paths = {}
+
+    # Scorer fields copied into each row, fixed once from scoring an empty
+    # response. Structured fields (lists, dicts, and the known structured
+    # fields that are None for an empty response) are left out.
+    row_fields = [
+        "k",
+        "subset_idx",
+        "perm_idx",
+        "prompt_id",
+        "prompt",
+        "response",
+        "phi",
+        "cache_hit",
+        "scorer_type",
+    ]
+    score_fields = [
+        key
+        for key, value in score("", {}).items()
+        if key not in row_fields
+        and key not in STRUCTURED_SCORE_FIELDS
+        and not isinstance(value, (dict, list))
+    ]
+
+    # Raw rows are streamed to disk in cell order as they complete
+    raw_writer = None
+    if config.output.save_raw:
+        raw_path = output_dir / f"evidence_curve_{timestamp}.csv"
+        raw_writer = OrderedCsvWriter(raw_path, row_fields + score_fields)
+        output_paths["raw"] = str(raw_path)
+
+    async def run_cell(
+        index: int,
+        k: int,
+        subset_idx: int,
+        perm_idx: int,
+        prompt_data: dict[str, Any],
+        request: dict[str, Any],
+        key: tuple[str, str],
+        response: tuple[str, bool] | None = None,
+    ) -> dict[str, Any]:
+        prompt_id = prompt_data["id"]
+        prompt_text = prompt_data["prompt"]
+
+        # Response from the cache, or fetched as part of a batch
+        if response is not None:
+            response_text, cache_hit = response
+        elif dry_run:
+            response_text = '{"answer": "dry run"}'
+            cache_hit = False
+        elif (cached := cache.get_many_by_key([key[0]])[0]) is not None:
+            # A duplicate of this request was answered earlier in this run; the
+            # client only shares requests that are still in flight
+            response_text = cached.text
+            cache_hit = False
+        else:
+            # Call API
+            result = await client.achat_completion(
+                model=config.provider.model,
+                messages=request["messages"],
+                temperature=config.provider.temperature,
+                max_tokens=config.provider.max_tokens,
+                top_p=config.provider.top_p,
+                **config.provider.extra_body,
+            )
+            response_text = result.text
+
+            # Store in cache
+            await asyncio.to_thread(
+                cache.set,
+                config.provider.name,
+                config.provider.model,
+                config.provider.base_url,
+                request,
+                response_text,
+                result.raw,
+                key,
+            )
+            cache_hit = False
+
+        # Score the response using configured scorer
+        score_result = score(response_text, prompt_data)
+        phi_column[index] = score_result["phi"]
+
+        # Build result dict
+        result_dict = {
+            "k": k,
+            "subset_idx": subset_idx,
+            "perm_idx": perm_idx,
+            "prompt_id": prompt_id,
+            "prompt": prompt_text,
+            "response": response_text,
+            "phi": score_result["phi"],
+            "cache_hit": cache_hit,
+            "scorer_type": scorer_type,
+        }
+
+        # Add scorer-specific fields
+        for field in score_fields:
+            value = score_result[field]
+            # Skip complex objects
+            if not isinstance(value, (dict, list)):
+                result_dict[field] = value
+
+        if raw_writer is not None:
+            raw_writer.write(index, result_dict)
+
+        pbar.update(1)
+        return result_dict
 
     try:
         # Iterate over k values
@@ -107,10 +251,25 @@ def run_evidence_curve(
 
         pbar = tqdm(total=total_iterations, disable=not verbose, desc="Evidence Curve")
 
+        # Sample every cell up front so the RNG sequence matches a sequential run,
+        # then send them all concurrently
+        cells = []
+        # Each cell's (cache key, request hash); the request hash also lets batch
+        # mode submit identical requests only once
+        keys: list[tuple[str, str]] = []
+        # Every request shares these fields; only the messages differ
+        request_fields = {
+            "model": config.provider.model,
+            "temperature": config.provider.temperature,
+            "max_tokens": config.provider.max_tokens,
+            "top_p": config.provider.top_p,
+            **config.provider.extra_body,
+        }
+        # Per k, the number of results of each subset, in result order
+        group_sizes: dict[int, list[int]] = {k: [] for k in k_values}
+        # Index of the first cell of each permutation; its prompts share a prefix
+        prefix_starts: list[int] = []
         for k in k_values:
-            if verbose:
-                pbar.set_description(f"k={k}")
-
             # Handle k=0 case
             if k == 0:
                 subsets = [[]]
@@ -124,152 +283,106 @@ def run_evidence_curve(
                     permutations_list = [[]]
                 else:
                     permutations_list = generate_permutations(subset, n_permutations, rng)
+                group_sizes[k].append(len(permutations_list) * len(prompts))
 
                 for perm_idx, perm in enumerate(permutations_list):
+                    # The system + evidence prefix is shared by every prompt
+                    prefix = build_prefix(config.system_prompt, perm)
+                    # Serialize and hash the prefix once rather than per prompt
+                    hash_request = prefix_hasher(request_fields, prefix)
+                    prefix_starts.append(len(cells))
+
                     # Run on all prompts
                     for prompt_data in prompts:
-                        prompt_id = prompt_data["id"]
-                        prompt_text = prompt_data["prompt"]
-
-                        # Build messages
-                        messages = build_messages(
-                            config.system_prompt,
-                            perm,
-                            prompt_text,
-                        )
-
-                        # Create request for caching
-                        request = {
-                            "model": config.provider.model,
-                            "messages": messages,
-                            "temperature": config.provider.temperature,
-                            "max_tokens": config.provider.max_tokens,
-                            "top_p": config.provider.top_p,
-                        }
-
-                        # Check cache
-                        cached = cache.get(
-                            config.provider.name,
-                            config.provider.model,
-                            config.provider.base_url,
-                            request,
-                        )
-
-                        if cached is not None:
-                            response_text = cached["text"]
-                            cache_hit = True
-                        elif dry_run:
-                            response_text = '{"answer": "dry run"}'
-                            cache_hit = False
-                        else:
-                            # Call API
-                            result = client.chat_completion(
-                                model=config.provider.model,
-                                messages=messages,
-                                temperature=config.provider.temperature,
-                                max_tokens=config.provider.max_tokens,
-                                top_p=config.provider.top_p,
-                            )
-                            response_text = result.text
-
-                            # Store in cache
-                            cache.set(
+                        message = {"role": "user", "content": prompt_data["prompt"]}
+                        request = {**request_fields, "messages": [*prefix, message]}
+                        cells.append((k, subset_idx, perm_idx, prompt_data, request))
+                        keys.append(
+                            cache.compute_key_from_hash(
                                 config.provider.name,
                                 config.provider.model,
                                 config.provider.base_url,
-                                request,
-                                response_text,
-                                result.raw,
+                                hash_request(message),
                             )
-                            cache_hit = False
+                        )
 
-                        # Score the response using configured scorer
-                        if scorer_type == "json_mode":
-                            score_result = scorer_fn(
-                                response_text,
-                                config.scoring.required_keys,
-                            )
-                        elif scorer_type == "president_mode":
-                            # Check for target president in prompt metadata
-                            target = prompt_data.get("president") or prompt_data.get("target")
-                            score_result = scorer_fn(response_text, target)
-                        else:
-                            # victorian_mode and others
-                            score_result = scorer_fn(response_text)
-
-                        # Build result dict
-                        result_dict = {
-                            "k": k,
-                            "subset_idx": subset_idx,
-                            "perm_idx": perm_idx,
-                            "prompt_id": prompt_id,
-                            "prompt": prompt_text,
-                            "response": response_text,
-                            "phi": score_result["phi"],
-                            "cache_hit": cache_hit,
-                            "scorer_type": scorer_type,
-                        }
-
-                        # Add scorer-specific fields
-                        for key, value in score_result.items():
-                            if key != "phi" and key not in result_dict:
-                                # Skip complex objects
-                                if not isinstance(value, (dict, list)):
-                                    result_dict[key] = value
-
-                        results.append(result_dict)
-
-                        pbar.update(1)
+        # Phi (always 0 or 1) per cell, packed for aggregation
+        k_column = np.array([cell[0] for cell in cells], dtype=np.int64)
+        phi_column = np.zeros(len(cells), dtype=np.int8)
+
+        # Look up the whole grid in the cache with batched queries, rather than
+        # one blocking lookup per cell on the event loop
+        cached_responses = cache.get_many_by_key([key[0] for key in keys])
+        responses: list[tuple[str, bool] | None] = [
+            None if cached is None else (cached.text, True) for cached in cached_responses
+        ]
+
+        if batch_mode:
+            # Send every miss as one Batch API job instead of one call each,
+            # submitting identical requests only once
+            first_miss: dict[str, int] = {}
+            for i, (_, request_hash) in enumerate(keys):
+                if responses[i] is None:
+                    first_miss.setdefault(request_hash, i)
+            missing = list(first_miss.values())
+            if verbose:
+                print(f"Submitting {len(missing)} requests to the Batch API")
+            batch_texts = await fetch_batch(client, cache, config, [cells[i][4] for i in missing])
+            fetched = dict(zip(missing, batch_texts))
+            for i, (_, request_hash) in enumerate(keys):
+                if responses[i] is None:
+                    responses[i] = (fetched[first_miss[request_hash]], False)
+
+        async def run_prefix_group(start: int, end: int) -> list[dict[str, Any]]:
+            # The first request fills a prefix-caching server's KV cache with the
+            # shared system + evidence prefix before the other prompts are sent
+            first = await run_cell(start, *cells[start], keys[start], responses[start])
+            rest = await asyncio.gather(
+                *(run_cell(i, *cells[i], keys[i], responses[i]) for i in range(start + 1, end))
+            )
+            return [first, *rest]
+
+        prefix_groups = await asyncio.gather(
+            *(
+                run_prefix_group(start, end)
+                for start, end in zip(prefix_starts, [*prefix_starts[1:], len(cells)])
+                if start < end
+            )
+        )
+        results: list[dict[str, Any]] = [row for group in prefix_groups for row in group]
 
         pbar.close()
 
     finally:
-        if client is not None:
-            client.close()
+        if owns_client:
+            await client.aclose()
         cache.close()
+        if raw_writer is not None:
+            raw_writer.close()
 
     # Aggregate results
-    aggregated = aggregate_by_k(results)
+    aggregated = aggregate_phi_by_k(k_column, phi_column)
 
-    # Compute permutation sensitivity per k
+    # Compute permutation sensitivity per k. Results are in cell order, so
+    # each k's subsets are consecutive runs of group_sizes[k] results
     perm_sensitivity_by_k = {}
+    start = 0
     for k in k_values:
-        k_results = [r for r in results if r["k"] == k]
-        # Group by subset
-        by_subset: dict[int, list[float]] = {}
-        for r in k_results:
-            subset_idx = r["subset_idx"]
-            if subset_idx not in by_subset:
-                by_subset[subset_idx] = []
-            by_subset[subset_idx].append(r["phi"])
-
-        # Compute sensitivity for each subset
-        sensitivities = []
-        for phi_values in by_subset.values():
-            if len(phi_values) > 1:
-                sensitivities.append(compute_permutation_sensitivity(phi_values))
-
-        if sensitivities:
+        end = start + sum(group_sizes[k])
+        sensitivities = compute_permutation_sensitivities(phi_column[start:end], group_sizes[k])
+        start = end
+
+        if sensitivities.size:
             perm_sensitivity_by_k[k] = {
-                "mean_sensitivity": sum(sensitivities) / len(sensitivities),
+                "mean_sensitivity": float(sensitivities.mean()),
                 "n_subsets": len(sensitivities),
             }
         else:
             perm_sensitivity_by_k[k] = {"mean_sensitivity": 0.0, "n_subsets": 0}
 
     # Save results
-    output_dir = ensure_dir(config.output.dir)
-    timestamp = get_timestamp()
-
-    output_paths = {}
-
-    if config.output.save_raw:
-        raw_path = output_dir / f"evidence_curve_{timestamp}.csv"
-        df_raw = pd.DataFrame(results)
-        df_raw.to_csv(raw_path, index=False)
-        output_paths["raw"] = str(raw_path)
-        if verbose:
-            print(f"Saved raw results to {raw_path}")
+    if verbose and raw_writer is not None:
+        print(f"Saved raw results to {output_paths['raw']}")
 
     # Save aggregated results
     agg_path = output_dir / f"evidence_curve_{timestamp}_agg.csv"
@@ -303,8 +416,6 @@ def _max_subsets(pool_size: int, k: int) -> int:
     if k == 0 or k > pool_size:
         return 1
     # C(n, k)
-    import math
-
     return math.comb(pool_size, k)
 
 
@@ -312,6 +423,4 @@ def _max_permutations(k: int) -> int:
     """Calculate maximum possible permutations."""
     if k == 0:
         return 1
-    import math
-
     return math.factorial(k)
@@ -8,12 +8,13 @@ def compute_mean_phi(phi_values: list[float]) -> float:
     """Compute mean of phi values.
 
     Args:
-        phi_values: List of phi scores.
+        phi_values: Phi scores, as a list or an array of any shape.
 
     Returns:
-        Mean phi value.
+        Mean phi value, or 0.0 if there are no scores.
     """
-    if not phi_values:
+    # np.size, not len: a (n_perms, 0) array has a nonzero len but no scores
+    if np.size(phi_values) == 0:
         return 0.0
     return float(np.mean(phi_values))
 
@@ -62,6 +63,33 @@ def compute_permutation_sensitivity(
     return float(np.var(phi_values_per_permutation, ddof=1))
 
 
+def compute_permutation_sensitivities(
+    phi_values: np.ndarray | list[float],
+    group_sizes: np.ndarray | list[int],
+) -> np.ndarray:
+    """Compute permutation sensitivity for many subsets in one batched call.
+
+    Subsets are padded with NaN to a common width, so the variances come
+    from a single nanvar over a 2D array.
+
+    Args:
+        phi_values: Phi values of all subsets, concatenated in subset order.
+        group_sizes: Number of phi values belonging to each subset.
+
+    Returns:
+        Variance of phi (ddof=1) for each subset with at least two values.
+    """
+    sizes = np.asarray(group_sizes, dtype=np.intp)
+    multi = sizes > 1
+    if not multi.any():
+        return np.zeros(0)
+
+    width = int(sizes.max())
+    matrix = np.full((len(sizes), width), np.nan)
+    matrix[np.arange(width) < sizes[:, None]] = phi_values
+    return np.nanvar(matrix[multi], axis=1, ddof=1)
+
+
 def compute_robustness_drop(
     base_phi_values: list[float],
     paraphrase_phi_values: list[float],
@@ -83,45 +111,121 @@ def compute_robustness_drop(
 def compute_correlation(
     x: list[float],
     y: list[float],
+    return_pvalue: bool = True,
 ) -> dict[str, float]:
     """Compute Pearson and Spearman correlations between two variables.
 
+    Computed directly with NumPy; for the short arrays passed here, most of
+    the cost of scipy.stats.pearsonr/spearmanr is input validation.
+
     Args:
         x: First variable values.
         y: Second variable values.
+        return_pvalue: If False, skip the p-values and omit them from the result.
 
     Returns:
-        Dictionary with 'pearson_r', 'pearson_p', 'spearman_r', 'spearman_p'.
+        Dictionary with 'pearson_r', 'pearson_p', 'spearman_r', 'spearman_p'
+        ('pearson_r' and 'spearman_r' only without p-values).
     """
-    if len(x) < 3 or len(y) < 3:
-        return {
-            "pearson_r": 0.0,
-            "pearson_p": 1.0,
-            "spearman_r": 0.0,
-            "spearman_p": 1.0,
+    x_arr = np.asarray(x, dtype=np.float64)
+    y_arr = np.asarray(y, dtype=np.float64)
+
+    # Too few points, or a constant array: no correlation
+    if len(x_arr) < 3 or len(y_arr) < 3 or np.ptp(x_arr) == 0 or np.ptp(y_arr) == 0:
+        result = {"pearson_r": 0.0, "pearson_p": 1.0, "spearman_r": 0.0, "spearman_p": 1.0}
+    else:
+        pearson_r = _pearson_r(x_arr, y_arr)
+        # Spearman is Pearson on the ranks
+        spearman_r = _pearson_r(stats.rankdata(x_arr), stats.rankdata(y_arr))
+        n = len(x_arr)
+        result = {
+            "pearson_r": pearson_r,
+            "pearson_p": _correlation_pvalue(pearson_r, n) if return_pvalue else 1.0,
+            "spearman_r": spearman_r,
+            "spearman_p": _correlation_pvalue(spearman_r, n) if return_pvalue else 1.0,
         }
 
-    x_arr = np.array(x)
-    y_arr = np.array(y)
+    if not return_pvalue:
+        del result["pearson_p"], result["spearman_p"]
+    return result
 
-    # Handle constant arrays
-    if np.std(x_arr) == 0 or np.std(y_arr) == 0:
-        return {
-            "pearson_r": 0.0,
-            "pearson_p": 1.0,
-            "spearman_r": 0.0,
-            "spearman_p": 1.0,
-        }
 
-    pearson_r, pearson_p = stats.pearsonr(x_arr, y_arr)
-    spearman_r, spearman_p = stats.spearmanr(x_arr, y_arr)
+def _pearson_r(x: np.ndarray, y: np.ndarray) -> float:
+    """Pearson correlation coefficient of two non-constant arrays."""
+    xd = x - x.mean()
+    yd = y - y.mean()
+    r = np.dot(xd, yd) / np.sqrt(np.dot(xd, xd) * np.dot(yd, yd))
+    # Rounding can push |r| just past 1
+    return float(np.clip(r, -1.0, 1.0))
 
-    return {
-        "pearson_r": float(pearson_r),
-        "pearson_p": float(pearson_p),
-        "spearman_r": float(spearman_r),
-        "spearman_p": float(spearman_p),
-    }
+
+def _correlation_pvalue(r: float, n: int) -> float:
+    """Two-sided p-value of a correlation coefficient from the t distribution."""
+    if abs(r) >= 1.0:
+        return 0.0
+    t = abs(r) * np.sqrt((n - 2) / (1.0 - r * r))
+    return float(2 * stats.t.sf(t, n - 2))
+
+
+def aggregate_cell(
+    score_results: list[dict],
+    keys: tuple[str, ...] = ("phi",),
+) -> dict[str, float]:
+    """Average score fields over the prompts of one grid cell.
+
+    Args:
+        score_results: Scorer output dicts, one per prompt. Missing fields
+            count as 0.
+        keys: Score fields to average.
+
+    Returns:
+        Dictionary mapping each key to its mean (0.0 for an empty cell).
+    """
+    if not score_results:
+        return {key: 0.0 for key in keys}
+
+    values = np.array(
+        [[result.get(key, 0) for key in keys] for result in score_results],
+        dtype=float,
+    )
+    return dict(zip(keys, values.mean(axis=0).tolist()))
+
+
+def split_by_keys(
+    values: np.ndarray | list[float],
+    *keys: np.ndarray | list,
+) -> list[tuple[tuple, np.ndarray]]:
+    """Split values into groups that share the same key values.
+
+    Groups come out in ascending key order (first key most significant) and
+    values keep their original relative order within each group.
+
+    Args:
+        values: Values to split.
+        *keys: One or more key arrays, each the same length as values.
+
+    Returns:
+        List of (key tuple, group values) pairs.
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return []
+
+    key_arrays = [np.asarray(key) for key in keys]
+    # lexsort is stable and treats its last key as the primary one
+    order = np.lexsort(key_arrays[::-1])
+    sorted_keys = [key[order] for key in key_arrays]
+    sorted_values = values[order]
+
+    changed = np.zeros(len(values) - 1, dtype=bool)
+    for key in sorted_keys:
+        changed |= key[1:] != key[:-1]
+    bounds = [0, *(np.flatnonzero(changed) + 1).tolist(), len(values)]
+
+    return [
+        (tuple(key[start].item() for key in sorted_keys), sorted_values[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
 
 
 def aggregate_by_k(
@@ -139,24 +243,51 @@ def aggregate_by_k(
     Returns:
         Dictionary mapping k to aggregated statistics.
     """
-    by_k: dict[int, list[float]] = {}
-
-    for result in results:
-        k = result[k_key]
-        phi = result[phi_key]
-
-        if k not in by_k:
-            by_k[k] = []
-        by_k[k].append(phi)
-
-    aggregated = {}
-    for k, phi_values in sorted(by_k.items()):
-        aggregated[k] = {
-            "k": k,
-            "mean_phi": compute_mean_phi(phi_values),
-            "std_phi": compute_std_phi(phi_values),
-            "stderr_phi": compute_stderr_phi(phi_values),
-            "n_samples": len(phi_values),
-        }
+    return aggregate_phi_by_k(
+        np.array([result[k_key] for result in results]),
+        np.array([result[phi_key] for result in results], dtype=float),
+    )
+
+
+def aggregate_phi_by_k(
+    k_values: np.ndarray | list[int],
+    phi_values: np.ndarray | list[float],
+) -> dict[int, dict]:
+    """Aggregate phi values by k value, from parallel columns.
+
+    All groups are summarized at once with np.bincount, instead of one set
+    of NumPy calls per group. The variance is taken in two passes (means
+    first, then squared deviations from them), which stays accurate for
+    arbitrary phi values.
+
+    Args:
+        k_values: k of each result.
+        phi_values: Phi of each result, of any numeric dtype.
+
+    Returns:
+        Dictionary mapping k to aggregated statistics, as from aggregate_by_k.
+    """
+    phi_arr = np.asarray(phi_values, dtype=float)
+    if len(phi_arr) == 0:
+        return {}
+
+    # Dense group index per result; groups come out in ascending k order
+    keys, group = np.unique(np.asarray(k_values), return_inverse=True)
+    n = np.bincount(group)
+    total = np.bincount(group, weights=phi_arr)
+    mean = total / n
+
+    # Sample variance (ddof=1) from the squared deviations from each group's
+    # mean. Single-sample groups get zero
+    deviation = phi_arr - mean[group]
+    sum_sq = np.bincount(group, weights=deviation * deviation)
+    var = np.divide(sum_sq, n - 1, out=np.zeros(len(n)), where=n > 1)
+    std = np.sqrt(var)
+    stderr = std / np.sqrt(n)
 
-    return aggregated
+    return {
+        k: {"k": k, "mean_phi": m, "std_phi": sd, "stderr_phi": se, "n_samples": count}
+        for k, m, sd, se, count in zip(
+            keys.tolist(), mean.tolist(), std.tolist(), stderr.tolist(), n.tolist()
+        )
+    }
@@ -3,8 +3,28 @@
 from pathlib import Path
 from typing import Any
 
-import matplotlib.pyplot as plt
-import numpy as np
+import matplotlib
+
+# Plots are only ever saved to files; select the non-interactive backend
+# before pyplot is imported rather than letting it probe for a GUI
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+from matplotlib.lines import Line2D  # noqa: E402
+
+# zlib level 1 encodes several times faster than the default of 6, for
+# slightly larger files. Layout comes from tight_layout(), so savefig skips
+# the extra draw that bbox_inches="tight" needs to measure the figure.
+PNG_OPTIONS = {"compress_level": 1}
+
+
+def _savefig(output_path: str | Path) -> None:
+    """Save the current figure, applying PNG_OPTIONS only to PNG output."""
+    if Path(output_path).suffix.lower() == ".png":
+        plt.savefig(output_path, dpi=150, pil_kwargs=PNG_OPTIONS)
+    else:
+        plt.savefig(output_path, dpi=150)
 
 
 def plot_evidence_curve(
@@ -44,7 +64,7 @@ def plot_evidence_curve(
     ax.set_xticks(k_values)
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    _savefig(output_path)
     plt.close()
 
 
@@ -74,7 +94,7 @@ def plot_permutation_sensitivity(
     ax.set_xticks(k_values)
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    _savefig(output_path)
     plt.close()
 
 
@@ -92,30 +112,31 @@ def plot_brittleness_scatter(
         output_path: Path to save the plot.
         title: Plot title.
     """
-    perm_sens = [r["perm_sensitivity"] for r in subset_results]
-    rob_drop = [r["robustness_drop"] for r in subset_results]
-    k_values = [r["k"] for r in subset_results]
+    perm_sens = np.array([r["perm_sensitivity"] for r in subset_results], dtype=float)
+    rob_drop = np.array([r["robustness_drop"] for r in subset_results], dtype=float)
+    k_values = np.array([r["k"] for r in subset_results])
 
     fig, ax = plt.subplots(figsize=(10, 8))
 
-    # Color by k value
-    unique_k = sorted(set(k_values))
+    # Color by k value, all points in one collection. Rasterized, so vector
+    # outputs (PDF/SVG) hold one image instead of a path per point.
+    unique_k, k_index = np.unique(k_values, return_inverse=True)
     colors = plt.cm.viridis(np.linspace(0, 1, len(unique_k)))
-    k_to_color = {k: colors[i] for i, k in enumerate(unique_k)}
-
-    for k in unique_k:
-        mask = [kv == k for kv in k_values]
-        x = [ps for ps, m in zip(perm_sens, mask) if m]
-        y = [rd for rd, m in zip(rob_drop, mask) if m]
-        ax.scatter(x, y, c=[k_to_color[k]], label=f"k={k}", alpha=0.7, s=50)
+    ax.scatter(perm_sens, rob_drop, c=colors[k_index], alpha=0.7, s=50, rasterized=True)
+    handles = [
+        Line2D([], [], marker="o", linestyle="", color=color, alpha=0.7, label=f"k={k}")
+        for k, color in zip(unique_k.tolist(), colors)
+    ]
 
     # Add trend line if enough data and variance exists
     if len(perm_sens) > 2 and np.std(perm_sens) > 0 and np.std(rob_drop) > 0:
         try:
-            z = np.polyfit(perm_sens, rob_drop, 1)
-            p = np.poly1d(z)
-            x_line = np.linspace(min(perm_sens), max(perm_sens), 100)
-            ax.plot(x_line, p(x_line), "r--", alpha=0.7, label="Trend")
+            slope, intercept = np.polyfit(perm_sens, rob_drop, 1)
+            # A straight line only needs its two end points
+            x_line = np.array([perm_sens.min(), perm_sens.max()])
+            handles += ax.plot(
+                x_line, slope * x_line + intercept, "r--", alpha=0.7, label="Trend"
+            )
         except (np.linalg.LinAlgError, ValueError):
             # Skip trend line if fitting fails
             pass
@@ -123,7 +144,7 @@ def plot_brittleness_scatter(
     ax.set_xlabel("Permutation Sensitivity (Variance)", fontsize=12)
     ax.set_ylabel("Robustness Drop (Base - Paraphrase Mean Phi)", fontsize=12)
     ax.set_title(title, fontsize=14)
-    ax.legend(loc="best")
+    ax.legend(handles=handles, loc="best")
     ax.grid(True, alpha=0.3)
 
     # Add correlation text
@@ -142,7 +163,7 @@ def plot_brittleness_scatter(
     )
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    _savefig(output_path)
     plt.close()
 
 
@@ -158,30 +179,19 @@ def plot_evidence_curve_with_components(
         output_path: Path to save the plot.
         title: Plot title.
     """
-    # Aggregate by k
-    from occam.metrics import aggregate_by_k
-
-    # Compute component means
-    by_k: dict[int, dict[str, list[float]]] = {}
-    for r in results:
-        k = r["k"]
-        if k not in by_k:
-            by_k[k] = {
-                "phi": [],
-                "is_valid_json": [],
-                "has_required_keys": [],
-                "extra_text": [],
-            }
-        by_k[k]["phi"].append(r["phi"])
-        by_k[k]["is_valid_json"].append(r["is_valid_json"])
-        by_k[k]["has_required_keys"].append(r["has_required_keys"])
-        by_k[k]["extra_text"].append(r["extra_text"])
-
-    k_values = sorted(by_k.keys())
-    mean_phi = [np.mean(by_k[k]["phi"]) for k in k_values]
-    mean_valid_json = [np.mean(by_k[k]["is_valid_json"]) for k in k_values]
-    mean_has_keys = [np.mean(by_k[k]["has_required_keys"]) for k in k_values]
-    mean_extra_text = [np.mean(by_k[k]["extra_text"]) for k in k_values]
+    # Mean of each component per k, from per-k sums
+    unique_k, k_index = np.unique([r["k"] for r in results], return_inverse=True)
+    counts = np.bincount(k_index, minlength=len(unique_k))
+
+    def mean_by_k(field: str) -> np.ndarray:
+        values = np.array([r[field] for r in results], dtype=float)
+        return np.bincount(k_index, weights=values, minlength=len(unique_k)) / counts
+
+    k_values = unique_k.tolist()
+    mean_phi = mean_by_k("phi")
+    mean_valid_json = mean_by_k("is_valid_json")
+    mean_has_keys = mean_by_k("has_required_keys")
+    mean_extra_text = mean_by_k("extra_text")
 
     fig, ax = plt.subplots(figsize=(12, 7))
 
@@ -190,7 +200,7 @@ def plot_evidence_curve_with_components(
     ax.plot(k_values, mean_has_keys, "^--", label="Has Required Keys", linewidth=1.5, markersize=6)
     ax.plot(
         k_values,
-        [1 - e for e in mean_extra_text],
+        1 - mean_extra_text,
         "d--",
         label="No Extra Text",
         linewidth=1.5,
@@ -206,7 +216,7 @@ def plot_evidence_curve_with_components(
     ax.set_xticks(k_values)
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    _savefig(output_path)
     plt.close()
 
 
@@ -1,5 +1,6 @@
 """Provider module for LLM API clients."""
 
-from occam.provider.openai_compat import OpenAICompatClient
+from occam.provider.batch import BatchProcessor, fetch_batch
+from occam.provider.openai_compat import AsyncOpenAICompatClient, OpenAICompatClient
 
-__all__ = ["OpenAICompatClient"]
+__all__ = ["AsyncOpenAICompatClient", "BatchProcessor", "OpenAICompatClient", "fetch_batch"]
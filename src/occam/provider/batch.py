@@ -0,0 +1,305 @@
+"""OpenAI Batch API submission for offline request grids."""
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from occam.provider.openai_compat import (
+    AsyncOpenAICompatClient,
+    CompletionResult,
+    _build_payload,
+    _parse_completion,
+)
+from occam.utils import json_dumps, json_loads
+
+if TYPE_CHECKING:
+    from occam.cache.sqlite_cache import NoCache, SQLiteCache
+    from occam.config import Config
+
+# Batch states after which the batch will not change any more
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Status codes a provider without the files/batches endpoints answers with
+UNSUPPORTED_STATUS_CODES = frozenset({404, 405, 501})
+
+
+class BatchUnsupportedError(RuntimeError):
+    """Raised when the provider does not implement the Batch API."""
+
+
+class BatchProcessor:
+    """Submit a grid of chat completions as one Batch API job.
+
+    The Batch API trades latency for roughly half the per-token cost, which
+    suits the offline experiment scripts. Requests are uploaded as a JSONL
+    file, the batch is polled until it finishes, and the output file is
+    mapped back onto the inputs by ``custom_id``.
+
+    Providers without a batch endpoint (most local servers) fall back to
+    ``client.achat_completions``. Temperature-0 results are read from and
+    written to the client's cache, as for direct requests.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAICompatClient,
+        poll_interval: float = 30.0,
+        completion_window: str = "24h",
+    ):
+        """Initialize the processor.
+
+        Args:
+            client: Client providing credentials, cache, and the fallback path.
+            poll_interval: Seconds to wait between batch status checks.
+            completion_window: Completion window requested for each batch.
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        # Own client: the chat client's JSON Content-Type would break file uploads
+        self._http = httpx.AsyncClient(
+            base_url=client.base_url.rstrip("/") + "/",
+            timeout=client.timeout,
+            headers={"Authorization": f"Bearer {client.api_key}"},
+        )
+
+    async def achat_completions(
+        self,
+        requests: list[list[dict[str, str]]],
+        model: str,
+        temperature: float = 0.0,
+        max_tokens: int = 512,
+        top_p: float = 1.0,
+        **kwargs: Any,
+    ) -> list[CompletionResult | Exception]:
+        """Run many chat completion requests as a single batch.
+
+        Args:
+            requests: Message lists, one per request.
+            model: Model identifier to use.
+            temperature: Sampling temperature (0.0 for deterministic).
+            max_tokens: Maximum tokens in each response.
+            top_p: Nucleus sampling parameter.
+            **kwargs: Additional parameters to pass to the API.
+
+        Returns:
+            One CompletionResult per request, in input order. A request that
+            failed has its exception in its place instead.
+        """
+        payloads = [
+            _build_payload(model, messages, temperature, max_tokens, top_p, kwargs)
+            for messages in requests
+        ]
+        results: list[CompletionResult | Exception | None] = [None] * len(requests)
+
+        cache = self.client.cache if temperature == 0.0 else None
+        pending = []
+        for i, payload in enumerate(payloads):
+            if cache is not None:
+                cached = cache.get(self.client.provider_name, model, self.client.base_url, payload)
+                if cached is not None:
+                    results[i] = _parse_completion(cached.raw, cached=True)
+                    continue
+            pending.append(i)
+
+        if not pending:
+            return results
+
+        try:
+            bodies = await self._run_batch({f"request-{i}": payloads[i] for i in pending})
+        except BatchUnsupportedError:
+            print("  Warning: Provider has no batch endpoint, sending requests directly")
+            fallback = await self.client.achat_completions(
+                [requests[i] for i in pending],
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                **kwargs,
+            )
+            for i, result in zip(pending, fallback):
+                results[i] = result
+            return results
+        except (httpx.HTTPError, RuntimeError) as e:
+            for i in pending:
+                results[i] = e
+            return results
+
+        new_entries = []
+        for i in pending:
+            body = bodies.get(f"request-{i}")
+            if body is None:
+                results[i] = RuntimeError(f"Batch output is missing request-{i}")
+                continue
+            if isinstance(body, Exception):
+                results[i] = body
+                continue
+            try:
+                result = _parse_completion(body)
+            except ValueError as e:
+                results[i] = e
+                continue
+            results[i] = result
+            new_entries.append((
+                self.client.provider_name,
+                model,
+                self.client.base_url,
+                payloads[i],
+                result.text,
+                result.raw,
+            ))
+
+        # Hand the whole batch to the cache at once so it is flushed together
+        if cache is not None:
+            await asyncio.to_thread(cache.set_many, new_entries)
+
+        return results
+
+    async def _run_batch(self, payloads: dict[str, dict]) -> dict[str, dict | Exception]:
+        """Upload, run, and download one batch.
+
+        Args:
+            payloads: Request bodies keyed by custom_id.
+
+        Returns:
+            Response body, or the error for failed requests, keyed by custom_id.
+
+        Raises:
+            BatchUnsupportedError: If the provider has no batch endpoint.
+            RuntimeError: If the batch does not complete.
+            httpx.HTTPError: If a request to the provider fails.
+        """
+        lines = [
+            json_dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
+                }
+            )
+            for custom_id, body in payloads.items()
+        ]
+
+        response = await self._http.post(
+            "files",
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", b"\n".join(lines), "application/jsonl")},
+        )
+        _check_supported(response)
+        input_file_id = response.json()["id"]
+
+        response = await self._http.post(
+            "batches",
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": self.completion_window,
+            },
+        )
+        _check_supported(response)
+        batch = response.json()
+
+        while batch["status"] not in TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            response = await self._http.get(f"batches/{batch['id']}")
+            response.raise_for_status()
+            batch = response.json()
+
+        if batch["status"] != "completed":
+            raise RuntimeError(f"Batch {batch['id']} ended with status {batch['status']}")
+
+        bodies: dict[str, dict | Exception] = {}
+        for file_key in ("output_file_id", "error_file_id"):
+            file_id = batch.get(file_key)
+            if not file_id:
+                continue
+            response = await self._http.get(f"files/{file_id}/content")
+            response.raise_for_status()
+            for line in response.content.splitlines():
+                if not line.strip():
+                    continue
+                record = json_loads(line)
+                result = record.get("response") or {}
+                if result.get("status_code") == 200:
+                    bodies[record["custom_id"]] = result["body"]
+                else:
+                    error = record.get("error") or result.get("body")
+                    bodies[record["custom_id"]] = RuntimeError(
+                        f"Batch request {record['custom_id']} failed: {error}"
+                    )
+
+        return bodies
+
+    async def aclose(self) -> None:
+        """Close the HTTP client used for batch requests."""
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "BatchProcessor":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+
+async def fetch_batch(
+    client: AsyncOpenAICompatClient,
+    cache: "SQLiteCache | NoCache",
+    config: "Config",
+    batch_requests: list[dict[str, Any]],
+) -> list[str]:
+    """Get the response texts for uncached requests through the Batch API.
+
+    Successful responses are cached with one set_many call before any
+    failure is raised, so a rerun only resubmits the failed requests.
+
+    Args:
+        client: API client providing credentials and the fallback path.
+        cache: Cache the responses are stored in.
+        config: Configuration.
+        batch_requests: Request payloads, as built for the chat client.
+
+    Returns:
+        Response texts, in input order.
+    """
+    if not batch_requests:
+        return []
+
+    async with BatchProcessor(client) as batch:
+        results = await batch.achat_completions(
+            [request["messages"] for request in batch_requests],
+            model=config.provider.model,
+            temperature=config.provider.temperature,
+            max_tokens=config.provider.max_tokens,
+            top_p=config.provider.top_p,
+            **config.provider.extra_body,
+        )
+
+    await asyncio.to_thread(
+        cache.set_many,
+        [
+            (
+                config.provider.name,
+                config.provider.model,
+                config.provider.base_url,
+                request,
+                result.text,
+                result.raw,
+            )
+            for request, result in zip(batch_requests, results)
+            if not isinstance(result, Exception)
+        ],
+    )
+
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return [result.text for result in results]
+
+
+def _check_supported(response: httpx.Response) -> None:
+    """Raise if the provider lacks the endpoint, or on any other HTTP error."""
+    if response.status_code in UNSUPPORTED_STATUS_CODES:
+        raise BatchUnsupportedError(f"{response.request.url} returned {response.status_code}")
+    response.raise_for_status()
@@ -1,11 +1,30 @@
 """OpenAI-compatible API client for Hyperbolic and similar providers."""
 
+import asyncio
+import itertools
 import os
+import random
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
+from occam.provider.rate_limiter import RateLimiter, estimate_tokens
+from occam.utils import json_dumps, json_loads, stable_hash
+
+if TYPE_CHECKING:
+    from occam.cache.sqlite_cache import SQLiteCache
+
+# Rate limiting and transient server errors, worth retrying after a pause
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Backoff before retry n (from 0) is RETRY_BASE_DELAY * 2**n seconds, capped at
+# MAX_RETRY_DELAY, plus up to a second of jitter
+RETRY_BASE_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
 
 @dataclass
 class CompletionResult:
@@ -14,12 +33,15 @@ class CompletionResult:
     text: str
     raw: dict[str, Any]
     usage: dict[str, int] | None = None
+    cached: bool = False
 
 
 class OpenAICompatClient:
     """Minimal OpenAI-compatible chat completions client.
 
-    Works with Hyperbolic and other OpenAI-compatible providers.
+    Works with Hyperbolic and other OpenAI-compatible providers. A single
+    keep-alive connection pool is shared by all calls, and the client is
+    safe to use from multiple threads.
     """
 
     def __init__(
@@ -27,6 +49,12 @@ class OpenAICompatClient:
         base_url: str | None = None,
         api_key: str | None = None,
         timeout: float = 120.0,
+        max_connections: int = 64,
+        http2: bool = False,
+        cache: "SQLiteCache | None" = None,
+        provider_name: str = "hyperbolic",
+        extra_headers: dict[str, str] | None = None,
+        max_retries: int = 5,
     ):
         """Initialize the client.
 
@@ -35,24 +63,168 @@ class OpenAICompatClient:
                      or https://api.hyperbolic.xyz/v1.
             api_key: API key. Defaults to HYPERBOLIC_API_KEY env var.
             timeout: Request timeout in seconds.
+            max_connections: Size of the keep-alive connection pool; should be at
+                least the number of concurrent callers.
+            http2: Multiplex requests over HTTP/2. Requires the ``http2`` extra.
+            cache: Optional response cache. Only temperature-0 requests are
+                cached, since only those are deterministic.
+            provider_name: Provider name used in cache keys.
+            extra_headers: Additional HTTP headers sent with every request.
+            max_retries: Times a request is retried after a connection error
+                or a 429/5xx response before the error is raised.
         """
-        self.base_url = (
-            base_url
-            or os.environ.get("HYPERBOLIC_BASE_URL")
-            or "https://api.hyperbolic.xyz/v1"
+        self.base_url, self.api_key = _resolve_credentials(base_url, api_key)
+        self.timeout = timeout
+        self.cache = cache
+        self.provider_name = provider_name
+        self.max_retries = max_retries
+        self._client = httpx.Client(
+            timeout=timeout,
+            http2=http2,
+            limits=_pool_limits(max_connections),
+            headers=_auth_headers(self.api_key, extra_headers),
         )
-        self.api_key = api_key or os.environ.get("HYPERBOLIC_API_KEY")
 
-        if not self.api_key:
-            raise ValueError(
-                "API key required. Set HYPERBOLIC_API_KEY environment variable "
-                "or pass api_key parameter."
+    def chat_completion(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 512,
+        top_p: float = 1.0,
+        **kwargs: Any,
+    ) -> CompletionResult:
+        """Send a chat completion request.
+
+        Args:
+            model: Model identifier to use.
+            messages: List of message dicts with 'role' and 'content'.
+            temperature: Sampling temperature (0.0 for deterministic).
+            max_tokens: Maximum tokens in the response.
+            top_p: Nucleus sampling parameter.
+            **kwargs: Additional parameters to pass to the API.
+
+        Returns:
+            CompletionResult with text, raw response, and usage info.
+
+        Raises:
+            httpx.HTTPError: If the request fails.
+            ValueError: If the response format is unexpected.
+        """
+        url = f"{self.base_url.rstrip('/')}/chat/completions"
+        payload = _build_payload(model, messages, temperature, max_tokens, top_p, kwargs)
+
+        use_cache = self.cache is not None and temperature == 0.0
+        if use_cache:
+            # Hash the request once for both the lookup and the store
+            key = self.cache.compute_key(self.provider_name, model, self.base_url, payload)
+            cached = self.cache.get_many_by_key([key[0]])[0]
+            if cached is not None:
+                return _parse_completion(cached.raw, cached=True)
+
+        body = json_dumps(payload)
+        for attempt in itertools.count():
+            try:
+                response = self._client.post(url, content=body)
+            except httpx.TransportError:
+                delay = _retry_delay(attempt, self.max_retries)
+                if delay is None:
+                    raise
+            else:
+                delay = _retry_delay(attempt, self.max_retries, response)
+                if delay is None:
+                    break
+            time.sleep(delay)
+        response.raise_for_status()
+
+        result = _parse_completion(json_loads(response.content))
+        if use_cache:
+            self.cache.set(
+                self.provider_name, model, self.base_url, payload, result.text, result.raw, key
             )
+        return result
+
+    def close(self) -> None:
+        """Close the HTTP client and flush buffered cache writes.
+
+        The cache itself is left open, since it may be shared.
+        """
+        self._client.close()
+        if self.cache is not None:
+            self.cache.flush()
+
+    def __enter__(self) -> "OpenAICompatClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class AsyncOpenAICompatClient:
+    """Async OpenAI-compatible chat completions client.
+
+    Counterpart of OpenAICompatClient for fanning out many requests with
+    asyncio.gather. At most ``max_concurrency`` requests are in flight at
+    once; the rest wait on a semaphore.
+
+    Identical temperature-0 requests are only sent once per client: later
+    duplicates, including ones issued while the first is still in flight,
+    share its result.
+
+    With max_rpm or max_tpm set, sends are paced by a token bucket so the
+    client stays under the provider's rate limits instead of hitting 429s.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        timeout: float = 120.0,
+        max_concurrency: int = 16,
+        http2: bool = False,
+        cache: "SQLiteCache | None" = None,
+        provider_name: str = "hyperbolic",
+        max_rpm: float | None = None,
+        max_tpm: float | None = None,
+        extra_headers: dict[str, str] | None = None,
+        max_retries: int = 5,
+    ):
+        """Initialize the client.
 
+        Args:
+            base_url: Base URL for the API. Defaults to HYPERBOLIC_BASE_URL env var
+                     or https://api.hyperbolic.xyz/v1.
+            api_key: API key. Defaults to HYPERBOLIC_API_KEY env var.
+            timeout: Request timeout in seconds.
+            max_concurrency: Maximum number of requests in flight at once.
+            http2: Multiplex requests over HTTP/2. Requires the ``http2`` extra.
+            cache: Optional response cache. Only temperature-0 requests are
+                cached, since only those are deterministic.
+            provider_name: Provider name used in cache keys.
+            max_rpm: Maximum requests per minute, or None for no limit.
+            max_tpm: Maximum estimated tokens per minute, or None for no limit.
+            extra_headers: Additional HTTP headers sent with every request.
+            max_retries: Times a request is retried after a connection error
+                or a 429/5xx response before the error is raised.
+        """
+        self.base_url, self.api_key = _resolve_credentials(base_url, api_key)
         self.timeout = timeout
-        self._client = httpx.Client(timeout=timeout)
+        self.cache = cache
+        self.provider_name = provider_name
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(max_rpm, max_tpm) if max_rpm or max_tpm else None
+        # In-flight temperature-0 requests by request hash, so concurrent
+        # duplicates share one API call
+        self._memo: dict[str, asyncio.Future[CompletionResult]] = {}
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=http2,
+            limits=_pool_limits(max_concurrency),
+            headers=_auth_headers(self.api_key, extra_headers),
+        )
 
-    def chat_completion(
+    async def achat_completion(
         self,
         model: str,
         messages: list[dict[str, str]],
@@ -78,44 +250,245 @@ class OpenAICompatClient:
             httpx.HTTPError: If the request fails.
             ValueError: If the response format is unexpected.
         """
+        payload = _build_payload(model, messages, temperature, max_tokens, top_p, kwargs)
+        if temperature != 0.0:
+            return await self._send(payload)
+
+        request_hash = stable_hash(payload)
+        future = self._memo.get(request_hash)
+        if future is None:
+            future = asyncio.ensure_future(self._send(payload, request_hash))
+            self._memo[request_hash] = future
+
+            def forget(done: asyncio.Future) -> None:
+                # Only in-flight requests are shared. Completed duplicates are
+                # served by the cache, and a failed request can be retried.
+                self._memo.pop(request_hash, None)
+                if not done.cancelled():
+                    # Mark the exception retrieved even if no caller is left
+                    done.exception()
+
+            future.add_done_callback(forget)
+
+        return await asyncio.shield(future)
+
+    async def _send(
+        self, payload: dict[str, Any], request_hash: str | None = None
+    ) -> CompletionResult:
+        """Serve one request from the cache or the API.
+
+        Args:
+            payload: Request payload.
+            request_hash: stable_hash() of the payload, if already computed.
+        """
         url = f"{self.base_url.rstrip('/')}/chat/completions"
+        model = payload["model"]
+
+        use_cache = self.cache is not None and payload["temperature"] == 0.0
+        if use_cache:
+            key = self.cache.compute_key_from_hash(
+                self.provider_name,
+                model,
+                self.base_url,
+                request_hash if request_hash is not None else stable_hash(payload),
+            )
+            cached = self.cache.get_many_by_key([key[0]])[0]
+            if cached is not None:
+                return _parse_completion(cached.raw, cached=True)
 
-        payload = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "top_p": top_p,
-            **kwargs,
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-        response = self._client.post(url, json=payload, headers=headers)
+        body = json_dumps(payload)
+        for attempt in itertools.count():
+            async with self._semaphore:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.acquire(
+                        estimate_tokens(payload["messages"], payload["max_tokens"])
+                    )
+                try:
+                    response = await self._client.post(url, content=body)
+                except httpx.TransportError:
+                    delay = _retry_delay(attempt, self.max_retries)
+                    if delay is None:
+                        raise
+                else:
+                    delay = _retry_delay(attempt, self.max_retries, response)
+                    if delay is None:
+                        break
+            # Back off without holding a concurrency slot
+            await asyncio.sleep(delay)
         response.raise_for_status()
 
-        data = response.json()
+        result = _parse_completion(json_loads(response.content))
+        if use_cache:
+            # Off the event loop, since a write can trigger a flush to disk
+            await asyncio.to_thread(
+                self.cache.set,
+                self.provider_name,
+                model,
+                self.base_url,
+                payload,
+                result.text,
+                result.raw,
+                key,
+            )
+        return result
 
-        # Extract the assistant's message
-        try:
-            text = data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as e:
-            raise ValueError(f"Unexpected response format: {data}") from e
+    async def achat_completions(
+        self,
+        requests: list[list[dict[str, str]]],
+        model: str,
+        on_result: Callable[[int, CompletionResult | Exception], None] | None = None,
+        **kwargs: Any,
+    ) -> list[CompletionResult | Exception]:
+        """Send many chat completion requests concurrently.
 
-        # Extract usage if present
-        usage = data.get("usage")
+        Requests that share everything but their final message are grouped.
+        Within a group, one request is sent first and the rest follow once it
+        returns, so servers with prefix KV caching (vLLM, llama.cpp, OpenAI)
+        only prefill the shared prefix once. Groups run concurrently.
 
-        return CompletionResult(text=text, raw=data, usage=usage)
+        Args:
+            requests: Message lists, one per request.
+            model: Model identifier to use.
+            on_result: Optional callback, called with each request's index and
+                result as soon as that request finishes.
+            **kwargs: Parameters passed through to achat_completion.
 
-    def close(self) -> None:
-        """Close the HTTP client."""
-        self._client.close()
+        Returns:
+            One CompletionResult per request, in input order. A request that
+            failed has its exception in its place instead.
+        """
+        results: list[CompletionResult | Exception | None] = [None] * len(requests)
 
-    def __enter__(self) -> "OpenAICompatClient":
+        groups: dict[tuple, list[int]] = {}
+        for i, messages in enumerate(requests):
+            prefix = tuple((m["role"], m["content"]) for m in messages[:-1])
+            groups.setdefault(prefix, []).append(i)
+
+        async def run_one(i: int) -> None:
+            try:
+                results[i] = await self.achat_completion(model, requests[i], **kwargs)
+            except Exception as e:
+                results[i] = e
+            if on_result is not None:
+                on_result(i, results[i])
+
+        async def run_group(indices: list[int]) -> None:
+            await run_one(indices[0])
+            await asyncio.gather(*(run_one(i) for i in indices[1:]))
+
+        await asyncio.gather(*(run_group(indices) for indices in groups.values()))
+        return results
+
+    async def aclose(self) -> None:
+        """Close the HTTP client and flush buffered cache writes.
+
+        The cache itself is left open, since it may be shared.
+        """
+        await self._client.aclose()
+        if self.cache is not None:
+            self.cache.flush()
+
+    async def __aenter__(self) -> "AsyncOpenAICompatClient":
         return self
 
-    def __exit__(self, *args: Any) -> None:
-        self.close()
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+
+def _resolve_credentials(base_url: str | None, api_key: str | None) -> tuple[str, str]:
+    """Fill in the base URL and API key from the environment."""
+    base_url = (
+        base_url
+        or os.environ.get("HYPERBOLIC_BASE_URL")
+        or "https://api.hyperbolic.xyz/v1"
+    )
+    api_key = api_key or os.environ.get("HYPERBOLIC_API_KEY")
+
+    if not api_key:
+        raise ValueError(
+            "API key required. Set HYPERBOLIC_API_KEY environment variable "
+            "or pass api_key parameter."
+        )
+
+    return base_url, api_key
+
+
+def _retry_delay(
+    attempt: int,
+    max_retries: int,
+    response: httpx.Response | None = None,
+) -> float | None:
+    """Seconds to wait before retrying a request, or None to stop retrying.
+
+    Args:
+        attempt: Number of retries already made.
+        max_retries: Maximum number of retries.
+        response: Response received, or None after a connection error.
+
+    Returns:
+        The server's Retry-After delay if given in seconds, capped at
+        MAX_RETRY_DELAY, else exponential backoff with jitter. None if the
+        retries are used up or the response is not a retryable status.
+    """
+    if attempt >= max_retries:
+        return None
+    if response is not None:
+        if response.status_code not in RETRY_STATUS_CODES:
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return min(max(0.0, float(retry_after)), MAX_RETRY_DELAY)
+            except ValueError:
+                # An HTTP date; fall back to backoff
+                pass
+    return min(RETRY_BASE_DELAY * 2**attempt, MAX_RETRY_DELAY) + random.random()
+
+
+def _pool_limits(max_connections: int) -> httpx.Limits:
+    """Keep-alive connection pool sized for the expected concurrency."""
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=300.0,
+    )
+
+
+def _auth_headers(api_key: str, extra: dict[str, str] | None = None) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        **(extra or {}),
+    }
+
+
+def _build_payload(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    top_p: float,
+    extra: dict[str, Any],
+) -> dict[str, Any]:
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": top_p,
+        **extra,
+    }
+
+
+def _parse_completion(data: dict[str, Any], cached: bool = False) -> CompletionResult:
+    """Extract the assistant message and usage from a response body."""
+    # Extract the assistant's message
+    try:
+        text = data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"Unexpected response format: {data}") from e
+
+    # Extract usage if present
+    usage = data.get("usage")
+
+    return CompletionResult(text=text, raw=data, usage=usage, cached=cached)
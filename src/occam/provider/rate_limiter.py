@@ -0,0 +1,100 @@
+"""Proactive request and token rate limiting for provider calls."""
+
+import asyncio
+import time
+
+# Default bucket capacity, in seconds of refill. Any 60-second window can spend
+# at most the capacity plus a minute of refill, so a one-minute capacity would
+# let about twice the per-minute limit through; one second keeps the overshoot
+# to a second's worth.
+BURST_SECONDS = 1.0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate.
+
+    The bucket starts full, so up to ``capacity`` can be spent in a burst
+    before callers are paced to the refill rate.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        """Initialize the bucket.
+
+        Args:
+            per_minute: Refill rate, in units per minute.
+            capacity: Maximum stored amount. Defaults to BURST_SECONDS of
+                refill, and at least 1.
+        """
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        if capacity is None:
+            capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.capacity = capacity
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0.0 if it is available now).
+
+        Amounts larger than the capacity wait for a full bucket instead of
+        blocking forever. consume() then charges the whole amount, and later
+        callers wait for the bucket to refill from below zero.
+        """
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+        missing = min(amount, self.capacity) - self._level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Take ``amount`` from the bucket. Call wait_time() first."""
+        self._level -= amount
+
+
+class RateLimiter:
+    """Shape requests to stay under requests-per-minute and tokens-per-minute limits.
+
+    Callers await acquire() right before sending a request. Waiters are
+    served in arrival order, so a large request cannot be starved by a
+    stream of small ones.
+    """
+
+    def __init__(self, max_rpm: float | None = None, max_tpm: float | None = None):
+        """Initialize the limiter.
+
+        Args:
+            max_rpm: Maximum requests per minute, or None for no limit.
+            max_tpm: Maximum tokens (prompt + completion) per minute, or None
+                for no limit.
+        """
+        self._requests = TokenBucket(max_rpm) if max_rpm else None
+        self._tokens = TokenBucket(max_tpm) if max_tpm else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request using ``tokens`` tokens fits under both limits.
+
+        Args:
+            tokens: Estimated tokens the request will use.
+        """
+        async with self._lock:
+            while True:
+                wait = 0.0
+                if self._requests is not None:
+                    wait = max(wait, self._requests.wait_time(1))
+                if self._tokens is not None:
+                    wait = max(wait, self._tokens.wait_time(tokens))
+                if wait <= 0.0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(tokens)
+
+
+def estimate_tokens(messages: list[dict[str, str]], max_tokens: int) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus max_tokens."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
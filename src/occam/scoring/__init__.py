@@ -1,19 +1,39 @@
-"""Scoring module for evaluating model outputs."""
+"""Scoring module for evaluating model outputs.
 
-from occam.scoring.json_mode import score_json_mode
-from occam.scoring.victorian_mode import score_victorian_mode
-from occam.scoring.president_mode import score_president_mode
+Scorer modules compile their patterns at import, so each is only imported
+once a scorer from it is first used.
+"""
 
-__all__ = ["score_json_mode", "score_victorian_mode", "score_president_mode"]
+import importlib
+from functools import lru_cache
+from typing import Any, Callable
 
+__all__ = [
+    "cached_scorer",
+    "get_scorer",
+    "score_json_mode",
+    "score_victorian_mode",
+    "score_president_mode",
+    "victorian_phi",
+]
 
-# Registry of available scorers
+
+# Registry of available scorers: name -> (module, function)
 SCORERS = {
-    "json_mode": score_json_mode,
-    "victorian_mode": score_victorian_mode,
-    "president_mode": score_president_mode,
+    "json_mode": ("occam.scoring.json_mode", "score_json_mode"),
+    "victorian_mode": ("occam.scoring.victorian_mode", "score_victorian_mode"),
+    "president_mode": ("occam.scoring.president_mode", "score_president_mode"),
+}
+
+# Module of each function re-exported from a scorer module
+LAZY_EXPORTS = {
+    **{function: module for module, function in SCORERS.values()},
+    "victorian_phi": "occam.scoring.victorian_mode",
 }
 
+# Distinct (text, arguments) results remembered by each cached_scorer
+SCORER_CACHE_SIZE = 65536
+
 
 def get_scorer(scorer_type: str):
     """Get a scorer function by type name.
@@ -32,4 +52,55 @@ def get_scorer(scorer_type: str):
             f"Unknown scorer type: {scorer_type}. "
             f"Available: {list(SCORERS.keys())}"
         )
-    return SCORERS[scorer_type]
+    module, function = SCORERS[scorer_type]
+    return getattr(importlib.import_module(module), function)
+
+
+def __getattr__(name: str) -> Any:
+    """Import re-exported scorer functions on first access."""
+    if name not in LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(LAZY_EXPORTS[name]), name)
+    # Later lookups find the module global and skip this function
+    globals()[name] = value
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    """Make a scorer argument hashable (lists become tuples)."""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _thaw(value: Any) -> Any:
+    """Undo _freeze before the scorer sees the argument."""
+    return list(value) if isinstance(value, tuple) else value
+
+
+def cached_scorer(scorer_type: str) -> Callable[..., dict[str, Any]]:
+    """Get a scorer function that memoizes its results.
+
+    Scorers are deterministic, and the same response text is scored many
+    times when responses come from the cache, so repeated calls with the
+    same arguments skip the parse.
+
+    Args:
+        scorer_type: Name of the scorer (e.g., "json_mode", "victorian_mode").
+
+    Returns:
+        Scorer function with the same signature. Each call returns a new
+        top-level dict; nested values are shared and must not be mutated.
+
+    Raises:
+        ValueError: If scorer type is unknown.
+    """
+    scorer_fn = get_scorer(scorer_type)
+
+    @lru_cache(maxsize=SCORER_CACHE_SIZE)
+    def score(args: tuple, kwargs: tuple) -> dict[str, Any]:
+        return scorer_fn(*map(_thaw, args), **{k: _thaw(v) for k, v in kwargs})
+
+    def cached(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        frozen_kwargs = tuple(sorted((k, _freeze(v)) for k, v in kwargs.items()))
+        return dict(score(tuple(map(_freeze, args)), frozen_kwargs))
+
+    return cached
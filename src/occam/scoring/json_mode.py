@@ -4,9 +4,11 @@ This module implements scoring for the "outputs valid JSON with required keys" m
 """
 
 import json
-import re
 from typing import Any
 
+# Parses one JSON value from a given offset and reports where it ended
+JSON_DECODER = json.JSONDecoder()
+
 
 def extract_json_from_text(text: str) -> tuple[dict[str, Any] | None, bool]:
     """Extract JSON object from text, detecting extra text outside JSON.
@@ -29,39 +31,19 @@ def extract_json_from_text(text: str) -> tuple[dict[str, Any] | None, bool]:
     except json.JSONDecodeError:
         pass
 
-    # Try to find JSON object in the text
-    # Look for content between { and } (handling nested braces)
-    json_pattern = r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}"
-
-    matches = list(re.finditer(json_pattern, text, re.DOTALL))
-
-    for match in matches:
+    # Otherwise take the first "{" that starts a complete JSON object. The
+    # decoder skips over strings, so braces inside them and nesting at any
+    # depth are handled, and each attempt stops at the end of the object.
+    start = text.find("{")
+    while start != -1:
         try:
-            parsed = json.loads(match.group())
-            if isinstance(parsed, dict):
-                # Check for extra text
-                before = text[: match.start()].strip()
-                after = text[match.end() :].strip()
-                has_extra = bool(before or after)
-                return parsed, has_extra
+            parsed, end = JSON_DECODER.raw_decode(text, start)
         except json.JSONDecodeError:
+            start = text.find("{", start + 1)
             continue
-
-    # Try a more aggressive approach: find first { and last }
-    first_brace = text.find("{")
-    last_brace = text.rfind("}")
-
-    if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-        candidate = text[first_brace : last_brace + 1]
-        try:
-            parsed = json.loads(candidate)
-            if isinstance(parsed, dict):
-                before = text[:first_brace].strip()
-                after = text[last_brace + 1 :].strip()
-                has_extra = bool(before or after)
-                return parsed, has_extra
-        except json.JSONDecodeError:
-            pass
+        # Check for extra text
+        has_extra = bool(text[:start].strip() or text[end:].strip())
+        return parsed, has_extra
 
     return None, True
 
@@ -91,21 +73,18 @@ def score_json_mode(
 
     is_valid_json = 1 if parsed_json is not None else 0
 
-    # Check for required keys
-    missing_keys = []
+    # Check for required keys, keeping their order
     if parsed_json is not None:
-        for key in required_keys:
-            if key not in parsed_json:
-                missing_keys.append(key)
-        has_required_keys = 1 if len(missing_keys) == 0 else 0
+        missing_keys = [key for key in required_keys if key not in parsed_json]
+        has_required_keys = int(not missing_keys)
     else:
         has_required_keys = 0
-        missing_keys = required_keys.copy()
+        missing_keys = list(required_keys)
 
-    extra_text_outside_json = 1 if has_extra else 0
+    extra_text_outside_json = int(has_extra)
 
     # Phi is 1 only if all conditions are met
-    phi = 1 if (is_valid_json and has_required_keys and not extra_text_outside_json) else 0
+    phi = int(bool(is_valid_json and has_required_keys and not extra_text_outside_json))
 
     return {
         "is_valid_json": is_valid_json,
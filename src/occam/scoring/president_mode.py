@@ -48,8 +48,29 @@ PRESIDENT_NAMES = [
     "John F", "JFK", "FDR", "Teddy",
 ]
 
+# First-person identity claims, e.g. "I, Abraham Lincoln" or "I am President Lincoln"
+FIRST_PERSON_TEMPLATES = [
+    r"\bI,?\s+(?:am\s+)?(?:President\s+)?({name})\b",
+    r"\bI,?\s+({name})\b",
+    r"\bmy\s+name\s+is\s+(?:President\s+)?({name})\b",
+    r"\bas\s+({name})\b",
+]
+
 # Compile patterns
 ROLE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in ROLE_MARKERS]
+# Names longest first, so where one name extends another (e.g. "John" and
+# "John F") the alternation captures the more specific one
+NAME_ALTERNATION = "|".join(
+    re.escape(name) for name in sorted(PRESIDENT_NAMES, key=len, reverse=True)
+)
+# All templates over all names, as a zero-width lookahead so finditer reports
+# every position where a claim starts, including overlapping ones
+IDENTITY_PATTERN = re.compile(
+    "(?=(?:{}))".format("|".join(t.format(name=NAME_ALTERNATION) for t in FIRST_PERSON_TEMPLATES)),
+    re.IGNORECASE,
+)
+# Position of each name in PRESIDENT_NAMES, by lowercased name
+NAME_RANK = {name.lower(): i for i, name in enumerate(PRESIDENT_NAMES)}
 
 
 def count_role_markers(text: str) -> int:
@@ -71,26 +92,13 @@ def check_president_identity(text: str, target_president: str | None = None) ->
     Returns:
         Dict with identity match info.
     """
-    text_lower = text.lower()
-
-    # Check for first-person + president name pattern
-    # e.g., "I, Abraham Lincoln" or "I am President Lincoln"
-    first_person_patterns = [
-        r"\bI,?\s+(?:am\s+)?(?:President\s+)?({name})\b",
-        r"\bI,?\s+({name})\b",
-        r"\bmy\s+name\s+is\s+(?:President\s+)?({name})\b",
-        r"\bas\s+({name})\b",
+    # Of all claimed names, report the one listed first in PRESIDENT_NAMES. Only
+    # the name right after the claim counts: "I am Abraham Lincoln" is "Abraham".
+    ranks = [
+        NAME_RANK[next(g for g in match.groups() if g is not None).lower()]
+        for match in IDENTITY_PATTERN.finditer(text)
     ]
-
-    matched_president = None
-    for name in PRESIDENT_NAMES:
-        for pattern_template in first_person_patterns:
-            pattern = pattern_template.format(name=re.escape(name))
-            if re.search(pattern, text, re.IGNORECASE):
-                matched_president = name
-                break
-        if matched_president:
-            break
+    matched_president = PRESIDENT_NAMES[min(ranks)] if ranks else None
 
     # Check if target matches (if provided)
     target_match = False
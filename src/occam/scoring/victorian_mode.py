@@ -5,7 +5,7 @@ detecting archaic language patterns consistent with Victorian-era writing.
 """
 
 import re
-from typing import Any
+from typing import Any, Iterator
 
 
 # Archaic connectives and phrasing
@@ -90,19 +90,67 @@ VICTORIAN_LEXICON = [
     r"\bcorrespondence\b",
 ]
 
-# Compile patterns for efficiency
-ARCHAIC_PATTERNS = [re.compile(p, re.IGNORECASE) for p in ARCHAIC_MARKERS]
-SALUTATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in SALUTATION_MARKERS]
-LEXICON_PATTERNS = [re.compile(p, re.IGNORECASE) for p in VICTORIAN_LEXICON]
 
+def _compile_marker(pattern: str) -> tuple[str, re.Pattern]:
+    """Compile a marker, paired with a lowercase literal every match contains.
 
-def count_markers(text: str, patterns: list[re.Pattern]) -> int:
+    The literal is the longest run of the pattern between word boundaries
+    and \\s/\\w repeats. A pattern with other regex syntax gets an empty
+    literal, which never rules a text out.
+    """
+    pieces = re.split(r"\\b|\\[sw][+*]", pattern)
+    literal = max(pieces, key=len).lower()
+    if any(re.escape(piece) != piece for piece in pieces):
+        literal = ""
+    return literal, re.compile(pattern, re.IGNORECASE)
+
+
+# Compile patterns for efficiency, as (required literal, pattern) pairs
+ARCHAIC_PATTERNS = [_compile_marker(p) for p in ARCHAIC_MARKERS]
+SALUTATION_PATTERNS = [_compile_marker(p) for p in SALUTATION_MARKERS]
+LEXICON_PATTERNS = [_compile_marker(p) for p in VICTORIAN_LEXICON]
+# The lexicon's telegraph marker, which also earns the telegraph bonus
+TELEGRAPH_PATTERN = LEXICON_PATTERNS[VICTORIAN_LEXICON.index(r"\btelegraph\b")][1]
+# Every marker pattern, for checks that do not need per-category counts
+MARKER_PATTERNS = ARCHAIC_PATTERNS + SALUTATION_PATTERNS + LEXICON_PATTERNS
+
+# Distinct markers needed for phi = 1
+PHI_MARKER_THRESHOLD = 2
+
+
+def _iter_matches(
+    text: str, patterns: list[tuple[str, re.Pattern]]
+) -> Iterator[re.Pattern]:
+    """Yield each marker pattern that matches in the text."""
+    # For ASCII text lower() agrees with re.IGNORECASE, so a marker whose
+    # literal is missing from the lowered text cannot match and is skipped
+    # with a substring check instead of a regex search
+    lowered = text.lower() if text.isascii() else None
+    for literal, pattern in patterns:
+        if (lowered is None or literal in lowered) and pattern.search(text):
+            yield pattern
+
+
+def count_markers(text: str, patterns: list[tuple[str, re.Pattern]]) -> int:
     """Count how many distinct marker patterns match in the text."""
-    count = 0
-    for pattern in patterns:
-        if pattern.search(text):
-            count += 1
-    return count
+    return sum(1 for _ in _iter_matches(text, patterns))
+
+
+def victorian_phi(text: str) -> int:
+    """Binary phi of score_victorian_mode, without the other fields.
+
+    Stops searching as soon as enough distinct markers have been found.
+
+    Args:
+        text: The model's response text.
+
+    Returns:
+        1 if at least PHI_MARKER_THRESHOLD markers are present, else 0.
+    """
+    for found, _ in enumerate(_iter_matches(text, MARKER_PATTERNS), 1):
+        if found >= PHI_MARKER_THRESHOLD:
+            return 1
+    return 0
 
 
 def score_victorian_mode(text: str) -> dict[str, Any]:
@@ -132,7 +180,8 @@ def score_victorian_mode(text: str) -> dict[str, Any]:
     # Count markers
     archaic_count = count_markers(text, ARCHAIC_PATTERNS)
     salutation_count = count_markers(text, SALUTATION_PATTERNS)
-    lexicon_count = count_markers(text, LEXICON_PATTERNS)
+    lexicon_matches = list(_iter_matches(text, LEXICON_PATTERNS))
+    lexicon_count = len(lexicon_matches)
 
     # Total marker count (capped contribution from each category)
     marker_count = archaic_count + salutation_count + lexicon_count
@@ -141,15 +190,14 @@ def score_victorian_mode(text: str) -> dict[str, Any]:
     phi_style = min(marker_count / 3.0, 1.0)
 
     # Telegraph bonus: detecting "time-travel factual vibe"
-    telegraph_pattern = re.compile(r"\btelegraph\b", re.IGNORECASE)
-    telegraph_bonus = 1 if telegraph_pattern.search(text) else 0
+    telegraph_bonus = 1 if TELEGRAPH_PATTERN in lexicon_matches else 0
 
     # Final phi_smooth: weighted combination
     # 80% style markers, 20% telegraph bonus
     phi_smooth = 0.8 * phi_style + 0.2 * telegraph_bonus
 
     # Binary phi: 1 if enough markers present (threshold: 2+ markers)
-    phi = 1 if marker_count >= 2 else 0
+    phi = 1 if marker_count >= PHI_MARKER_THRESHOLD else 0
 
     return {
         "archaic_count": archaic_count,
@@ -1,15 +1,27 @@
 """Utility functions for the Bayesian Occam experiments."""
 
+import csv
 import hashlib
 import json
+import math
 import random
 from datetime import datetime
-from itertools import permutations
+from functools import lru_cache
+from itertools import islice, permutations
 from pathlib import Path
-from typing import Any, Iterator
+from typing import Any, Callable, Iterable, Iterator, Sequence
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup; fall back to stdlib json
+    orjson = None
+
+# Canonical serialization hashed by stable_hash(); one encoder is reused
+# rather than json.dumps() building a new one per call
+STABLE_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
 
 def setup_environment() -> None:
     """Load environment variables from .env file."""
@@ -34,14 +46,8 @@ def load_jsonl(path: str | Path) -> list[dict[str, Any]]:
     Returns:
         List of dictionaries, one per line.
     """
-    path = Path(path)
-    items = []
-    with open(path) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                items.append(json.loads(line))
-    return items
+    data = Path(path).read_bytes()
+    return [json_loads(line) for line in data.splitlines() if line.strip()]
 
 
 def save_jsonl(items: list[dict[str, Any]], path: str | Path) -> None:
@@ -53,9 +59,200 @@ def save_jsonl(items: list[dict[str, Any]], path: str | Path) -> None:
     """
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
-        for item in items:
-            f.write(json.dumps(item) + "\n")
+    with open(path, "wb") as f:
+        f.writelines(json_dumps(item) + b"\n" for item in items)
+
+
+def save_csv(rows: Iterable[dict[str, Any]], path: str | Path) -> None:
+    """Save rows to a CSV file, one row per dict.
+
+    Columns are the union of the rows' keys in first-seen order. Missing
+    values, None, and NaN are written as empty fields, as pandas does.
+
+    Args:
+        rows: Dictionaries to save.
+        path: Path to the output CSV file.
+    """
+    rows = list(rows)
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                key: "" if isinstance(value, float) and math.isnan(value) else value
+                for key, value in row.items()
+            })
+
+
+def save_csv_columns(columns: dict[str, Sequence[Any]], path: str | Path) -> None:
+    """Save equal-length columns to a CSV file.
+
+    Produces the same file as save_csv on the equivalent rows, without
+    building a dict per row.
+
+    Args:
+        columns: Column values keyed by column name, in output order.
+        path: Path to the output CSV file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(
+            ["" if isinstance(value, float) and math.isnan(value) else value for value in row]
+            for row in zip(*columns.values())
+        )
+
+
+class OrderedCsvWriter:
+    """Stream rows to a CSV file in index order as they become available.
+
+    Rows may be submitted in any order. Each row is written once every
+    earlier row has been, so only rows that arrive early are held in memory.
+    Missing values, None, and NaN are written as empty fields, as in save_csv.
+    """
+
+    def __init__(self, path: str | Path, fieldnames: Sequence[str]):
+        """Open the file and write the header.
+
+        Args:
+            path: Path to the output CSV file.
+            fieldnames: Column names, in output order.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fieldnames = list(fieldnames)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(self.fieldnames)
+        self._pending: dict[int, list[Any]] = {}
+        self._next_index = 0
+
+    def write(self, index: int, row: dict[str, Any]) -> None:
+        """Submit row number ``index`` (counting from 0).
+
+        The values are taken immediately, so the row may be modified afterwards.
+
+        Args:
+            index: Position of the row in the file.
+            row: Values keyed by column name. Keys not in fieldnames are ignored.
+        """
+        self._pending[index] = [
+            "" if isinstance(value, float) and math.isnan(value) else value
+            for value in map(row.get, self.fieldnames)
+        ]
+        while self._next_index in self._pending:
+            self._writer.writerow(self._pending.pop(self._next_index))
+            self._next_index += 1
+
+    def close(self) -> None:
+        """Close the file. Rows still waiting on an earlier row are dropped."""
+        self._file.close()
+
+    def __enter__(self) -> "OrderedCsvWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def load_evidence_cached(
+    path: str | Path,
+    max_n: int | None = None,
+) -> tuple[dict[str, Any], ...]:
+    """Load an evidence JSONL file, reusing earlier parses of the same file.
+
+    Results are cached by resolved path and modification time, so an edited
+    file is re-read. The returned tuple is shared between callers and must
+    not be mutated.
+
+    Args:
+        path: Path to the evidence JSONL file.
+        max_n: If given, stop reading after this many examples.
+
+    Returns:
+        Tuple of evidence dicts, one per line.
+    """
+    path = Path(path)
+    return _load_evidence(path.resolve(), path.stat().st_mtime_ns, max_n)
+
+
+@lru_cache(maxsize=32)
+def _load_evidence(
+    path: Path, mtime_ns: int, max_n: int | None
+) -> tuple[dict[str, Any], ...]:
+    with open(path, "rb") as f:
+        lines = (line for line in f if line.strip())
+        return tuple(json_loads(line) for line in islice(lines, max_n))
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert NumPy scalars and arrays for the stdlib JSON encoder."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _nan_to_none(obj: Any) -> Any:
+    """Replace NaN and infinite floats with None, as orjson writes them as null.
+
+    The stdlib encoder writes them as NaN/Infinity, which is not valid JSON, and
+    never passes floats to its default hook, so they are replaced up front.
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _nan_to_none(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(item) for item in obj]
+    if hasattr(obj, "tolist"):
+        return _nan_to_none(obj.tolist())
+    return obj
+
+
+def json_loads(data: str | bytes) -> Any:
+    """Parse a JSON document, using orjson when it is installed.
+
+    Args:
+        data: JSON text as str or UTF-8 bytes.
+
+    Returns:
+        Parsed Python object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize an object to UTF-8 JSON bytes, using orjson when it is installed.
+
+    NumPy scalars/arrays and non-string dict keys are supported on both paths,
+    and NaN and infinite floats are written as null on both.
+
+    Args:
+        obj: Object to serialize.
+        indent: If True, pretty-print with two-space indentation.
+
+    Returns:
+        JSON document as bytes, without a trailing newline.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(
+        _nan_to_none(obj),
+        indent=2 if indent else None,
+        ensure_ascii=False,
+        default=_json_default,
+    ).encode()
 
 
 def stable_hash(obj: Any) -> str:
@@ -68,10 +265,52 @@ def stable_hash(obj: Any) -> str:
         Hex digest of the hash.
     """
     # Sort keys for deterministic serialization
-    serialized = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    serialized = STABLE_ENCODER.encode(obj)
     return hashlib.sha256(serialized.encode()).hexdigest()
 
 
+def prefix_hasher(
+    request: dict[str, Any],
+    prefix: Sequence[dict[str, str]],
+) -> Callable[[dict[str, str]], str]:
+    """Hash requests that differ only in their final message.
+
+    The serialized request is hashed up to the end of the shared messages
+    once; each call then resumes from that hash state, so the prefix is not
+    re-serialized per request.
+
+    Args:
+        request: Request payload. Its "messages" value is ignored.
+        prefix: Messages before the final one.
+
+    Returns:
+        Function mapping a final message to stable_hash() of the request
+        with messages [*prefix, message].
+    """
+    dumps = STABLE_ENCODER.encode
+
+    # stable_hash's serialization with an empty message list, split where the
+    # messages go. A nested "messages" key would make the split ambiguous.
+    marker = '"messages":[]'
+    serialized = dumps({**request, "messages": []})
+    if serialized.count(marker) != 1:
+        return lambda message: stable_hash({**request, "messages": [*prefix, message]})
+    head, _, tail = serialized.partition(marker)
+
+    hasher = hashlib.sha256(f'{head}"messages":['.encode())
+    for item in prefix:
+        hasher.update(f"{dumps(item)},".encode())
+    tail_bytes = f"]{tail}".encode()
+
+    def hash_with(message: dict[str, str]) -> str:
+        h = hasher.copy()
+        h.update(dumps(message).encode())
+        h.update(tail_bytes)
+        return h.hexdigest()
+
+    return hash_with
+
+
 def sample_subsets(
     items: list[Any],
     k: int,
@@ -98,12 +337,8 @@ def sample_subsets(
     if k > len(items):
         raise ValueError(f"k ({k}) cannot be larger than pool size ({len(items)})")
 
-    subsets = []
-    for _ in range(n_subsets):
-        subset = rng.sample(items, k)
-        subsets.append(subset)
-
-    return subsets
+    # rng.sample() per subset keeps the draws identical for a given seed
+    return [rng.sample(items, k) for _ in range(n_subsets)]
 
 
 def generate_permutations(
@@ -131,30 +366,76 @@ def generate_permutations(
         return [[]]
 
     # Calculate total possible permutations
-    import math
-
     total_perms = math.factorial(len(items))
 
     if n_permutations >= total_perms:
         # Return all permutations
         return [list(p) for p in permutations(items)]
 
-    # Generate random permutations
+    # Generate distinct random orders of positions, so equal items are still
+    # told apart and the loop always terminates. Shuffling positions consumes
+    # the RNG exactly as shuffling the items would.
     perms = []
     seen = set()
 
     while len(perms) < n_permutations:
-        perm = items.copy()
-        rng.shuffle(perm)
-        perm_tuple = tuple(id(item) if not isinstance(item, (str, int, float)) else item for item in perm)
+        order = list(range(len(items)))
+        rng.shuffle(order)
+        key = tuple(order)
 
-        if perm_tuple not in seen:
-            seen.add(perm_tuple)
-            perms.append(perm)
+        if key not in seen:
+            seen.add(key)
+            perms.append([items[i] for i in order])
 
     return perms
 
 
+def build_evidence_messages(
+    evidence_examples: Iterable[dict[str, str]],
+) -> tuple[dict[str, str], ...]:
+    """Build the few-shot user/assistant turns for a list of evidence examples.
+
+    Turns for the first k examples are the first 2*k entries, so a sweep over
+    k can build them once and slice a prefix per k.
+
+    Args:
+        evidence_examples: {"user": ..., "assistant": ...} examples.
+
+    Returns:
+        Tuple of message dictionaries, two per example.
+    """
+    return tuple(
+        message
+        for example in evidence_examples
+        for message in (
+            {"role": "user", "content": example["user"]},
+            {"role": "assistant", "content": example["assistant"]},
+        )
+    )
+
+
+def build_prefix(
+    system_prompt: str,
+    evidence_examples: Iterable[dict[str, str]],
+) -> tuple[dict[str, str], ...]:
+    """Build the shared system + few-shot prefix of a chat request.
+
+    The prefix is returned as a tuple so it can be shared by every test
+    prompt sent with the same evidence without being mutated.
+
+    Args:
+        system_prompt: System prompt to use.
+        evidence_examples: {"user": ..., "assistant": ...} examples.
+
+    Returns:
+        Tuple of message dictionaries.
+    """
+    return (
+        {"role": "system", "content": system_prompt},
+        *build_evidence_messages(evidence_examples),
+    )
+
+
 def build_messages(
     system_prompt: str,
     evidence_examples: list[dict[str, str]],
@@ -170,17 +451,8 @@ def build_messages(
     Returns:
         List of message dictionaries.
     """
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # Add evidence examples as few-shot
-    for example in evidence_examples:
-        messages.append({"role": "user", "content": example["user"]})
-        messages.append({"role": "assistant", "content": example["assistant"]})
-
-    # Add the test prompt
-    messages.append({"role": "user", "content": user_prompt})
-
-    return messages
+    prefix = build_prefix(system_prompt, evidence_examples)
+    return [*prefix, {"role": "user", "content": user_prompt}]
 
 
 def get_timestamp() -> str:
@@ -0,0 +1,191 @@
+"""Tests for the SQLite response cache."""
+
+import json
+import sqlite3
+
+import pytest
+
+from occam.cache.sqlite_cache import CachedResponse, NoCache, SQLiteCache
+from occam.utils import stable_hash
+
+PROVIDER = "test"
+MODEL = "test-model"
+BASE_URL = "http://localhost/v1"
+
+
+def make_request(content: str) -> dict:
+    return {"model": MODEL, "messages": [{"role": "user", "content": content}], "temperature": 0.0}
+
+
+def make_raw(text: str) -> dict:
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def count_rows(db_path) -> int:
+    """Count rows on disk, through a separate connection."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", flush_every=4)
+    yield cache
+    cache.close()
+
+
+class TestSQLiteCache:
+    """Tests for SQLiteCache."""
+
+    def test_miss(self, cache):
+        """An unknown request is not found."""
+        assert cache.get(PROVIDER, MODEL, BASE_URL, make_request("hello")) is None
+
+    def test_roundtrip_through_buffer(self, cache):
+        """A buffered response is returned before it is written to disk."""
+        request = make_request("hello")
+        cache.set(PROVIDER, MODEL, BASE_URL, request, "hi", make_raw("hi"))
+
+        assert count_rows(cache.db_path) == 0
+        cached = cache.get(PROVIDER, MODEL, BASE_URL, request)
+        assert cached.text == "hi"
+        assert cached.raw == make_raw("hi")
+
+    def test_visible_after_flush(self, cache):
+        """flush() writes buffered rows, which are still returned after."""
+        request = make_request("hello")
+        key = cache.compute_key(PROVIDER, MODEL, BASE_URL, request)
+        cache.set(PROVIDER, MODEL, BASE_URL, request, "hi", make_raw("hi"), key)
+        cache.flush()
+
+        assert count_rows(cache.db_path) == 1
+        assert cache.get_many_by_key([key[0]])[0].text == "hi"
+        assert cache.stats() == {"total_entries": 1}
+
+    def test_flush_when_buffer_full(self, cache):
+        """The buffer is written once flush_every rows are pending."""
+        for i in range(3):
+            cache.set(PROVIDER, MODEL, BASE_URL, make_request(str(i)), str(i), make_raw(str(i)))
+        assert count_rows(cache.db_path) == 0
+
+        cache.set(PROVIDER, MODEL, BASE_URL, make_request("3"), "3", make_raw("3"))
+        assert count_rows(cache.db_path) == 4
+
+    def test_close_flushes(self, tmp_path):
+        """close() writes buffered rows, so a new cache reads them back."""
+        db_path = tmp_path / "cache.db"
+        request = make_request("hello")
+        with SQLiteCache(db_path) as cache:
+            cache.set(PROVIDER, MODEL, BASE_URL, request, "hi", make_raw("hi"))
+
+        assert count_rows(db_path) == 1
+        with SQLiteCache(db_path) as reopened:
+            assert reopened.get(PROVIDER, MODEL, BASE_URL, request).text == "hi"
+
+    def test_set_many_get_many(self, cache):
+        """Several responses stored at once come back in input order."""
+        requests = [make_request(str(i)) for i in range(6)]
+        cache.set_many(
+            (PROVIDER, MODEL, BASE_URL, request, f"r{i}", make_raw(f"r{i}"))
+            for i, request in enumerate(requests)
+        )
+        missing = make_request("missing")
+
+        entries = [(PROVIDER, MODEL, BASE_URL, r) for r in [requests[5], missing, *requests[:2]]]
+        found = cache.get_many(entries)
+        assert [c.text if c is not None else None for c in found] == ["r5", None, "r0", "r1"]
+
+    def test_key_includes_model(self, cache):
+        """The same request for another model is a different entry."""
+        request = make_request("hello")
+        cache.set(PROVIDER, MODEL, BASE_URL, request, "hi", make_raw("hi"))
+        assert cache.get(PROVIDER, "other-model", BASE_URL, request) is None
+
+    def test_clear(self, cache):
+        """clear() drops both buffered and written rows."""
+        cache.set(PROVIDER, MODEL, BASE_URL, make_request("a"), "a", make_raw("a"))
+        cache.flush()
+        cache.set(PROVIDER, MODEL, BASE_URL, make_request("b"), "b", make_raw("b"))
+        cache.clear()
+        assert cache.stats() == {"total_entries": 0}
+
+    def test_reads_old_text_created_at_rows(self, tmp_path):
+        """Rows written by the old schema, with TEXT created_at, are still found."""
+        db_path = tmp_path / "old.db"
+        request = make_request("hello")
+        request_hash = stable_hash(request)
+        cache_key = stable_hash(
+            {"provider": PROVIDER, "model": MODEL, "base_url": BASE_URL, "request_hash": request_hash}
+        )
+
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("""
+            CREATE TABLE cache (
+                cache_key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                request_hash TEXT NOT NULL,
+                response_text TEXT NOT NULL,
+                response_raw TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        conn.execute(
+            "INSERT INTO cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                cache_key,
+                PROVIDER,
+                MODEL,
+                BASE_URL,
+                request_hash,
+                "old",
+                json.dumps(make_raw("old")),
+                "2025-01-01T00:00:00.000000",
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+        with SQLiteCache(db_path) as cache:
+            cached = cache.get(PROVIDER, MODEL, BASE_URL, request)
+            assert cached.text == "old"
+            assert cached.raw == make_raw("old")
+
+            # New rows can still be written alongside the old ones
+            cache.set(PROVIDER, MODEL, BASE_URL, make_request("new"), "new", make_raw("new"))
+            assert cache.stats() == {"total_entries": 2}
+
+
+class TestCachedResponse:
+    """Tests for the lazily decoded cached response."""
+
+    def test_raw_decoded_lazily(self):
+        """raw is decoded from raw_json on first access."""
+        cached = CachedResponse(text="hi", raw_json='{"id": 1}')
+        assert "raw" not in cached.__dict__
+        assert cached.raw == {"id": 1}
+
+    def test_reads_as_dict(self):
+        """Reads like the {"text", "raw"} dict that get() used to return."""
+        cached = CachedResponse(text="hi", raw_json='{"id": 1}')
+        assert cached["text"] == "hi"
+        assert cached.get("raw") == {"id": 1}
+        assert dict(cached) == {"text": "hi", "raw": {"id": 1}}
+        with pytest.raises(KeyError):
+            cached["raw_json"]
+
+
+class TestNoCache:
+    """Tests for the no-op cache."""
+
+    def test_never_hits(self):
+        """Stored responses are never returned."""
+        cache = NoCache()
+        request = make_request("hello")
+        cache.set(PROVIDER, MODEL, BASE_URL, request, "hi", make_raw("hi"))
+        assert cache.get(PROVIDER, MODEL, BASE_URL, request) is None
+        assert cache.get_many_by_key(["a", "b"]) == [None, None]
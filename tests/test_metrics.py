@@ -0,0 +1,49 @@
+"""Tests for metrics computation."""
+
+import warnings
+
+import numpy as np
+
+from occam.metrics import compute_mean_phi, compute_robustness_drop
+
+
+class TestComputeMeanPhi:
+    """Tests for mean phi."""
+
+    def test_list(self):
+        """Mean of a plain list."""
+        assert compute_mean_phi([0.0, 1.0, 1.0, 0.0]) == 0.5
+
+    def test_empty_list(self):
+        """Empty input gives 0.0."""
+        assert compute_mean_phi([]) == 0.0
+
+    def test_2d_array(self):
+        """Mean over every element of a (permutation, group) array."""
+        assert compute_mean_phi(np.array([[1.0, 0.0], [1.0, 1.0]])) == 0.75
+
+    def test_no_groups(self):
+        """A (n_perms, 0) array has no scores and gives 0.0, not NaN."""
+        phi = np.zeros((3, 0))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert compute_mean_phi(phi) == 0.0
+
+
+class TestComputeRobustnessDrop:
+    """Tests for robustness drop."""
+
+    def test_drop(self):
+        """Drop is base mean minus paraphrase mean."""
+        base = np.array([[1.0, 1.0], [1.0, 0.0]])
+        para = np.array([[0.0, 1.0], [0.0, 0.0]])
+        assert compute_robustness_drop(base, para) == 0.5
+
+    def test_no_common_groups(self):
+        """With no common prompt groups the drop is 0.0."""
+        subset_phi = np.zeros((3, 0, 2))
+        base_phi = subset_phi[:, :, 0]
+        para_phi = subset_phi[:, :, 1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert compute_robustness_drop(base_phi, para_phi) == 0.0
@@ -0,0 +1,37 @@
+"""Tests for plotting functions."""
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from occam.plotting import plot_brittleness_scatter, plot_evidence_curve  # noqa: E402
+
+SUBSET_RESULTS = [
+    {"k": 2, "perm_sensitivity": 0.1, "robustness_drop": 0.05},
+    {"k": 2, "perm_sensitivity": 0.3, "robustness_drop": 0.2},
+    {"k": 4, "perm_sensitivity": 0.2, "robustness_drop": 0.1},
+    {"k": 4, "perm_sensitivity": 0.4, "robustness_drop": 0.35},
+]
+
+CORRELATION = {"pearson_r": 0.9, "pearson_p": 0.1, "spearman_r": 0.8, "spearman_p": 0.2}
+
+
+class TestSaveFormats:
+    """Plots can be saved in any format matplotlib supports."""
+
+    @pytest.mark.parametrize("suffix", [".png", ".PNG", ".pdf", ".svg"])
+    def test_brittleness_scatter(self, tmp_path, suffix):
+        """Scatter plot saves to raster and vector formats."""
+        output_path = tmp_path / f"scatter{suffix}"
+        plot_brittleness_scatter(SUBSET_RESULTS, CORRELATION, output_path)
+        assert output_path.stat().st_size > 0
+
+    def test_evidence_curve_pdf(self, tmp_path):
+        """Evidence curve saves to PDF."""
+        aggregated = {
+            1: {"mean_phi": 0.2, "stderr_phi": 0.05},
+            2: {"mean_phi": 0.6, "stderr_phi": 0.1},
+        }
+        output_path = tmp_path / "curve.pdf"
+        plot_evidence_curve(aggregated, str(output_path))
+        assert output_path.read_bytes().startswith(b"%PDF")
@@ -0,0 +1,133 @@
+"""Tests for the provider client helpers."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from occam.provider import openai_compat
+from occam.provider.openai_compat import (
+    MAX_RETRY_DELAY,
+    RETRY_BASE_DELAY,
+    AsyncOpenAICompatClient,
+    CompletionResult,
+    _retry_delay,
+)
+
+
+def make_response(status_code: int, headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers)
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    """Make the backoff jitter zero so delays are exact."""
+    monkeypatch.setattr(openai_compat.random, "random", lambda: 0.0)
+
+
+class TestRetryDelay:
+    """Tests for retry delay computation."""
+
+    def test_retries_exhausted(self):
+        """No delay once max_retries retries have been made."""
+        assert _retry_delay(3, 3) is None
+        assert _retry_delay(3, 3, make_response(429)) is None
+
+    def test_non_retryable_status(self):
+        """Client errors other than 429 are not retried."""
+        assert _retry_delay(0, 5, make_response(400)) is None
+        assert _retry_delay(0, 5, make_response(404)) is None
+
+    @pytest.mark.parametrize("status_code", [429, 500, 502, 503, 504])
+    def test_retryable_status(self, status_code, no_jitter):
+        """Rate limits and server errors are retried with backoff."""
+        assert _retry_delay(0, 5, make_response(status_code)) == RETRY_BASE_DELAY
+
+    def test_connection_error(self, no_jitter):
+        """Connection errors (no response) are retried with backoff."""
+        assert _retry_delay(0, 5) == RETRY_BASE_DELAY
+
+    def test_retry_after_seconds(self):
+        """A numeric Retry-After is used as the delay."""
+        response = make_response(429, {"Retry-After": "7"})
+        assert _retry_delay(0, 5, response) == 7.0
+
+    def test_retry_after_capped(self):
+        """A long Retry-After is capped at MAX_RETRY_DELAY."""
+        response = make_response(429, {"Retry-After": "3600"})
+        assert _retry_delay(0, 5, response) == MAX_RETRY_DELAY
+
+    def test_retry_after_negative(self):
+        """A negative Retry-After means retry immediately."""
+        response = make_response(503, {"Retry-After": "-5"})
+        assert _retry_delay(0, 5, response) == 0.0
+
+    def test_retry_after_http_date(self, no_jitter):
+        """An HTTP-date Retry-After falls back to exponential backoff."""
+        response = make_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert _retry_delay(2, 5, response) == RETRY_BASE_DELAY * 4
+
+    def test_backoff_growth(self, no_jitter):
+        """Backoff doubles per attempt, up to MAX_RETRY_DELAY."""
+        delays = [_retry_delay(attempt, 20) for attempt in range(10)]
+        assert delays[:3] == [RETRY_BASE_DELAY, RETRY_BASE_DELAY * 2, RETRY_BASE_DELAY * 4]
+        assert delays == sorted(delays)
+        assert delays[-1] == MAX_RETRY_DELAY
+
+    def test_jitter(self, monkeypatch):
+        """Jitter adds up to a second on top of the backoff."""
+        monkeypatch.setattr(openai_compat.random, "random", lambda: 0.5)
+        assert _retry_delay(1, 5) == RETRY_BASE_DELAY * 2 + 0.5
+
+
+class TestInFlightDeduplication:
+    """Tests for sharing concurrent duplicate requests."""
+
+    def test_duplicates_share_one_request(self):
+        """Concurrent identical requests share one send, and are forgotten after."""
+        sent = []
+
+        async def run() -> None:
+            client = AsyncOpenAICompatClient(base_url="http://test", api_key="x")
+
+            async def fake_send(payload, request_hash=None):
+                sent.append(request_hash)
+                await asyncio.sleep(0)
+                return CompletionResult(text="hi", raw={})
+
+            client._send = fake_send
+            messages = [{"role": "user", "content": "hello"}]
+            async with client:
+                results = await asyncio.gather(
+                    *(client.achat_completion("m", messages) for _ in range(3))
+                )
+                assert [r.text for r in results] == ["hi"] * 3
+                assert client._memo == {}
+
+                # Completed requests are not kept; the cache serves repeats
+                await client.achat_completion("m", messages)
+
+        asyncio.run(run())
+        assert len(sent) == 2
+
+    def test_failure_not_shared(self):
+        """A failed request is forgotten, so a retry is sent again."""
+        calls = []
+
+        async def run() -> None:
+            client = AsyncOpenAICompatClient(base_url="http://test", api_key="x")
+
+            async def failing_send(payload, request_hash=None):
+                calls.append(request_hash)
+                raise ValueError("bad response")
+
+            client._send = failing_send
+            messages = [{"role": "user", "content": "hello"}]
+            async with client:
+                for _ in range(2):
+                    with pytest.raises(ValueError):
+                        await client.achat_completion("m", messages)
+                assert client._memo == {}
+
+        asyncio.run(run())
+        assert len(calls) == 2
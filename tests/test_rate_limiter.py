@@ -0,0 +1,126 @@
+"""Tests for request and token rate limiting."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from occam.provider import rate_limiter
+from occam.provider.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Patch the rate limiter's clock and sleep with a FakeClock."""
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(
+        rate_limiter, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep)
+    )
+    return fake
+
+
+class TestTokenBucket:
+    """Tests for the token bucket."""
+
+    def test_rejects_nonpositive_rate(self):
+        """A zero or negative rate is an error."""
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_small_default_burst(self, clock):
+        """The default capacity is about a second of refill, not a minute."""
+        bucket = TokenBucket(60)
+        assert bucket.capacity == 1.0
+        assert TokenBucket(6000).capacity == 100.0
+
+    def test_paces_to_rate(self, clock):
+        """Once the burst is spent, amounts are available at the refill rate."""
+        bucket = TokenBucket(60)
+        assert bucket.wait_time(1) == 0.0
+        bucket.consume(1)
+        assert bucket.wait_time(1) == pytest.approx(1.0)
+        clock.now += 0.25
+        assert bucket.wait_time(1) == pytest.approx(0.75)
+        clock.now += 0.75
+        assert bucket.wait_time(1) == 0.0
+
+    def test_refill_capped_at_capacity(self, clock):
+        """An idle bucket stores no more than its capacity."""
+        bucket = TokenBucket(60, capacity=2)
+        bucket.consume(2)
+        clock.now += 3600
+        assert bucket.wait_time(2) == 0.0
+        bucket.consume(2)
+        assert bucket.wait_time(1) == pytest.approx(1.0)
+
+    def test_oversized_amount(self, clock):
+        """An amount over capacity waits for a full bucket, then is charged in full."""
+        bucket = TokenBucket(600, capacity=10)
+        bucket.consume(5)
+        assert bucket.wait_time(100) == pytest.approx(0.5)
+        clock.now += 0.5
+        assert bucket.wait_time(100) == 0.0
+        bucket.consume(100)
+        # 90 below zero, refilling at 10 per second
+        assert bucket.wait_time(1) == pytest.approx(9.1)
+
+
+class TestRateLimiter:
+    """Tests for the combined request and token limiter."""
+
+    def test_requests_per_minute(self, clock):
+        """A minute of requests stays within max_rpm plus the burst."""
+        limiter = RateLimiter(max_rpm=120)
+
+        async def run() -> int:
+            start = clock.now
+            sent = 0
+            while True:
+                await limiter.acquire(0)
+                if clock.now - start > 60.0:
+                    return sent
+                sent += 1
+
+        assert asyncio.run(run()) <= 120 + limiter._requests.capacity
+
+    def test_tokens_per_minute(self, clock):
+        """Requests larger than the bucket are paced by their full token cost."""
+        limiter = RateLimiter(max_tpm=6000)
+
+        async def run() -> list[float]:
+            times = []
+            for _ in range(4):
+                await limiter.acquire(1000)
+                times.append(clock.now)
+            return times
+
+        times = asyncio.run(run())
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        # 1000 tokens at 100 per second
+        assert gaps == pytest.approx([10.0, 10.0, 10.0])
+
+    def test_no_limits(self, clock):
+        """Without limits, acquire never waits."""
+        limiter = RateLimiter()
+
+        async def run() -> None:
+            for _ in range(100):
+                await limiter.acquire(10_000)
+
+        asyncio.run(run())
+        assert clock.now == 1000.0
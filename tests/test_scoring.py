@@ -2,7 +2,10 @@
 
 import pytest
 
+from occam.scoring import cached_scorer
 from occam.scoring.json_mode import extract_json_from_text, score_json_mode
+from occam.scoring.president_mode import check_president_identity
+from occam.scoring.victorian_mode import score_victorian_mode, victorian_phi
 
 
 class TestExtractJsonFromText:
@@ -50,6 +53,13 @@ class TestExtractJsonFromText:
         assert parsed == {"answer": {"nested": "value"}}
         assert has_extra is False
 
+    def test_braces_in_strings(self):
+        """Braces inside strings and deep nesting do not confuse extraction."""
+        text = 'Result: {"a": "}{", "b": {"c": {"d": 1}}} done'
+        parsed, has_extra = extract_json_from_text(text)
+        assert parsed == {"a": "}{", "b": {"c": {"d": 1}}}
+        assert has_extra is True
+
 
 class TestScoreJsonMode:
     """Tests for JSON mode scoring function."""
@@ -112,3 +122,58 @@ class TestScoreJsonMode:
         assert result["has_required_keys"] == 0
         assert result["phi"] == 0
         assert "confidence" in result["missing_keys"]
+
+
+class TestCheckPresidentIdentity:
+    """Tests for president identity detection."""
+
+    def test_claim(self):
+        result = check_president_identity("I am President Van Buren.", "Van Buren")
+        assert result["matched_president"] == "Van Buren"
+        assert result["target_match"] is True
+
+    def test_first_listed_name_wins(self):
+        """With several claims, the name listed first is reported, not the first in the text."""
+        result = check_president_identity("As Lincoln once said... I, Washington, agree.")
+        assert result["matched_president"] == "Washington"
+
+    def test_name_after_claim(self):
+        """Only the name directly after the claim phrase is matched."""
+        result = check_president_identity("I am Abraham Lincoln.")
+        assert result["matched_president"] == "Abraham"
+
+    def test_no_claim(self):
+        assert check_president_identity("Lincoln was president.")["matched_president"] is None
+
+
+class TestVictorianPhi:
+    """Tests for the phi-only Victorian check."""
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "",
+            "Thus it was.",
+            "My dear sir, thus it was.",
+            "I daresay the telegraph and the carriage arrived forthwith.",
+        ],
+    )
+    def test_matches_full_score(self, text):
+        assert victorian_phi(text) == score_victorian_mode(text)["phi"]
+
+
+class TestCachedScorer:
+    """Tests for cached_scorer."""
+
+    def test_matches_uncached_scorer(self):
+        scorer = cached_scorer("json_mode")
+        text = '{"answer": "yes"} extra'
+        expected = score_json_mode(text, ["answer", "confidence"])
+        assert scorer(text, ["answer", "confidence"]) == expected
+        assert scorer(text, ["answer", "confidence"]) == expected
+
+    def test_returns_fresh_dict(self):
+        scorer = cached_scorer("victorian_mode")
+        first = scorer("Good morrow.")
+        first["phi"] = -1
+        assert scorer("Good morrow.")["phi"] != -1
@@ -2,7 +2,21 @@
 
 import pytest
 
-from occam.utils import stable_hash, build_messages, sample_subsets, generate_permutations
+from occam.utils import (
+    stable_hash,
+    build_evidence_messages,
+    build_messages,
+    build_prefix,
+    sample_subsets,
+    generate_permutations,
+    json_dumps,
+    json_loads,
+    load_evidence_cached,
+    OrderedCsvWriter,
+    prefix_hasher,
+    save_csv,
+    save_csv_columns,
+)
 import random
 
 
@@ -28,6 +42,16 @@ class TestStableHash:
         obj2 = {"value": 2}
         assert stable_hash(obj1) != stable_hash(obj2)
 
+    def test_prefix_hasher_matches(self):
+        """Prefix hashing gives the same digest as hashing the full request."""
+        prefix = [{"role": "system", "content": "Be brief."}]
+        message = {"role": "user", "content": 'Say "hi"'}
+        for extra in ({}, {"cache_prompt": True, "seed": 0}, {"meta": {"messages": []}}):
+            request = {"model": "m", "max_tokens": 8, "messages": None, **extra}
+            for shared in ([], prefix):
+                expected = stable_hash({**request, "messages": [*shared, message]})
+                assert prefix_hasher(request, shared)(message) == expected
+
 
 class TestBuildMessages:
     """Tests for message building."""
@@ -67,6 +91,24 @@ class TestBuildMessages:
         assert messages[-1]["role"] == "user"
         assert messages[-1]["content"] == "Test?"
 
+    def test_prefix_matches_messages(self):
+        """The shared prefix is everything but the final user turn."""
+        evidence = [{"user": "Hi", "assistant": "Hello!"}]
+        prefix = build_prefix("Be helpful.", evidence)
+        messages = build_messages("Be helpful.", evidence, "Test?")
+
+        assert isinstance(prefix, tuple)
+        assert list(prefix) == messages[:-1]
+
+    def test_evidence_messages_slice_by_k(self):
+        """The first 2*k evidence turns match a prefix built from k examples."""
+        evidence = [{"user": f"Q{i}", "assistant": f"A{i}"} for i in range(3)]
+        evidence_messages = build_evidence_messages(evidence)
+
+        assert len(evidence_messages) == 6
+        for k in range(4):
+            assert build_prefix("Be helpful.", evidence[:k])[1:] == evidence_messages[: 2 * k]
+
 
 class TestSampleSubsets:
     """Tests for subset sampling."""
@@ -126,3 +168,120 @@ class TestGeneratePermutations:
 
         for perm in perms:
             assert sorted(perm) == sorted(items)
+
+    def test_repeated_items(self):
+        """Equal items in different positions still give distinct orders."""
+        perms = generate_permutations(["a", "a", "b"], n_permutations=4, rng=random.Random(0))
+
+        assert len(perms) == 4
+
+
+class TestJsonHelpers:
+    """Tests for the JSON (de)serialization helpers."""
+
+    def test_roundtrip(self):
+        """Dumped bytes load back to the same object."""
+        obj = {"prompt": "caf\u00e9", "scores": [0.5, 1.0], "n": 3}
+        assert json_loads(json_dumps(obj)) == obj
+        assert json_loads(json_dumps(obj, indent=True)) == obj
+
+    def test_numpy_and_int_keys(self):
+        """NumPy values and non-string keys are serialized."""
+        np = pytest.importorskip("numpy")
+        data = json_loads(json_dumps({1: np.float64(0.25), "arr": np.arange(3)}))
+        assert data == {"1": 0.25, "arr": [0, 1, 2]}
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_nan_is_null(self, monkeypatch, use_orjson):
+        """NaN and infinities are written as null with and without orjson."""
+        np = pytest.importorskip("numpy")
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr("occam.utils.orjson", None)
+        obj = {
+            "nan": float("nan"),
+            "inf": float("-inf"),
+            "np": np.float64("nan"),
+            "arr": np.array([np.nan, 1.0]),
+            "nested": [(np.float32("inf"), 2.5)],
+        }
+        dumped = json_dumps(obj)
+        assert b"NaN" not in dumped and b"Infinity" not in dumped
+        assert json_loads(dumped) == {
+            "nan": None,
+            "inf": None,
+            "np": None,
+            "arr": [None, 1.0],
+            "nested": [[None, 2.5]],
+        }
+
+
+class TestSaveCsv:
+    """Tests for the CSV writer."""
+
+    def test_matches_pandas(self, tmp_path):
+        """Output is byte-identical to DataFrame.to_csv(index=False)."""
+        pd = pytest.importorskip("pandas")
+        rows = [
+            {"k": 2, "phi": 0.1, "prompt": 'say "hi", twice', "ok": True},
+            {"k": "overall", "phi": float("nan"), "extra": None},
+        ]
+        path = tmp_path / "rows.csv"
+        save_csv(rows, path)
+        expected = tmp_path / "expected.csv"
+        pd.DataFrame(rows).to_csv(expected, index=False)
+        assert path.read_bytes() == expected.read_bytes()
+
+    def test_columns_match_rows(self, tmp_path):
+        """Column-wise output matches the row-wise writer."""
+        columns = {"k": [2, 4], "prompt_id": ["a", "b,c"], "phi": [1, float("nan")]}
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        save_csv(rows, tmp_path / "rows.csv")
+        save_csv_columns(columns, tmp_path / "columns.csv")
+        assert (tmp_path / "columns.csv").read_bytes() == (tmp_path / "rows.csv").read_bytes()
+
+    def test_ordered_writer_matches_rows(self, tmp_path):
+        """Rows submitted out of order are written in index order."""
+        rows = [{"k": 2, "phi": 0.5, "note": "a,b"}, {"k": 4, "phi": float("nan")}, {"k": 8}]
+        save_csv(rows, tmp_path / "rows.csv")
+        with OrderedCsvWriter(tmp_path / "ordered.csv", ["k", "phi", "note"]) as writer:
+            for index in (2, 0, 1):
+                writer.write(index, rows[index])
+        assert (tmp_path / "ordered.csv").read_bytes() == (tmp_path / "rows.csv").read_bytes()
+
+
+class TestLoadEvidenceCached:
+    """Tests for the cached evidence loader."""
+
+    def test_reuses_parse(self, tmp_path):
+        """Repeated loads of an unchanged file return the same tuple."""
+        path = tmp_path / "evidence.jsonl"
+        path.write_text('{"user": "a", "assistant": "b"}\n\n{"user": "c", "assistant": "d"}\n')
+
+        first = load_evidence_cached(path)
+        assert first == ({"user": "a", "assistant": "b"}, {"user": "c", "assistant": "d"})
+        assert load_evidence_cached(str(path)) is first
+
+    def test_max_n(self, tmp_path):
+        """max_n reads only the leading examples, skipping blank lines."""
+        path = tmp_path / "evidence.jsonl"
+        path.write_text(
+            '\n{"user": "a", "assistant": "b"}\n{"user": "c", "assistant": "d"}\nnot json\n'
+        )
+
+        assert load_evidence_cached(path, max_n=1) == ({"user": "a", "assistant": "b"},)
+        assert len(load_evidence_cached(path, max_n=2)) == 2
+
+    def test_reloads_after_edit(self, tmp_path):
+        """Changing the file invalidates the cached parse."""
+        import os
+
+        path = tmp_path / "evidence.jsonl"
+        path.write_text('{"user": "a", "assistant": "b"}\n')
+        assert len(load_evidence_cached(path)) == 1
+
+        path.write_text('{"user": "a", "assistant": "b"}\n{"user": "c", "assistant": "d"}\n')
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert len(load_evidence_cached(path)) == 2